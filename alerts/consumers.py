@@ -1,11 +1,22 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
+import logging
+import time
+
+from .heartbeats import heartbeat_buffer, in_meeting
+
+logger = logging.getLogger(__name__)
+
+# How long a socket trusts that its user is in a meeting before checking again
+MEMBERSHIP_TTL_SECONDS = 60
 
 class AlertConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope["user"]
         if user.is_authenticated:
             self.group_name = f"user_{user.id}"
+            self.meetings_checked = {}  # meeting_id -> (in meeting, checked at)
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
         else:
@@ -15,8 +26,39 @@ class AlertConsumer(AsyncWebsocketConsumer):
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}")
+            return
+
+        # {"type": "heartbeat", "meeting_id": 12}, same as POST /api/alerts/heartbeat/
+        if isinstance(data, dict) and data.get("type") == "heartbeat":
+            meeting_id = data.get("meeting_id")
+            if isinstance(meeting_id, (int, str)) and str(meeting_id).isdigit():
+                if await self.in_meeting(str(meeting_id)):
+                    heartbeat_buffer.add(meeting_id, self.scope["user"].id)
+
+    async def in_meeting(self, meeting_id):
+        """Whether this socket's user has an open Participant row, cached per socket"""
+        cached = self.meetings_checked.get(meeting_id)
+        if cached is None or time.monotonic() - cached[1] > MEMBERSHIP_TTL_SECONDS:
+            is_in = await database_sync_to_async(in_meeting)(meeting_id, self.scope["user"].id)
+            cached = self.meetings_checked[meeting_id] = (is_in, time.monotonic())
+        return cached[0]
+
     async def send_alert(self, event):
         await self.send(text_data=json.dumps({
             "message": event["message"],
-            "type": event["type"]
+            "type": event["alert_type"]
+        }))
+
+    async def send_alerts(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "batch",
+            "alerts": [
+                {"message": alert["message"], "type": alert["alert_type"]}
+                for alert in event["alerts"]
+            ]
         }))
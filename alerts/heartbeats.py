@@ -0,0 +1,153 @@
+# alerts/heartbeats.py
+"""
+Meeting heartbeats in Redis.
+
+Each live meeting has a sorted set ``heartbeats:<meeting_id>`` of user ids
+scored by the time of their last heartbeat, so everyone who went quiet is a
+single ZRANGEBYSCORE away. Inactive users are removed from the set once
+their alerts are stored; their next heartbeat puts them back, so they are
+reported once per period of inactivity.
+
+Heartbeats normally arrive over the alerts websocket (plain or multiplexed)
+and are coalesced per process by ``HeartbeatBuffer``, which writes them every
+FLUSH_INTERVAL_MS or MAX_BATCH_SIZE heartbeats in one pipeline. The HTTP
+endpoint writes straight through and remains as a fallback. Both only accept
+heartbeats from users with an open ``Participant`` row in the meeting.
+
+Configured with ``settings.ALERT_HEARTBEATS``.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from lms.buffers import WriteBehindBuffer
+from lms.redis_client import async_redis_client, redis_client
+from meetings.models import Participant
+
+INACTIVE_AFTER = timedelta(minutes=3)
+
+# Sets of meetings nobody has pinged for a day disappear on their own
+KEY_TTL_SECONDS = 24 * 60 * 60
+
+DEFAULTS = {
+    'FLUSH_INTERVAL_MS': 1000,
+    'MAX_BATCH_SIZE': 1000,
+}
+
+
+def heartbeat_key(meeting_id):
+    return f"heartbeats:{meeting_id}"
+
+
+def _queue_heartbeats(pipe, heartbeats):
+    by_meeting = {}
+    for (meeting_id, user_id), seen_at in heartbeats.items():
+        by_meeting.setdefault(meeting_id, {})[str(user_id)] = seen_at
+
+    for meeting_id, scores in by_meeting.items():
+        key = heartbeat_key(meeting_id)
+        # GT: a late batch never moves a heartbeat back in time
+        pipe.zadd(key, scores, gt=True)
+        pipe.expire(key, KEY_TTL_SECONDS)
+
+
+def record_heartbeats(heartbeats):
+    """Store ``{(meeting_id, user_id): unix timestamp}`` in one round trip."""
+    if not heartbeats:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_heartbeats(pipe, heartbeats)
+    pipe.execute()
+
+
+async def record_heartbeats_async(heartbeats):
+    if not heartbeats:
+        return
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        _queue_heartbeats(pipe, heartbeats)
+        await pipe.execute()
+
+
+def in_meeting(meeting_id, user_id):
+    """Whether ``user_id`` is currently in meeting ``meeting_id`` (its pk)."""
+    return Participant.objects.filter(meeting_id=meeting_id, user_id=user_id, left_at__isnull=True).exists()
+
+
+def open_participants(pairs):
+    """The (meeting_id, user_id) pairs of ``pairs`` that are open participants, in one query."""
+    pairs = list(pairs)
+    if not pairs:
+        return set()
+    rows = Participant.objects.filter(
+        meeting_id__in={meeting_id for meeting_id, _ in pairs},
+        user_id__in={user_id for _, user_id in pairs},
+        left_at__isnull=True,
+    ).values_list('meeting_id', 'user_id')
+    open_pairs = {(meeting_id, str(user_id)) for meeting_id, user_id in rows}
+    return {pair for pair in pairs if (pair[0], str(pair[1])) in open_pairs}
+
+
+def record_heartbeat(meeting_id, user_id):
+    record_heartbeats({(meeting_id, user_id): time.time()})
+
+
+def inactive_cutoff(inactive_after=INACTIVE_AFTER):
+    """Unix time before which a last heartbeat counts as inactive."""
+    return time.time() - inactive_after.total_seconds()
+
+
+def find_inactive(meeting_ids, cutoff):
+    """
+    Users of ``meeting_ids`` whose last heartbeat is at or before ``cutoff``,
+    as {meeting_id: [user_id, ...]}, in one round trip.
+    """
+    meeting_ids = list(meeting_ids)
+    if not meeting_ids:
+        return {}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for meeting_id in meeting_ids:
+        pipe.zrangebyscore(heartbeat_key(meeting_id), '-inf', cutoff)
+    return {
+        meeting_id: user_ids
+        for meeting_id, user_ids in zip(meeting_ids, pipe.execute())
+        if user_ids
+    }
+
+
+def forget_inactive(meeting_ids, cutoff):
+    """
+    Drop users of ``meeting_ids`` with no heartbeat since ``cutoff``, once they
+    have been reported. Anyone who sent one meanwhile is kept.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for meeting_id in meeting_ids:
+        pipe.zremrangebyscore(heartbeat_key(meeting_id), '-inf', cutoff)
+    pipe.execute()
+
+
+class HeartbeatBuffer(WriteBehindBuffer):
+    description = 'heartbeats'
+
+    def new_batch(self):
+        return {}
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULTS, **getattr(settings, 'ALERT_HEARTBEATS', {})}
+        return cls(flush_interval_ms=config['FLUSH_INTERVAL_MS'], max_batch_size=config['MAX_BATCH_SIZE'])
+
+    def add(self, meeting_id, user_id):
+        """Record a heartbeat; repeated ones before the next flush collapse into one."""
+        self._pending[(str(meeting_id), str(user_id))] = time.time()
+        self._schedule()
+
+    def write(self, batch):
+        record_heartbeats(batch)
+
+    async def write_async(self, batch):
+        await record_heartbeats_async(batch)
+
+
+heartbeat_buffer = HeartbeatBuffer.from_settings()
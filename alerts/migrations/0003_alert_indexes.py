@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_initial'),
+        ('meetings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='alerts_aler_user_id_bf8998_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['user', 'is_read'], name='alerts_aler_user_id_d01ece_idx'),
+        ),
+    ]
@@ -15,4 +15,10 @@ class Alert(models.Model):
     type = models.CharField(max_length=50, choices=ALERT_TYPES)
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
\ No newline at end of file
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+            models.Index(fields=['user', 'is_read']),
+        ]
\ No newline at end of file
@@ -1,8 +0,0 @@
-import redis
-
-redis_client = redis.StrictRedis(
-    host='localhost', 
-    port=6379,
-    db=0,
-    decode_responses=True  # optional: returns string instead of bytes
-)
@@ -5,3 +5,12 @@ class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = '__all__'
+
+class MarkAlertsReadSerializer(serializers.Serializer):
+    alert_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=500)
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not attrs.get('alert_ids') and not attrs['all']:
+            raise serializers.ValidationError("Provide alert_ids or set all to true.")
+        return attrs
@@ -0,0 +1,51 @@
+# alerts/suppression.py
+"""
+Alert suppression windows.
+
+An alert about a subject (e.g. a student in a meeting) is delivered at most
+once per window: the first one claims ``alert_suppress:<type>:<subject>``
+with SET NX EX, and later ones are dropped until the key expires.
+
+Windows are configured per alert type in ``settings.ALERT_SUPPRESSION_SECONDS``;
+types without a window are never suppressed.
+"""
+from django.conf import settings
+
+from lms.redis_client import redis_client
+
+DEFAULT_WINDOWS = {
+    'inactivity': 10 * 60,
+}
+
+
+def get_window(alert_type):
+    windows = {**DEFAULT_WINDOWS, **getattr(settings, 'ALERT_SUPPRESSION_SECONDS', {})}
+    return windows.get(alert_type)
+
+
+def suppression_key(alert_type, subject):
+    """``subject`` is a tuple of ids, e.g. (meeting_id, user_id)."""
+    return f"alert_suppress:{alert_type}:" + ":".join(str(part) for part in subject)
+
+
+def claim(alert_type, subjects):
+    """
+    The subset of ``subjects`` not alerted about within the window, claiming
+    the window for them in one round trip.
+    """
+    subjects = list(dict.fromkeys(subjects))
+    window = get_window(alert_type)
+    if not window or not subjects:
+        return subjects
+
+    pipe = redis_client.pipeline(transaction=False)
+    for subject in subjects:
+        pipe.set(suppression_key(alert_type, subject), 1, nx=True, ex=window)
+    return [subject for subject, claimed in zip(subjects, pipe.execute()) if claimed]
+
+
+def release(alert_type, subjects):
+    """Give up claimed windows, e.g. when the alerts could not be stored."""
+    subjects = list(subjects)
+    if get_window(alert_type) and subjects:
+        redis_client.delete(*(suppression_key(alert_type, subject) for subject in subjects))
@@ -1,46 +1,57 @@
 # alerts/tasks.py
 
 from celery import shared_task
-from django.utils import timezone
-from datetime import timedelta
-from .redis_client import redis_client
+from .heartbeats import find_inactive, forget_inactive, inactive_cutoff, open_participants
 from .models import Alert
 from meetings.models import Meeting  
 from django.contrib.auth import get_user_model
-from .utils import send_live_alert
+from .suppression import claim, release
+from .utils import deliver_alerts
 
 User = get_user_model()
 
 @shared_task
 def check_inactive_students():
-    live_meetings = Meeting.objects.filter(is_active=True)
-
-    for meeting in live_meetings:
-        participants = meeting.participants.all()  # assuming ManyToManyField
-        for user in participants:
-            key = f"last_active:{meeting.id}:{user.id}"
-            last_seen = redis_client.get(key)
-
-            if not last_seen:
-                continue
-
-            try:
-                last_seen = timezone.datetime.fromisoformat(last_seen)
-            except Exception:
-                continue
-
-            if timezone.now() - last_seen > timedelta(minutes=3):
-                # ✅ Create alert with real user instance
-                Alert.objects.create(
-                    user=meeting.host,  # ✅ host is a real user instance
-                    type="inactivity",
-                    message=f"{user.username} has been inactive for 3+ minutes",
-                    meeting=meeting
-                )
-
-                # ✅ Send alert to host
-                send_live_alert(
-                    user_id=meeting.host.id,
-                    message=f"{user.username} has been inactive for 3+ minutes",
-                    alert_type="inactivity"
-                )
+    # One query for the live meetings, one Redis round trip for all their heartbeats
+    hosts = dict(Meeting.objects.filter(status='active').values_list('id', 'host_id'))
+    cutoff = inactive_cutoff()
+    inactive = find_inactive(hosts, cutoff)
+    if not inactive:
+        return
+
+    # Only people still in the meeting, checked in one query
+    subjects = open_participants(
+        (meeting_id, user_id)
+        for meeting_id, meeting_user_ids in inactive.items()
+        for user_id in meeting_user_ids
+    )
+    # One alert per (meeting, student) per suppression window
+    subjects = claim("inactivity", sorted(subjects))
+
+    if subjects:
+        user_ids = {user_id for _, user_id in subjects}
+        usernames = {
+            str(user_id): username
+            for user_id, username in User.objects.filter(id__in=user_ids).values_list('id', 'username')
+        }
+
+        alerts = [
+            # ✅ Alert goes to the host of the meeting
+            Alert(
+                user_id=hosts[meeting_id],
+                type="inactivity",
+                message=f"{usernames[user_id]} has been inactive for 3+ minutes",
+                meeting_id=meeting_id
+            )
+            for meeting_id, user_id in subjects
+            if user_id in usernames
+        ]
+        # ✅ One bulk insert, one frame per host
+        try:
+            deliver_alerts(alerts)
+        except Exception:
+            # Keep them in the heartbeat sets so the next run reports them again
+            release("inactivity", subjects)
+            raise
+
+    forget_inactive(inactive, cutoff)
@@ -1,3 +1,76 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from authentication.models import User
+from lms.redis_client import redis_client
+from meetings.models import Meeting, Participant
+from .heartbeats import heartbeat_key, record_heartbeats
+from .models import Alert
+from .suppression import suppression_key
+from .tasks import check_inactive_students
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class InactivityAlertTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw')
+        self.meeting = Meeting.objects.create(host=self.host, title='Lecture', status='active')
+        self.participant = Participant.objects.create(meeting=self.meeting, user=self.student)
+        self.addCleanup(
+            redis_client.delete,
+            heartbeat_key(self.meeting.pk),
+            suppression_key('inactivity', (self.meeting.pk, self.student.pk)),
+            f"alerts:unread:{self.host.pk}",
+            f"alerts:unread:{self.host.pk}:gen",
+        )
+
+    def beat(self, seconds_ago):
+        record_heartbeats({(self.meeting.pk, self.student.pk): time.time() - seconds_ago})
+
+    def is_tracked(self):
+        return redis_client.zscore(heartbeat_key(self.meeting.pk), str(self.student.pk)) is not None
+
+    def test_inactive_student_reported_once_to_host(self):
+        self.beat(4 * 60)
+        check_inactive_students()
+
+        alert = Alert.objects.get()
+        self.assertEqual((alert.user, alert.meeting, alert.type), (self.host, self.meeting, 'inactivity'))
+        self.assertIn('student', alert.message)
+        # Forgotten once reported, so the next run stays quiet
+        self.assertFalse(self.is_tracked())
+        check_inactive_students()
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_recent_heartbeat_is_not_reported(self):
+        self.beat(30)
+        check_inactive_students()
+        self.assertFalse(Alert.objects.exists())
+        self.assertTrue(self.is_tracked())
+
+    def test_only_open_participants_of_active_meetings(self):
+        self.beat(4 * 60)
+        Participant.objects.filter(pk=self.participant.pk).update(left_at=timezone.now())
+        check_inactive_students()
+        self.assertFalse(Alert.objects.exists())
+
+        Participant.objects.filter(pk=self.participant.pk).update(left_at=None)
+        Meeting.objects.filter(pk=self.meeting.pk).update(status='ended')
+        check_inactive_students()
+        self.assertFalse(Alert.objects.exists())
+
+    def test_failed_delivery_reports_again(self):
+        self.beat(4 * 60)
+        with mock.patch('alerts.tasks.deliver_alerts', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                check_inactive_students()
+        # Still tracked and not suppressed, so the next run delivers the alert
+        self.assertTrue(self.is_tracked())
+        check_inactive_students()
+        self.assertEqual(Alert.objects.count(), 1)
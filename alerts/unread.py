@@ -0,0 +1,59 @@
+# alerts/unread.py
+"""
+Cached unread alert counts.
+
+Each user's unread count lives in Redis (``alerts:unread:<user_id>``) and is
+adjusted when alerts are created or marked read, so badges never run a
+COUNT. A missing key is seeded from the database on the next read; adjusting
+a missing key is a no-op, so a counter is never built from a partial delta.
+Every adjustment also bumps the key's generation (see lms/redis_client.py),
+so a seed whose COUNT ran before the change, and would miss it, is not
+written.
+Keys expire after a day, which also heals drift from alerts changed outside
+these code paths (e.g. the admin).
+"""
+from .models import Alert
+from lms.redis_client import generation_key, read_generation, redis_client, set_if_generation
+
+KEY_TTL_SECONDS = 24 * 60 * 60
+
+# Bump the generation KEYS[2], then INCRBY only if the counter exists, never going below zero
+ADJUST_EXISTING = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local count = redis.call('INCRBY', KEYS[1], ARGV[1])
+    if count < 0 then
+        redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+        return 0
+    end
+    return count
+end
+return false
+"""
+
+
+def _key(user_id):
+    return f"alerts:unread:{user_id}"
+
+
+def adjust_unread(deltas):
+    """Apply ``{user_id: delta}`` to the cached counters in one round trip."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id, delta in deltas.items():
+        key = _key(user_id)
+        pipe.eval(ADJUST_EXISTING, 2, key, generation_key(key), delta, KEY_TTL_SECONDS)
+    pipe.execute()
+
+
+def unread_count(user_id):
+    key = _key(user_id)
+    count = redis_client.get(key)
+    if count is None:
+        generation = read_generation(key)
+        count = Alert.objects.filter(user_id=user_id, is_read=False).count()
+        set_if_generation(key, count, KEY_TTL_SECONDS, generation)
+    return int(count)
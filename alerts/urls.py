@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import user_alerts, heartbeat
+from .views import user_alerts, heartbeat, mark_alerts_read, unread_alerts_count
 
 urlpatterns = [
     path('', user_alerts, name='user-alerts'),
     path('heartbeat/', heartbeat, name='heartbeat'),
+    path('mark-read/', mark_alerts_read, name='mark-alerts-read'),
+    path('unread-count/', unread_alerts_count, name='unread-alerts-count'),
 ]
\ No newline at end of file
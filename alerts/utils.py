@@ -1,6 +1,9 @@
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+from .models import Alert
+from .unread import adjust_unread
+
 def send_live_alert(user_id, message, alert_type):
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
@@ -8,6 +11,32 @@ def send_live_alert(user_id, message, alert_type):
         {
             "type": "send_alert",
             "message": message,
-            "type": alert_type
+            "alert_type": alert_type,
+            "group": f"user_{user_id}"
+        }
+    )
+
+def send_live_alerts(user_id, alerts):
+    """Push several (message, alert_type) pairs to one user as a single frame"""
+    if len(alerts) == 1:
+        send_live_alert(user_id, *alerts[0])
+        return
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"user_{user_id}",
+        {
+            "type": "send_alerts",
+            "alerts": [{"message": message, "alert_type": alert_type} for message, alert_type in alerts],
+            "group": f"user_{user_id}"
         }
-    )
\ No newline at end of file
+    )
+
+def deliver_alerts(alerts):
+    """Save unsaved ``Alert`` objects in one query and push one frame per recipient"""
+    Alert.objects.bulk_create(alerts)
+    by_user = {}
+    for alert in alerts:
+        by_user.setdefault(alert.user_id, []).append((alert.message, alert.type))
+    adjust_unread({user_id: len(user_alerts) for user_id, user_alerts in by_user.items()})
+    for user_id, user_alerts in by_user.items():
+        send_live_alerts(user_id, user_alerts)
\ No newline at end of file
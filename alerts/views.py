@@ -1,22 +1,36 @@
 from django.shortcuts import render
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 
-from .redis_client import redis_client
+from .heartbeats import in_meeting, record_heartbeat
 from .models import Alert
-from .serializers import AlertSerializer
+from .serializers import AlertSerializer, MarkAlertsReadSerializer
+from .unread import adjust_unread, unread_count
 from .utils import send_live_alert
 
 
+class AlertPagination(CursorPagination):
+    """Keyset pagination over a user's alerts, newest first"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def heartbeat(request):
     meeting_id = request.data.get('meeting_id')
-    user_id = request.user.id
-    key = f"last_active:{meeting_id}:{user_id}"
-    redis_client.set(key, timezone.now().isoformat())
+    if not meeting_id:
+        return Response({"error": "meeting_id is required"}, status=400)
+    if not str(meeting_id).isdigit():
+        return Response({"error": "meeting_id must be an integer"}, status=400)
+    if not in_meeting(meeting_id, request.user.id):
+        return Response({"error": "You are not in this meeting"}, status=403)
+    record_heartbeat(meeting_id, request.user.id)
 
     # 🔴 TEMPORARY: Send test alert on every heartbeat
     # Alert.objects.create(
@@ -37,6 +51,50 @@ def heartbeat(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_alerts(request):
-    alerts = Alert.objects.filter(user=request.user).order_by('-created_at')
-    serializer = AlertSerializer(alerts, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    """
+    Alerts of the logged-in user, newest first.
+
+    Query Parameters:
+    - is_read: Filter by read status (true/false)
+    - cursor: Opaque cursor from the previous page's next/previous link
+    - page_size: Number of alerts per page (max 100)
+    """
+    alerts = Alert.objects.filter(user=request.user)
+    is_read = request.query_params.get('is_read')
+    if is_read is not None:
+        alerts = alerts.filter(is_read=is_read.lower() == 'true')
+
+    paginator = AlertPagination()
+    page = paginator.paginate_queryset(alerts, request)
+    serializer = AlertSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_alerts_read(request):
+    """
+    Mark alerts as read in one query.
+
+    POST Body: {"alert_ids": [1, 2, 3]} or {"all": true}
+    """
+    serializer = MarkAlertsReadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    alerts = Alert.objects.filter(user=request.user, is_read=False)
+    if not serializer.validated_data['all']:
+        alerts = alerts.filter(id__in=serializer.validated_data['alert_ids'])
+    updated_count = alerts.update(is_read=True)
+    adjust_unread({request.user.id: -updated_count})
+
+    return Response({
+        "updated_count": updated_count,
+        "unread_count": unread_count(request.user.id),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_alerts_count(request):
+    """Unread alert count for the badge, served from the cached counter"""
+    return Response({"unread_count": unread_count(request.user.id)})
\ No newline at end of file
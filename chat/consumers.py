@@ -1,18 +1,25 @@
 import json
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 # from accounts.models import CustomUser
+from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import UntypedToken
 from django.contrib.auth import get_user_model
 from channels.db import database_sync_to_async
 from jwt import decode as jwt_decode
 from django.conf import settings
 
+from chate_box.services.fanout import frame_event
+from chate_box.services.presence import PresenceTracker, snapshot as presence_snapshot
+from meetings.live_state import clean_changes, update_state_async
 from .models import ChatMessage
+from .services.access import meeting_access
+from .services.history import chat_message_buffer, remember, replay_frame
 
 User = get_user_model()
 
-# Temporary in-memory user tracking (for dev)
-ONLINE_USERS = {}  # { room_id: set(user_info_dicts) }
+# How often a socket that may not change live state re-checks, e.g. after a join committed
+PARTICIPANT_RECHECK_SECONDS = 5
 
 def get_cookie(headers, key):
     for header in headers:
@@ -29,20 +36,29 @@ class VideoConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f"meeting_{self.room_id}"
         self.user = None  # Initialize user
+        self.presence = None
+        self.can_view = False
+        self.is_participant = False
+        self.participant_checked_at = 0
+
+        # Already authenticated by JWTAuthMiddleware (e.g. on the multiplexed socket)
+        scope_user = self.scope.get("user")
+        if scope_user and not scope_user.is_anonymous:
+            self.user = scope_user
+        else:
+            # Extract JWT from cookies
+            token = get_cookie(self.scope["headers"], "access")
+            # Debug: Print all headers for inspection
+            print("Request Headers:")
+            for header in self.scope["headers"]:
+                print(f"{header[0].decode()}: {header[1].decode()}")
 
-        # Extract JWT from cookies
-        token = get_cookie(self.scope["headers"], "access")
-        # Debug: Print all headers for inspection
-        print("Request Headers:")
-        for header in self.scope["headers"]:
-            print(f"{header[0].decode()}: {header[1].decode()}")
-        
-        if not token:
-            print("❌ No access token found in cookies")
-            await self.close()
-            return
-            
-        self.user = await self.get_user_from_token(token)
+            if not token:
+                print("❌ No access token found in cookies")
+                await self.close()
+                return
+
+            self.user = await self.get_user_from_token(token)
 
         if not self.user or self.user.is_anonymous:
             print("❌ Invalid user or token")
@@ -51,21 +67,35 @@ class VideoConsumer(AsyncWebsocketConsumer):
 
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
-
-        # Add user with first_name to online users
-        await self.add_online_user(self.room_id, self.user.username, self.user.first_name)
-        await self.send_online_users()
+        # Only the host and people in the meeting see its chat and presence, and
+        # only the latter may change their live state. Anyone else gets in when
+        # their own participant_joined event arrives.
+        self.can_view, self.is_participant = await self.get_access()
+        self.participant_checked_at = time.monotonic()
+        if self.can_view:
+            await self.enter()
 
         print(f"✅ {self.user.first_name} ({self.user.username}) connected to {self.room_group_name}")
 
+    async def enter(self):
+        """Register presence (shared by all workers) and send the roster and chat replay to this socket"""
+        self.presence = PresenceTracker("meeting", self.room_id, {
+            'user_id': str(self.user.id),
+            'username': self.user.username,
+            'first_name': self.user.first_name or self.user.username,
+        }, self.channel_layer, self.room_group_name)
+        await self.presence.start()
+        await self.send_online_users()
+        await self.send_history()
+
     async def disconnect(self, close_code):
         if hasattr(self, 'room_group_name'):
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
         
-        # Only remove user if self.user exists
-        if hasattr(self, 'user') and self.user and hasattr(self.user, 'username'):
-            await self.remove_online_user(self.room_id, self.user.username)
-            await self.send_online_users()
+        # Only connections that registered presence have one to release
+        if getattr(self, 'presence', None):
+            await self.presence.stop()
+            await chat_message_buffer.flush()
             print(f"❌ {self.user.first_name} ({self.user.username}) disconnected from {self.room_group_name}")
         else:
             print(f"❌ User disconnected from {getattr(self, 'room_group_name', 'unknown room')}")
@@ -73,71 +103,109 @@ class VideoConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
+            if data.get("type") == "participant_state":
+                await self.update_participant_state(data)
+                return
             message = data.get("message", "")
 
-            if self.user and not self.user.is_anonymous and message.strip():
-                # Save to DB with username (for identification)
-                await database_sync_to_async(ChatMessage.objects.create)(
+            if self.can_view and message.strip():
+                # Queued and saved in the next batch, with username (for identification)
+                chat_message = chat_message_buffer.add(ChatMessage(
                     room_id=self.room_id,
                     user=self.user.username,
+                    sender_id=self.user.id,
                     message=message
-                )
-
-                # Broadcast with first_name (for display)
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'broadcast_message',
-                        'message': message,
-                        'user': self.user.username,  # for backend identification
-                        'first_name': self.user.first_name,  # for frontend display
-                        'user_id': self.user.id
-                    }
-                )
+                ))
+
+                # Encoded once for the broadcast and the late-joiner replay buffer
+                event = frame_event({
+                    'type': 'message',
+                    'message': message,
+                    'user': self.user.username,  # for backend identification
+                    'first_name': self.user.first_name,  # for frontend display
+                    'user_id': str(self.user.id),
+                    'timestamp': chat_message.timestamp.isoformat()
+                }, self.room_group_name)
+                await self.channel_layer.group_send(self.room_group_name, event)
+                try:
+                    await remember(self.room_id, event['frame'])
+                except Exception as e:
+                    print(f"[history error] {str(e)}")
                 print(f"💬 Message from {self.user.first_name}: {message}")
         except Exception as e:
             print(f"[receive error] {str(e)}")
 
-    async def broadcast_message(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'message',  # Add message type
-            'message': event['message'],
-            'user': event.get('user'),  # username for identification
-            'first_name': event.get('first_name'),  # first_name for display
-            'user_id': event.get('user_id')
-        }))
+    async def update_participant_state(self, data):
+        """Mute / video / hand raise / screen share toggle, stored in Redis and broadcast as a delta"""
+        if not self.is_participant:
+            # The join may have committed after this socket connected
+            if time.monotonic() - self.participant_checked_at < PARTICIPANT_RECHECK_SECONDS:
+                return
+            self.participant_checked_at = time.monotonic()
+            can_view, self.is_participant = await self.get_access()
+            if can_view and not self.can_view:
+                self.can_view = True
+                await self.enter()
+            if not self.is_participant:
+                return
+        try:
+            changes = clean_changes(data)
+        except ValidationError as e:
+            print(f"[participant state error] {e.detail}")
+            return
+        if not changes:
+            return
+        try:
+            await update_state_async(self.channel_layer, self.room_id, self.user.id, changes)
+        except Exception as e:
+            print(f"[participant state error] {str(e)}")
+
+    async def chat_frame(self, event):
+        """Pre-encoded frames, e.g. presence.join / presence.leave"""
+        if self.can_view:
+            await self.send(text_data=event["frame"])
+
+    async def participant_joined(self, event):
+        """Sent by the join_meeting view; our own join lets a socket opened before it in and allows toggles"""
+        if event['participant']['user'] == self.user.username:
+            self.is_participant = True
+            if not self.can_view:
+                self.can_view = True
+                await self.enter()
+        if self.can_view:
+            await self.send(text_data=json.dumps(event))
+
+    async def participant_left(self, event):
+        """Sent by the leave_meeting view; our own leave ends toggle rights on this socket"""
+        if event['user'] == self.user.username:
+            self.is_participant = False
+            self.participant_checked_at = time.monotonic()
+        if self.can_view:
+            await self.send(text_data=json.dumps(event))
+
+    async def send_history(self):
+        """Replay the latest messages of the meeting to this socket"""
+        try:
+            await self.send(text_data=await replay_frame(self.room_id))
+        except Exception as e:
+            print(f"[history error] {str(e)}")
 
-    async def online_users(self, event):
+    async def send_online_users(self):
+        """Current roster, sent once to this socket; changes follow as presence deltas"""
+        try:
+            users = await presence_snapshot("meeting", self.room_id)
+        except Exception as e:
+            print(f"[presence error] {str(e)}")
+            users = []
         await self.send(text_data=json.dumps({
             'type': 'online_users',
-            'users': event['users']
+            'users': users
         }))
 
-    async def send_online_users(self):
-        if hasattr(self, 'room_id'):
-            users_data = []
-            raw_users = list(ONLINE_USERS.get(self.room_id, set()))
-            
-            for user_info in raw_users:
-                if '|' in user_info:
-                    username, first_name = user_info.split('|', 1)
-                    users_data.append({
-                        'username': username,
-                        'first_name': first_name
-                    })
-                else:
-                    users_data.append({
-                        'username': user_info,
-                        'first_name': user_info
-                    })
-            
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'online_users',
-                    'users': users_data
-                }
-            )
+    @database_sync_to_async
+    def get_access(self):
+        """(may view the chat, is an open participant) for this socket's user"""
+        return meeting_access(self.user, self.room_id)
 
     @database_sync_to_async
     def get_user_from_token(self, token):
@@ -166,30 +234,3 @@ class VideoConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             print(f"❌ Token validation error: {str(e)}")
             return None
-
-    @database_sync_to_async
-    def add_online_user(self, room_id, username, first_name):
-        if room_id not in ONLINE_USERS:
-            ONLINE_USERS[room_id] = set()
-        
-        # Store user info as a string with pipe separator
-        user_info = f"{username}|{first_name or username}"
-        ONLINE_USERS[room_id].add(user_info)
-        print(f"👥 Added {first_name} to room {room_id}")
-
-    @database_sync_to_async
-    def remove_online_user(self, room_id, username):
-        if room_id in ONLINE_USERS:
-            # Remove any entry that starts with this username
-            to_remove = None
-            for user_info in ONLINE_USERS[room_id]:
-                if user_info.startswith(f"{username}|"):
-                    to_remove = user_info
-                    break
-            if to_remove:
-                ONLINE_USERS[room_id].discard(to_remove)
-                print(f"👥 Removed {username} from room {room_id}")
-            
-            # Clean up empty rooms
-            if not ONLINE_USERS[room_id]:
-                del ONLINE_USERS[room_id]
\ No newline at end of file
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_senders(apps, schema_editor):
+    """Meeting messages stored the sender's username; link them to the user."""
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    usernames = ChatMessage.objects.filter(sender__isnull=True).values_list('user', flat=True).distinct()
+    users = dict(User.objects.filter(username__in=list(usernames)).values_list('username', 'id'))
+    for username, user_id in users.items():
+        ChatMessage.objects.filter(user=username, sender__isnull=True).update(sender_id=user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='meeting_chat_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room_id', 'timestamp', 'id'], name='chat_chatme_room_id_6e4daa_idx'),
+        ),
+        migrations.RunPython(link_senders, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 # Create your models here.
 
 
@@ -6,8 +8,22 @@ from django.db import models
 class ChatMessage(models.Model):
     room_id = models.CharField(max_length=255)
     user = models.CharField(max_length=255)
+    # Set for messages from meeting participants (not for chatbot logs)
+    sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='meeting_chat_messages'
+    )
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Send time; set by ChatMessageBuffer.add() for buffered meeting messages, not at flush
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room_id', 'timestamp', 'id']),
+        ]
 
     def _str_(self):
         return f"{self.room_id} | {self.user}: {self.message}"
\ No newline at end of file
@@ -0,0 +1,30 @@
+# services/access.py
+"""
+Who may see a meeting's chat.
+
+The host and everyone with an open ``Participant`` row may read the history,
+get the replay and appear in presence; only the latter may change their live
+state. Used by the REST views and ``VideoConsumer`` alike.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
+
+from meetings.models import Meeting, Participant
+
+
+def meeting_access(user, room_id):
+    """(may view the chat, is an open participant) of ``user`` in meeting ``room_id``, in one query."""
+    try:
+        meeting = Meeting.objects.filter(meeting_id=room_id).annotate(
+            in_meeting=Exists(Participant.objects.filter(meeting=OuterRef('pk'), user=user, left_at__isnull=True))
+        ).values('host_id', 'in_meeting').first()
+    except ValidationError:
+        # room_id is not a meeting UUID
+        return False, False
+    if meeting is None:
+        return False, False
+    return meeting['host_id'] == user.id or meeting['in_meeting'], meeting['in_meeting']
+
+
+def can_view_meeting(user, room_id):
+    return meeting_access(user, room_id)[0]
@@ -0,0 +1,76 @@
+# services/history.py
+"""
+Meeting chat persistence and replay.
+
+Messages from ``VideoConsumer`` are buffered per process and written with
+one ``bulk_create`` every FLUSH_INTERVAL_MS or MAX_BATCH_SIZE messages.
+The last REPLAY_SIZE frames of each meeting room are also kept in a Redis
+list, encoded once, and replayed to people who join late.
+
+Configured with ``settings.MEETING_CHAT``.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from lms.buffers import WriteBehindBuffer
+from lms.redis_client import async_redis_client
+from ..models import ChatMessage
+
+DEFAULTS = {
+    'FLUSH_INTERVAL_MS': 500,
+    'MAX_BATCH_SIZE': 200,
+    'REPLAY_SIZE': 50,
+    'REPLAY_TTL_SECONDS': 24 * 60 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'MEETING_CHAT', {})}
+
+
+def _replay_key(room_id):
+    return f"meeting_chat:{room_id}"
+
+
+async def remember(room_id, frame):
+    """Add an encoded message frame to the room's replay buffer."""
+    config = get_config()
+    key = _replay_key(room_id)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.lpush(key, frame)
+        pipe.ltrim(key, 0, config['REPLAY_SIZE'] - 1)
+        pipe.expire(key, config['REPLAY_TTL_SECONDS'])
+        await pipe.execute()
+
+
+async def replay_frame(room_id):
+    """One ``history`` frame with the buffered messages, oldest first."""
+    frames = await async_redis_client.lrange(_replay_key(room_id), 0, get_config()['REPLAY_SIZE'] - 1)
+    # Entries are already JSON, so join them instead of decoding and re-encoding
+    return '{"type": "history", "messages": [' + ", ".join(reversed(frames)) + ']}'
+
+
+class ChatMessageBuffer(WriteBehindBuffer):
+    description = 'meeting chat messages'
+
+    @classmethod
+    def from_settings(cls):
+        config = get_config()
+        return cls(flush_interval_ms=config['FLUSH_INTERVAL_MS'], max_batch_size=config['MAX_BATCH_SIZE'])
+
+    def add(self, message):
+        """
+        Queue an unsaved ``ChatMessage`` for the next bulk insert and return it.
+        ``timestamp`` is stamped here, at send time, so the stored value matches
+        the one broadcast and replayed.
+        """
+        message.timestamp = timezone.now()
+        self._pending.append(message)
+        self._schedule()
+        return message
+
+    def write(self, batch):
+        ChatMessage.objects.bulk_create(batch)
+
+
+chat_message_buffer = ChatMessageBuffer.from_settings()
@@ -1,3 +1,46 @@
-from django.test import TestCase
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from authentication.models import User
+from meetings.models import Meeting, Participant
+from .consumers import VideoConsumer
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class MeetingChatAccessTests(TransactionTestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='pw')
+        self.meeting = Meeting.objects.create(host=self.host, title='Standup')
+        Participant.objects.create(meeting=self.meeting, user=self.member)
+        self.client = APIClient()
+
+    def get_history(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse('chat-history', args=[self.meeting.meeting_id]))
+
+    def test_history_for_host_and_participants(self):
+        self.assertEqual(self.get_history(self.host).status_code, 200)
+        self.assertEqual(self.get_history(self.member).status_code, 200)
+
+    def test_history_forbidden_for_non_participant(self):
+        self.assertEqual(self.get_history(self.outsider).status_code, 403)
+
+    def test_history_forbidden_after_leaving(self):
+        Participant.objects.filter(user=self.member).update(left_at=self.meeting.created_at)
+        self.assertEqual(self.get_history(self.member).status_code, 403)
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+    async def test_no_replay_or_presence_for_non_participant(self):
+        communicator = WebsocketCommunicator(VideoConsumer.as_asgi(), f"/ws/meeting/{self.meeting.meeting_id}/")
+        communicator.scope['user'] = self.outsider
+        communicator.scope['url_route'] = {'kwargs': {'room_id': str(self.meeting.meeting_id)}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        # Members get the roster and the replay right away; an outsider gets nothing
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
@@ -4,5 +4,6 @@ from . import views
 
 urlpatterns = [
     path('chatbot/', views.ChatbotView.as_view(), name='chatbot'),
+    path('<str:room_id>/presence/', views.MeetingPresenceView.as_view(), name='meeting-presence'),
     path('<str:room_id>/', views.ChatHistoryView.as_view(), name='chat-history'),
 ]
\ No newline at end of file
@@ -3,29 +3,57 @@
 from rest_framework.permissions import  IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Q
 from chat.models import ChatMessage
+from chate_box.services.presence import snapshot_sync as presence_snapshot
+from .services.access import can_view_meeting
+
+
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
 
 
 class ChatHistoryView(APIView):
+    """
+    Meeting chat history, newest first, keyset-paginated.
+    Only for the host and people who are in the meeting.
+
+    Query params:
+    - before_id: return messages older than this message (``next_before_id`` of the previous page)
+    - limit: page size (default 20, max 100)
+    """
     permission_classes = [IsAuthenticated]
-    
+
     def get(self, request, room_id):
-        # Pagination params
-        page = int(request.GET.get("page", 1))
-        page_size = int(request.GET.get("limit", 20))
-        offset = (page - 1) * page_size
+        if not can_view_meeting(request.user, room_id):
+            return Response({"error": "You are not in this meeting"}, status=403)
 
-        # Filter messages for the room, latest first
-        messages_qs = ChatMessage.objects.filter(room_id=room_id).order_by("-timestamp")
-        total = messages_qs.count()
+        try:
+            page_size = min(max(int(request.GET.get("limit", HISTORY_DEFAULT_LIMIT)), 1), HISTORY_MAX_LIMIT)
+            before_id = int(request.GET["before_id"]) if request.GET.get("before_id") else None
+        except ValueError:
+            return Response({"error": "limit and before_id must be integers"}, status=400)
 
-        # Paginating
-        messages = messages_qs[offset:offset + page_size]
+        # Filter messages for the room, latest first
+        messages_qs = ChatMessage.objects.filter(room_id=room_id).select_related("sender")
+        if before_id is not None:
+            cursor = messages_qs.filter(id=before_id).values_list("timestamp", flat=True).first()
+            if cursor is None:
+                return Response({"error": "before_id not found in this room"}, status=400)
+            messages_qs = messages_qs.filter(
+                Q(timestamp__lt=cursor) | Q(timestamp=cursor, id__lt=before_id)
+            )
+        messages = list(messages_qs.order_by("-timestamp", "-id")[:page_size + 1])
+        has_more = len(messages) > page_size
+        messages = messages[:page_size]
 
         # Response
         data = [
             {
+                "id": msg.id,
                 "user": msg.user,
+                "first_name": msg.sender.first_name if msg.sender else None,
+                "user_id": str(msg.sender_id) if msg.sender_id else None,
                 "message": msg.message,
                 "timestamp": msg.timestamp
             }
@@ -34,12 +62,29 @@ class ChatHistoryView(APIView):
 
         return Response({
             "messages": data,
-            "total": total,
-            "page": page,
+            "has_more": has_more,
+            "next_before_id": messages[-1].id if has_more else None,
             "limit": page_size
         })
 
 
+class MeetingPresenceView(APIView):
+    """
+    Users currently connected to the meeting socket (``ws/meeting/<room_id>/``).
+    Only for the host and people who are in the meeting.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, room_id):
+        if not can_view_meeting(request.user, room_id):
+            return Response({"error": "You are not in this meeting"}, status=403)
+
+        return Response({
+            "room_id": room_id,
+            "users": presence_snapshot("meeting", room_id)
+        })
+
+
 class ChatbotView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import ChatRoom, Message, MessageRead
+from .models import ChatRoom, Message, MessageRead, RoomReadState, BlockedTerm
 from job_board.models import JobApplication
 
 # ---------------- ChatRoom Admin ----------------
@@ -72,3 +72,19 @@ class MessageReadAdmin(admin.ModelAdmin):
     def message_id(self, obj):
         return obj.message.id
     message_id.short_description = 'Message ID'
+
+
+@admin.register(RoomReadState)
+class RoomReadStateAdmin(admin.ModelAdmin):
+    list_display = ['room', 'user', 'last_read_message_id', 'last_read_seq', 'updated_at']
+    raw_id_fields = ['room', 'user']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(BlockedTerm)
+class BlockedTermAdmin(admin.ModelAdmin):
+    list_display = ['term', 'room_type', 'is_active', 'updated_at']
+    list_filter = ['room_type', 'is_active']
+    list_editable = ['is_active']
+    search_fields = ['term']
+    readonly_fields = ['created_at', 'updated_at']
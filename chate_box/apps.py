@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChateBoxConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chate_box'
+
+    def ready(self):
+        # Import signals so they get registered
+        import chate_box.signals
@@ -1,21 +1,39 @@
 # consumers.py
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from asgiref.sync import sync_to_async
-from django.utils import timezone
 import json
 import logging
-from .models import ChatRoom, Message, MessageRead
+from urllib.parse import parse_qs
+from .models import ChatRoom, Message
 from django.contrib.auth import get_user_model
-from .services.content_filter import filter_message
+from .services.filter_executor import filter_executor, FilterUnavailable
+from .services.message_buffer import message_buffer
+from .services.read_receipts import read_receipt_buffer
+from .services.fanout import encode_frame, group_send_frame
+from .services.read_receipts import read_positions
+from .services import sequence
+from .services.sequence import next_seq
+from .services import rate_limit
+from .services.presence import PresenceTracker, snapshot as presence_snapshot
+from .serializers import MessageSerializer
+from .views import VISIBLE_MESSAGE_STATUSES
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Most messages sent in one messages.resume frame; clients ask again when has_more
+RESUME_LIMIT = 200
+
+# Frames that also count against the user's rate limit shared across workers
+USER_RATE_LIMITED_EVENTS = ("message.send", "messages.resume")
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        self.presence = None
         self.user = self.scope.get("user")
+        # role / teacher_id / student_id preloaded by JWTAuthMiddleware
+        self.profile = self.scope.get("user_profile") or {}
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
         # Ensure room_id is string
         self.room_id_str = str(self.room_id)
@@ -27,10 +45,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         try:
             # Check if user is participant
-            is_allowed = await self.is_user_allowed(self.user.id, self.room_id_str)
-            if not is_allowed:
+            self.room_type = await self.get_room_type(self.user.id, self.room_id_str)
+            if self.room_type is None:
                 await self.close(code=4003)
                 return
+            self.rate_limiter = rate_limit.ConnectionLimiter(self.user.id, self.room_type)
 
             await self.channel_layer.group_add(
                 self.room_group_name,
@@ -39,6 +58,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             await self.accept()
             logger.info(f"User {self.user.id} connected to room {self.room_id_str}")
+
+            self.presence = PresenceTracker("chat", self.room_id_str, {
+                "user_id": str(self.user.id),
+                "username": self.user.username,
+                "first_name": self.user.first_name,
+                "role": self.profile.get("role", self.user.role),
+            }, self.channel_layer, self.room_group_name)
+            await self.presence.start()
+            await self.send_presence_snapshot()
+
+            # ?since=<seq>: replay what was missed before any live frame is delivered
+            since = parse_qs(self.scope.get("query_string", b"").decode()).get("since")
+            if since:
+                await self.send_resume(since[0])
         except Exception as e:
             logger.error(f"Error in connect: {e}")
             await self.close(code=4004)
@@ -49,169 +82,199 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
+        if self.presence:
+            await self.presence.stop()
+
+        if message_buffer.flush_on_disconnect:
+            await message_buffer.flush()
+            await read_receipt_buffer.flush()
+
     @database_sync_to_async
-    def is_user_allowed(self, user_id, room_id_str):
+    def get_room_type(self, user_id, room_id_str):
+        """Room type if the user is a participant of the active room, else None"""
         try:
-            room = ChatRoom.objects.get(id=room_id_str, is_active=True)
-            return room.participants.filter(id=user_id).exists()
-        except (ChatRoom.DoesNotExist, ValueError):
-            return False
+            return ChatRoom.objects.filter(
+                id=room_id_str, is_active=True, participants__id=user_id
+            ).values_list('room_type', flat=True).first()
+        except ValueError:
+            return None
 
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
             event_type = data.get("type")
 
+            retry_after = await self.rate_limiter.check(shared=event_type in USER_RATE_LIMITED_EVENTS)
+            if retry_after:
+                await self.handle_throttled(event_type, retry_after)
+                return
+
             if event_type == "message.send":
                 await self.handle_send_message(data)
-            elif event_type == "message.read":
+            elif event_type in ("message.read", "message.read_up_to"):
                 await self.handle_read_message(data)
+            elif event_type == "messages.resume":
+                await self.send_resume(data.get("since"))
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {e}")
         except Exception as e:
             logger.error(f"Error in receive: {e}")
 
+    async def handle_throttled(self, event_type, retry_after):
+        """Tell the client to back off, or drop the connection if it keeps ignoring that"""
+        if self.rate_limiter.exceeded:
+            logger.warning(f"Closing rate limited connection of user {self.user.id} in room {self.room_id_str}")
+            await rate_limit.record("closed", self.room_type)
+            await self.close(code=rate_limit.CLOSE_CODE)
+            return
+
+        await self.send(text_data=encode_frame({
+            "type": "rate_limited",
+            "event": event_type,
+            "retry_after_ms": retry_after,
+        }))
+
     async def handle_send_message(self, data):
         content = data.get("content")
         if not content:
             return
 
         try:
-            # Filter content
-            filtered_content, has_forbidden, blocked_type = await sync_to_async(filter_message)(content)
+            # Filter content; if the filter is backed up the message is not sent at all
+            try:
+                filtered_content, has_forbidden, blocked_type = await filter_executor.filter(content, self.room_type)
+            except FilterUnavailable as e:
+                await self.send(text_data=encode_frame({
+                    "type": "message.held",
+                    "reason": e.reason,
+                    "content": content,
+                }))
+                return
 
-            # Save message
-            msg_data = await self.save_message(
-                user_id=self.user.id,
+            # Queue message; it gets its id now and is written in the next batch
+            msg = await message_buffer.add(Message(
                 room_id=self.room_id_str,
-                original_content=content,
-                filtered_content=filtered_content,
-                has_forbidden=has_forbidden,
-                blocked_type=blocked_type
-            )
-
-            await self.mark_as_delivered(msg_data['id'])
+                sender_id=self.user.id,
+                seq=await next_seq(self.room_id_str),
+                content=filtered_content,
+                original_content=content if has_forbidden else "",
+                has_forbidden_content=has_forbidden,
+                blocked_content_type=blocked_type,
+                status="delivered"
+            ))
 
             # Create simple serialized data with all strings
             serialized = {
-                'id': str(msg_data['id']),  # Ensure ID is string
+                'id': str(msg.id),  # Ensure ID is string
+                'seq': msg.seq,
                 'room': self.room_id_str,  # Use string room ID
                 'sender': {
                     'id': str(self.user.id),
-                    'username': msg_data['sender_username'],
-                    'role': self.user.role,
-                    'teacher_id': str(getattr(self.user.teacher_profile, 'teacher_id', None)),
-                    'student_id': str(getattr(self.user.student_profile, 'student_id', None)),
+                    'username': self.user.username,
+                    'role': self.profile.get('role', self.user.role),
+                    'teacher_id': str(self.profile.get('teacher_id')),
+                    'student_id': str(self.profile.get('student_id')),
                 },
-                'message_type': msg_data['message_type'],
-                'content': msg_data['content'],
-                'original_content': msg_data['original_content'],
-                'status': msg_data['status'],
-                'has_forbidden_content': msg_data['has_forbidden_content'],
-                'blocked_content_type': msg_data['blocked_content_type'],
+                'message_type': msg.message_type,
+                'content': msg.content,
+                'original_content': msg.original_content,
+                'status': "blocked" if has_forbidden else "sent",
+                'has_forbidden_content': msg.has_forbidden_content,
+                'blocked_content_type': msg.blocked_content_type,
                 'read_by_users': [],
                 'is_read_by_me': False
             }
 
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "chat.message",
-                    "message": serialized
-                }
-            )
+            await group_send_frame(self.channel_layer, self.room_group_name, {
+                "type": "message.new",
+                "message": serialized
+            })
         except Exception as e:
             logger.error(f"Error in handle_send_message: {e}")
 
     async def handle_read_message(self, data):
+        """Reading a message marks everything up to it as read (coalesced and broadcast in batches)"""
         message_id = data.get("message_id")
         if not message_id:
             return
 
         try:
-            await self.mark_as_read(message_id, self.user.id)
-
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "chat.read",
-                    "message_id": str(message_id),
-                    "user_id": str(self.user_id) # Ensure string
-                }
-            )
+            read_receipt_buffer.add(self.room_id_str, self.user.id, message_id)
         except Exception as e:
             logger.error(f"Error in handle_read_message: {e}")
 
-    async def chat_message(self, event):
+    async def send_presence_snapshot(self):
+        """Who is in the room right now; later changes arrive as presence.join / presence.leave"""
         try:
-            await self.send(text_data=json.dumps({
-                "type": "message.new",
-                "message": event["message"]
+            await self.send(text_data=encode_frame({
+                "type": "presence.snapshot",
+                "room": self.room_id_str,
+                "users": await presence_snapshot("chat", self.room_id_str),
             }))
         except Exception as e:
-            logger.error(f"Error in chat_message: {e}")
+            logger.error(f"Error in send_presence_snapshot: {e}")
 
-    async def chat_read(self, event):
+    async def send_resume(self, since):
+        """Send the messages after ``since`` (a seq) in one messages.resume frame"""
         try:
-            await self.send(text_data=json.dumps({
-                "type": "message.read",
-                "message_id": event["message_id"],
-                "user_id": event["user_id"]
+            since = int(since)
+        except (TypeError, ValueError):
+            return
+
+        try:
+            # Our own unflushed messages must be visible to the query
+            await message_buffer.flush()
+            messages, has_more, durable, head_seq = await self.get_messages_since(since)
+            await self.send(text_data=encode_frame({
+                "type": "messages.resume",
+                "room": self.room_id_str,
+                "messages": messages,
+                "last_seq": durable,
+                "has_more": has_more,
             }))
+            if not has_more and durable < head_seq:
+                # Seqs after ``durable`` are taken but still in another worker's buffer
+                await self.send(text_data=encode_frame({
+                    "type": "messages.gap",
+                    "room": self.room_id_str,
+                    "after_seq": durable,
+                    "head_seq": head_seq,
+                    "retry_after_ms": int(sequence.settle_seconds() * 1000),
+                }))
         except Exception as e:
-            logger.error(f"Error in chat_read: {e}")
+            logger.error(f"Error in send_resume: {e}")
 
     @database_sync_to_async
-    def save_message(self, user_id, room_id, original_content, filtered_content, has_forbidden, blocked_type):
-        from django.db import transaction
-
-        with transaction.atomic():
-            user = User.objects.get(id=user_id)
-            room = ChatRoom.objects.get(id=self.room_id)
-
-            # Determine role without triggering related queries
-            role = getattr(user, "role", "unknown")
-
-            msg = Message.objects.create(
-                room=room,
-                sender=user,
-                content=filtered_content,
-                original_content=original_content if has_forbidden else "",
-                has_forbidden_content=has_forbidden,
-                blocked_content_type=blocked_type,
-                status="blocked" if has_forbidden else "sent"
-            )
-
-            room.updated_at = timezone.now()
-            room.save(update_fields=["updated_at"])
-
-            # Return as dict with all values as strings or simple types
-            return {
-                'id': msg.id,
-                'sender_id': str(user.id),
-                'sender_username': user.username,
-                'sender_role': role,
-                'message_type': msg.message_type,
-                'content': msg.content,
-                'original_content': msg.original_content,
-                'status': msg.status,
-                'has_forbidden_content': msg.has_forbidden_content,
-                'blocked_content_type': msg.blocked_content_type,
-                'created_at': msg.created_at,
-            }
+    def get_messages_since(self, since):
+        room = ChatRoom(id=self.room_id_str)
+        head_seq, assigned_at = sequence.head(self.room_id_str)
+        # Every status counts when looking for holes; blocked messages are stored too
+        stored = list(
+            room.messages.filter(seq__gt=since).order_by('seq')
+            .values_list('seq', 'created_at')[:RESUME_LIMIT + 1]
+        )
+        has_more = len(stored) > RESUME_LIMIT
+        stored = stored[:RESUME_LIMIT]
+        durable = sequence.durable_seq(stored, since, head_seq, assigned_at)
+        if has_more and durable < stored[-1][0]:
+            has_more = False
+        if not has_more and stored and not head_seq:
+            # Counter lost and not re-seeded yet; what is stored is all there is
+            head_seq = stored[-1][0]
 
-    @database_sync_to_async
-    def mark_as_delivered(self, message_id):
-        Message.objects.filter(id=message_id).update(status="delivered")
+        messages = (
+            room.messages.filter(seq__gt=since, seq__lte=durable, status__in=VISIBLE_MESSAGE_STATUSES)
+            .select_related('sender', 'sender__teacher_profile', 'sender__student_profile')
+            .order_by('seq')
+        )
+        serializer = MessageSerializer(messages, many=True, context={
+            'user': self.user, 'read_positions': read_positions(room)
+        })
+        return serializer.data, has_more, durable, head_seq
 
-    @database_sync_to_async
-    def mark_as_read(self, message_id, user_id):
+    async def chat_frame(self, event):
+        """Forward a frame encoded once by the sender (see services/fanout.py)"""
         try:
-            message = Message.objects.select_related("room").get(id=message_id)
-            if str(message.room.id) != self.room_id_str:
-                return
-            if not message.room.participants.filter(id=user_id).exists():
-                return
-            MessageRead.objects.get_or_create(message=message, user_id=user_id)
-        except Message.DoesNotExist:
-            return
\ No newline at end of file
+            await self.send(text_data=event["frame"])
+        except Exception as e:
+            logger.error(f"Error in chat_frame: {e}")
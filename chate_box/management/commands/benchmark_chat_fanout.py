@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from chate_box.services.fanout_benchmark import measure
+
+
+class Command(BaseCommand):
+    help = 'Benchmark CPU per delivered chat message for a room broadcast (nested dict vs pre-encoded frame)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500, help='Sockets in the room')
+        parser.add_argument('--processes', type=int, default=4, help='ASGI worker processes the members are spread over')
+        parser.add_argument('--iterations', type=int, default=200, help='Messages broadcast per run')
+
+    def handle(self, *args, **options):
+        result = measure(
+            members=options['members'],
+            processes=options['processes'],
+            iterations=options['iterations'],
+        )
+
+        self.stdout.write(f"Room of {options['members']} members over {options['processes']} processes")
+        self.stdout.write(f"Before (json.dumps per member): {result['before']:.2f} µs CPU per delivered message")
+        self.stdout.write(f"After (encoded once):           {result['after']:.2f} µs CPU per delivered message")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {result['before'] / result['after']:.1f}x"))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from chate_box.services.filter_benchmark import run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the chat content filter (messages per second before and after the single-pass engine)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=20000,
+            help='Number of synthetic chat messages to add to the sample messages',
+        )
+        parser.add_argument(
+            '--forbidden-ratio',
+            type=float,
+            default=0.1,
+            help='Share of synthetic messages that contain forbidden content',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per engine; the best run is reported',
+        )
+
+    def handle(self, *args, **options):
+        result = run_benchmark(
+            size=options['size'],
+            forbidden_ratio=options['forbidden_ratio'],
+            repeat=options['repeat'],
+        )
+
+        self.stdout.write(f"Corpus: {result['messages']} messages")
+        self.stdout.write(f"Before (legacy):      {result['before_msgs_per_sec']:,.0f} msgs/s")
+        self.stdout.write(f"After (single-pass):  {result['after_msgs_per_sec']:,.0f} msgs/s")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {result['speedup']:.1f}x"))
+
+        mismatches = result['mismatches']
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'{len(mismatches)} distinct messages filtered differently:'))
+            for text in mismatches[:10]:
+                self.stdout.write(f'  {text!r}')
+        else:
+            self.stdout.write(self.style.SUCCESS('Both engines produce identical results on the corpus'))
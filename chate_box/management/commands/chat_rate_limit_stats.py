@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from lms.redis_client import redis_client
+from chate_box.services.rate_limit import STATS_KEY
+
+
+class Command(BaseCommand):
+    help = 'Show how often chat websockets were throttled or closed by the rate limiter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Clear the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        stats = redis_client.hgetall(STATS_KEY)
+        if not stats:
+            self.stdout.write('No throttling recorded')
+        for field in sorted(stats):
+            event, room_type = field.rsplit(':', 1)
+            self.stdout.write(f'{event:<22} {room_type:<10} {int(stats[field]):>10,}')
+
+        if options['reset']:
+            redis_client.delete(STATS_KEY)
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from chate_box.services.filter_executor import MODES
+from chate_box.services.filter_load_test import run_load_test
+
+
+class Command(BaseCommand):
+    help = 'Event-loop latency while filtering chat messages at a fixed rate with each filter executor'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            action='append',
+            choices=MODES,
+            help='Executor to test (repeatable); all by default',
+        )
+        parser.add_argument('--rate', type=int, default=1000, help='Messages per second')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per executor')
+        parser.add_argument(
+            '--long-ratio',
+            type=float,
+            default=0.05,
+            help='Share of ~5 KB pasted messages in the load',
+        )
+        parser.add_argument('--workers', type=int, default=2, help='Thread / process pool size')
+        parser.add_argument('--max-pending', type=int, default=500, help='Backlog before messages are held')
+        parser.add_argument('--timeout-ms', type=int, default=2000, help='Filter timeout per message')
+
+    def handle(self, *args, **options):
+        results = run_load_test(
+            modes=options['mode'] or MODES,
+            rate=options['rate'],
+            duration=options['duration'],
+            long_ratio=options['long_ratio'],
+            max_workers=options['workers'],
+            max_pending=options['max_pending'],
+            timeout_ms=options['timeout_ms'],
+        )
+
+        self.stdout.write(
+            f"{'mode':<8} {'msgs/s':>8} {'held':>6} {'filter p50':>11} {'filter p99':>11}"
+            f" {'lag p50':>9} {'lag p99':>9} {'lag max':>9}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<8} {result['achieved_rate']:>8,.0f} {result['held']:>6}"
+                f" {result['filter_p50_ms']:>9.2f}ms {result['filter_p99_ms']:>9.2f}ms"
+                f" {result['lag_p50_ms']:>7.2f}ms {result['lag_p99_ms']:>7.2f}ms {result['lag_max_ms']:>7.2f}ms"
+            )
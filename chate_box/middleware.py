@@ -1,17 +1,102 @@
 from urllib.parse import parse_qs
-import jwt
+import json
+import threading
+
+from cachetools import TTLCache
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from authentication.models import User
-from rest_framework_simplejwt.tokens import UntypedToken, AccessToken
+from lms.redis_client import async_redis_client, invalidate_generation, read_generation_async, set_if_generation_async
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Fields kept for websocket users; anything else is loaded lazily on access.
+# Model field order, as required by Model.from_db().
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {'id', 'username', 'email', 'first_name', 'last_name', 'role',
+                         'is_active', 'is_staff', 'is_superuser', 'is_verified'}
+]
+
+WEBSOCKET_AUTH = {
+    'LOCAL_CACHE_SIZE': 10000,
+    # Invalidations only reach the shared tier, so other workers' LRUs stay
+    # stale until this expires; keep it short.
+    'LOCAL_CACHE_TTL': 5,
+    'SHARED_CACHE_TTL': 300,
+    **getattr(settings, 'WEBSOCKET_AUTH', {}),
+}
+
+_local_users = TTLCache(maxsize=WEBSOCKET_AUTH['LOCAL_CACHE_SIZE'], ttl=WEBSOCKET_AUTH['LOCAL_CACHE_TTL'])
+_local_lock = threading.Lock()
+
+
+def _cache_key(user_id):
+    return f"ws_user:{user_id}"
+
+
+def load_identity(user_id):
+    """User fields plus the profile ids consumers need, in one query"""
+    user = User.objects.select_related('teacher_profile', 'student_profile').get(id=user_id)
+    teacher_profile = getattr(user, 'teacher_profile', None)
+    student_profile = getattr(user, 'student_profile', None)
+    identity = {field: getattr(user, field) for field in USER_FIELDS}
+    identity['teacher_id'] = teacher_profile.teacher_id if teacher_profile else None
+    identity['student_id'] = student_profile.student_id if student_profile else None
+    return identity
+
+
+def _decode_identity(raw):
+    identity = json.loads(raw)
+    identity['id'] = User._meta.pk.to_python(identity['id'])
+    return identity
+
+
+async def get_identity(user_id):
+    """Resolve a user through the in-process LRU, then Redis, then the DB"""
+    key = _cache_key(user_id)
+    with _local_lock:
+        identity = _local_users.get(key)
+    if identity is None:
+        raw = await async_redis_client.get(key)
+        if raw is None:
+            # Only cached if no invalidation ran while we were reading the database
+            generation = await read_generation_async(key)
+            identity = await database_sync_to_async(load_identity)(user_id)
+            await set_if_generation_async(
+                key, json.dumps(identity, cls=DjangoJSONEncoder), WEBSOCKET_AUTH['SHARED_CACHE_TTL'], generation
+            )
+        else:
+            identity = _decode_identity(raw)
+        with _local_lock:
+            _local_users[key] = identity
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Drop a cached user; other processes' LRUs expire within LOCAL_CACHE_TTL"""
+    key = _cache_key(user_id)
+    with _local_lock:
+        _local_users.pop(key, None)
+    invalidate_generation(key)
+
+
+def user_from_identity(identity):
+    return User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, [identity[field] for field in USER_FIELDS])
 
 
 class JWTAuthMiddleware(BaseMiddleware):
     """
     Custom middleware for JWT authentication in WebSockets.
     Expects JWT token as a query param: ws://.../ws/chat/<room_id>/?token=JWT
+
+    The token is decoded once and the user is resolved from cache, so
+    reconnect storms do not hit the database. Besides ``scope['user']`` it
+    sets ``scope['user_profile']`` with role, teacher_id and student_id so
+    consumers never touch the profile relations inside the event loop.
     """
 
     async def __call__(self, scope, receive, send):
@@ -19,22 +104,23 @@ class JWTAuthMiddleware(BaseMiddleware):
         query_string = parse_qs(scope["query_string"].decode())
         token = query_string.get("token")
 
+        scope['user'] = AnonymousUser()
+        scope['user_profile'] = {}
+
         if token:
             try:
-                # Validate token
-                UntypedToken(token[0])
-
-                # Decode token
+                # Validate and decode token
                 payload = AccessToken(token[0])
-                user_id = payload["user_id"]
-
-                # Get user
-                user = await database_sync_to_async(User.objects.get)(id=user_id)
-                scope['user'] = user
+                identity = await get_identity(payload[settings.SIMPLE_JWT['USER_ID_CLAIM']])
+                if identity['is_active']:
+                    scope['user'] = user_from_identity(identity)
+                    scope['user_profile'] = {
+                        'role': identity['role'],
+                        'teacher_id': identity['teacher_id'],
+                        'student_id': identity['student_id'],
+                    }
             except Exception:
-                scope['user'] = AnonymousUser()
-        else:
-            scope['user'] = AnonymousUser()
+                pass
 
         return await super().__call__(scope, receive, send)
 
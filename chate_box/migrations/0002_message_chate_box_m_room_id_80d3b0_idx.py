@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='chate_box_m_room_id_80d3b0_idx'),
+        ),
+    ]
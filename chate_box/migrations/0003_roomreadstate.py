@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_read_states(apps, schema_editor):
+    """Collapse per-message MessageRead rows into one watermark per (room, user)."""
+    MessageRead = apps.get_model('chate_box', 'MessageRead')
+    RoomReadState = apps.get_model('chate_box', 'RoomReadState')
+
+    watermarks = {}
+    reads = MessageRead.objects.values_list(
+        'message__room_id', 'user_id', 'message_id', 'message__created_at'
+    ).iterator()
+    for room_id, user_id, message_id, created_at in reads:
+        key = (room_id, user_id)
+        if key not in watermarks or (created_at, message_id) > watermarks[key]:
+            watermarks[key] = (created_at, message_id)
+
+    RoomReadState.objects.bulk_create([
+        RoomReadState(room_id=room_id, user_id=user_id, last_read_at=created_at, last_read_message_id=message_id)
+        for (room_id, user_id), (created_at, message_id) in watermarks.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0002_message_chate_box_m_room_id_80d3b0_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='chate_box.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('room', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
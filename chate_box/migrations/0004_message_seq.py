@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_seq(apps, schema_editor):
+    """Number existing messages 1, 2, 3, ... per room in (created_at, id) order."""
+    Message = apps.get_model('chate_box', 'Message')
+
+    # order_by() drops Meta.ordering, which would otherwise add created_at to the DISTINCT
+    room_ids = Message.objects.order_by().values_list('room_id', flat=True).distinct()
+    for room_id in room_ids.iterator():
+        batch = []
+        messages = Message.objects.filter(room_id=room_id).order_by('created_at', 'id').only('id')
+        for seq, message in enumerate(messages.iterator(), start=1):
+            message.seq = seq
+            batch.append(message)
+            if len(batch) >= 1000:
+                Message.objects.bulk_update(batch, ['seq'])
+                batch = []
+        if batch:
+            Message.objects.bulk_update(batch, ['seq'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0003_roomreadstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'seq'], name='chate_box_m_room_id_10f2ec_idx'),
+        ),
+        migrations.RunPython(backfill_seq, migrations.RunPython.noop),
+    ]
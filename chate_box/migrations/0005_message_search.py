@@ -0,0 +1,98 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    CREATE FUNCTION chate_box_message_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('simple', coalesce(NEW.content, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER chate_box_message_search_update
+    BEFORE INSERT OR UPDATE OF content, search_vector ON chate_box_message
+    FOR EACH ROW EXECUTE FUNCTION chate_box_message_search_update()
+    """,
+    "UPDATE chate_box_message SET search_vector = to_tsvector('simple', coalesce(content, ''))",
+    "CREATE INDEX IF NOT EXISTS chate_box_message_search_idx ON chate_box_message USING gin (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS chate_box_message_search_idx",
+    "DROP TRIGGER IF EXISTS chate_box_message_search_update ON chate_box_message",
+    "DROP FUNCTION IF EXISTS chate_box_message_search_update()",
+]
+
+# External-content FTS5 table mirroring chate_box_message.content (local development)
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE chate_box_message_fts USING fts5(
+        content, content='chate_box_message', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER chate_box_message_fts_insert AFTER INSERT ON chate_box_message BEGIN
+        INSERT INTO chate_box_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chate_box_message_fts_delete AFTER DELETE ON chate_box_message BEGIN
+        INSERT INTO chate_box_message_fts(chate_box_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chate_box_message_fts_update AFTER UPDATE OF content ON chate_box_message BEGIN
+        INSERT INTO chate_box_message_fts(chate_box_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO chate_box_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    "INSERT INTO chate_box_message_fts(chate_box_message_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS chate_box_message_fts_insert",
+    "DROP TRIGGER IF EXISTS chate_box_message_fts_delete",
+    "DROP TRIGGER IF EXISTS chate_box_message_fts_update",
+    "DROP TABLE IF EXISTS chate_box_message_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def _run(schema_editor, backward):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for sql in statements[1 if backward else 0]:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, backward=False)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, backward=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0004_message_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0005_message_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('room_type', models.CharField(blank=True, choices=[('course', 'Course Discussion'), ('meeting', 'Meeting Chat'), ('job', 'Job Discussion'), ('general', 'General Chat')], help_text='Leave empty to block the term in every room type', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['term'],
+                'unique_together': {('term', 'room_type')},
+            },
+        ),
+    ]
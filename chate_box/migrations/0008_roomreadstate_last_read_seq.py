@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_read_seq(apps, schema_editor):
+    """Each watermark's seq is the seq of the message it points at."""
+    Message = apps.get_model('chate_box', 'Message')
+    RoomReadState = apps.get_model('chate_box', 'RoomReadState')
+    message_seq = Message.objects.filter(
+        id=OuterRef('last_read_message_id'), room_id=OuterRef('room_id')
+    ).values('seq')[:1]
+    RoomReadState.objects.update(last_read_seq=Coalesce(Subquery(message_seq), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0007_message_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomreadstate',
+            name='last_read_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_last_read_seq, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='roomreadstate',
+            name='last_read_at',
+        ),
+    ]
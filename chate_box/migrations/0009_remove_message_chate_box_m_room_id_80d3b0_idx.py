@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chate_box', '0008_roomreadstate_last_read_seq'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chate_box_m_room_id_80d3b0_idx',
+        ),
+    ]
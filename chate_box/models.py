@@ -1,5 +1,7 @@
 # models.py
 from django.db import models
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 # from django.conf import settings
 from authentication.models import User
 import re
@@ -56,6 +58,10 @@ class Message(models.Model):
     message_type = models.CharField(max_length=10, choices=MESSAGE_TYPES, default='text')
     content = models.TextField()
     original_content = models.TextField(blank=True)  # Store original before filtering
+    # Position in the room (1, 2, 3, ...) so clients can detect and fetch missed messages
+    seq = models.BigIntegerField(null=True, blank=True)
+    # Kept up to date by a database trigger on PostgreSQL, see services/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     # Message status and moderation
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='sent')
@@ -68,19 +74,22 @@ class Message(models.Model):
         help_text="Comma-separated list of blocked content types: email, phone, social_link"
     )
 
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamps; created_at is the send time, set before write-behind buffering
+    created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['room', 'seq']),
+        ]
 
     def __str__(self):
         return f"{self.sender.username} in {self.room.name}: {self.content[:50]}..."
 
 
 class MessageRead(models.Model):
-    """Track message read status for each user"""
+    """Legacy per-message read receipts, superseded by RoomReadState and no longer written"""
     message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='read_by')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     read_at = models.DateTimeField(auto_now_add=True)
@@ -90,3 +99,49 @@ class MessageRead(models.Model):
 
     def __str__(self):
         return f"{self.user.username} read {self.message.id}"
+
+
+class RoomReadState(models.Model):
+    """
+    Read watermark of a user in a room: every message with ``seq`` at or
+    below ``last_read_seq`` has been read by the user.
+    """
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='read_states')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_states')
+    last_read_message_id = models.BigIntegerField(default=0)
+    last_read_seq = models.BigIntegerField(default=0)  # seq of that message
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['room', 'user']
+
+    def has_read(self, message):
+        return message.seq is not None and message.seq <= self.last_read_seq
+
+    def __str__(self):
+        return f"{self.user.username} read {self.room.name} up to {self.last_read_message_id}"
+
+
+class BlockedTerm(models.Model):
+    """
+    Forbidden keyword for chat moderation (platform names, payment handles, ...).
+    Matched case-insensitively and through common obfuscations, see
+    services/blocklist.py.
+    """
+    term = models.CharField(max_length=100)
+    room_type = models.CharField(
+        max_length=20,
+        choices=ChatRoom.ROOM_TYPES,
+        blank=True,
+        help_text="Leave empty to block the term in every room type"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['term']
+        unique_together = ['term', 'room_type']
+
+    def __str__(self):
+        return f"{self.term} ({self.room_type or 'all rooms'})"
@@ -0,0 +1,173 @@
+# multiplex.py
+"""
+One websocket per client for every realtime feature.
+
+Instead of a socket (and JWT handshake) each for chat rooms, meetings and
+alerts, clients open ``ws/`` once and subscribe to named streams:
+
+    -> {"type": "subscribe", "stream": "chat:12", "since": 340}
+    <- {"type": "subscribed", "stream": "chat:12"}
+    -> {"stream": "chat:12", "payload": {"type": "message.send", "content": "hi"}}
+    <- {"stream": "chat:12", "payload": {"type": "message.new", ...}}
+    -> {"type": "unsubscribe", "stream": "chat:12"}
+    <- {"type": "unsubscribed", "stream": "chat:12", "code": 1000}
+
+Streams: ``chat:<room_id>`` (ChatConsumer), ``meeting:<room_id>``
+(VideoConsumer) and ``alerts`` (AlertConsumer). Each subscription runs the
+existing consumer class in-process, sharing this socket's scope (already
+authenticated by JWTAuthMiddleware) and its single channel-layer channel.
+Events are routed back to the subscription by the ``group`` they were sent
+to (see services/fanout.py), or by handler name when that is unambiguous.
+
+Live class heartbeats go over the ``alerts`` stream:
+
+    -> {"stream": "alerts", "payload": {"type": "heartbeat", "meeting_id": 7}}
+"""
+import json
+import logging
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from alerts.consumers import AlertConsumer
+from chat.consumers import VideoConsumer
+from .consumers import ChatConsumer
+
+logger = logging.getLogger(__name__)
+
+# stream kind -> (consumer class, whether the stream names a room)
+STREAMS = {
+    'chat': (ChatConsumer, True),
+    'meeting': (VideoConsumer, True),
+    'alerts': (AlertConsumer, False),
+}
+
+MAX_SUBSCRIPTIONS = 50
+
+
+def _group_of(consumer):
+    return getattr(consumer, 'room_group_name', None) or getattr(consumer, 'group_name', None)
+
+
+class MultiplexConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            await self.close(code=4001)
+            return
+        self.subscriptions = {}
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for stream in list(getattr(self, 'subscriptions', {})):
+            await self.unsubscribe(stream, close_code)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}")
+            return
+
+        stream = data.get("stream")
+        event_type = data.get("type")
+        try:
+            if event_type == "subscribe":
+                await self.subscribe(stream, data)
+            elif event_type == "unsubscribe":
+                await self.unsubscribe(stream)
+            elif stream in self.subscriptions:
+                consumer = self.subscriptions[stream]
+                await consumer.receive(text_data=json.dumps(data.get("payload") or {}))
+                await self.reap(stream)
+            else:
+                await self.send_control("error", stream, error="not subscribed")
+        except Exception as e:
+            logger.error(f"Error in multiplexed receive for {stream}: {e}")
+
+    async def subscribe(self, stream, data):
+        if not isinstance(stream, str):
+            await self.send_control("error", stream, error="stream is required")
+            return
+        if stream in self.subscriptions:
+            await self.send_control("subscribed", stream)
+            return
+        if len(self.subscriptions) >= MAX_SUBSCRIPTIONS:
+            await self.send_control("error", stream, error="too many subscriptions")
+            return
+
+        kind, _, room_id = stream.partition(":")
+        consumer_class, needs_room = STREAMS.get(kind, (None, False))
+        if consumer_class is None or needs_room != bool(room_id):
+            await self.send_control("error", stream, error="unknown stream")
+            return
+
+        consumer = consumer_class()
+        consumer.scope = {
+            **self.scope,
+            "url_route": {"args": (), "kwargs": {"room_id": room_id} if needs_room else {}},
+            "query_string": f"since={data['since']}".encode() if data.get("since") is not None else b"",
+        }
+        consumer.channel_layer = self.channel_layer
+        consumer.channel_name = self.channel_name
+        consumer.base_send = self._stream_sender(stream, consumer)
+        consumer.mux_state = None
+
+        self.subscriptions[stream] = consumer
+        await consumer.connect()
+        await self.reap(stream)
+
+    async def unsubscribe(self, stream, code=1000):
+        consumer = self.subscriptions.pop(stream, None)
+        if consumer is None:
+            return
+        try:
+            await consumer.disconnect(code)
+        except Exception as e:
+            logger.error(f"Error closing stream {stream}: {e}")
+        await self.send_control("unsubscribed", stream, code=code)
+
+    async def reap(self, stream):
+        """Finish a subscription whose consumer closed itself (rejected or rate limited)"""
+        consumer = self.subscriptions.get(stream)
+        if consumer is not None and consumer.mux_state == "closed":
+            await self.unsubscribe(stream, consumer.mux_close_code)
+
+    def _stream_sender(self, stream, consumer):
+        """base_send for a hosted consumer: wraps its frames with the stream name"""
+        prefix = '{"stream": %s, "payload": ' % json.dumps(stream)
+
+        async def send(message):
+            if message["type"] == "websocket.accept":
+                consumer.mux_state = "open"
+                await self.send_control("subscribed", stream)
+            elif message["type"] == "websocket.send":
+                if consumer.mux_state == "open" and message.get("text") is not None:
+                    # Frames are already JSON, so wrap the string instead of re-encoding
+                    await self.send(text_data=prefix + message["text"] + "}")
+            elif message["type"] == "websocket.close":
+                consumer.mux_state = "closed"
+                consumer.mux_close_code = message.get("code") or 1000
+        return send
+
+    async def send_control(self, event_type, stream, **extra):
+        await self.send(text_data=json.dumps({"type": event_type, "stream": stream, **extra}))
+
+    async def dispatch(self, message):
+        if message["type"].startswith("websocket."):
+            await super().dispatch(message)
+            return
+
+        # Channel layer event for one of the subscriptions
+        group = message.get("group")
+        for stream, consumer in list(self.subscriptions.items()):
+            if consumer.mux_state != "open":
+                continue
+            if group is not None and _group_of(consumer) != group:
+                continue
+            if group is None and not hasattr(consumer, message["type"].replace(".", "_")):
+                continue
+            try:
+                await consumer.dispatch(message)
+            except Exception as e:
+                logger.error(f"Error dispatching {message['type']} to {stream}: {e}")
+            await self.reap(stream)
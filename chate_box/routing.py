@@ -1,8 +1,10 @@
 # routing.py
 from django.urls import re_path, path
-from . import consumers
+from . import consumers, multiplex
 
 websocket_urlpatterns = [
     # Accept both UUID format and integer format
     re_path(r'ws/chat/(?P<room_id>[^/]+)/$', consumers.ChatConsumer.as_asgi()),
+    # Single socket multiplexing chat rooms, meetings and alerts
+    re_path(r'ws/$', multiplex.MultiplexConsumer.as_asgi()),
 ]
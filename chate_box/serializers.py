@@ -2,7 +2,7 @@
 from rest_framework import serializers
 from job_board.models import JobApplication
 from authentication.models import User
-from .models import ChatRoom, Message, MessageRead
+from .models import ChatRoom, Message
 
 
 class ChatUserSerializer(serializers.ModelSerializer):
@@ -31,21 +31,84 @@ class ChatUserSerializer(serializers.ModelSerializer):
 
 
 class MessageSerializer(serializers.ModelSerializer):
+    """
+    Read receipts are derived from the room's read watermarks, passed in
+    context as ``read_positions`` [(user_id, last_read_seq)].
+    """
     sender = ChatUserSerializer(read_only=True)
+    read_by_users = serializers.SerializerMethodField()
+    is_read_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
         fields = [
-            'id', 'room', 'sender', 'message_type', 'content', 'original_content',
+            'id', 'seq', 'room', 'sender', 'message_type', 'content', 'original_content',
             'status', 'is_edited', 'edited_at',
             'has_forbidden_content', 'blocked_content_type', 'created_at',
-            'updated_at'
+            'updated_at', 'read_by_users', 'is_read_by_me'
         ]
         read_only_fields = [
-            'sender', 'original_content', 'status', 'has_forbidden_content',
+            'seq', 'sender', 'original_content', 'status', 'has_forbidden_content',
             'blocked_content_type', 'created_at', 'updated_at'
         ]
 
+    def get_read_by_users(self, obj):
+        if obj.seq is None:
+            return []
+        return [
+            str(user_id) for user_id, read_seq in self.context.get('read_positions', [])
+            if user_id != obj.sender_id and obj.seq <= read_seq
+        ]
+
+    def get_is_read_by_me(self, obj):
+        # ``user`` in context is used by the websocket consumer, which has no request
+        request = self.context.get('request')
+        user = request.user if request else self.context.get('user')
+        if not user or obj.seq is None:
+            return False
+        return any(
+            user_id == user.id and obj.seq <= read_seq
+            for user_id, read_seq in self.context.get('read_positions', [])
+        )
+
+
+class InboxMessageSerializer(serializers.ModelSerializer):
+    sender = ChatUserSerializer(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'message_type', 'content', 'status', 'has_forbidden_content', 'created_at']
+
+
+class MessageSearchSerializer(serializers.ModelSerializer):
+    sender = ChatUserSerializer(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = [
+            'id', 'room', 'seq', 'sender', 'message_type', 'content', 'status',
+            'has_forbidden_content', 'blocked_content_type', 'created_at', 'rank'
+        ]
+
+
+class ChatInboxSerializer(serializers.ModelSerializer):
+    """Room list entry; expects the inbox annotations and ``last_messages`` in context."""
+    last_activity = serializers.DateTimeField(source='updated_at', read_only=True)
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ChatRoom
+        fields = [
+            'id', 'name', 'room_type', 'description', 'is_active', 'course_id', 'meeting_id', 'job_id',
+            'last_activity', 'last_message', 'unread_count'
+        ]
+
+    def get_last_message(self, obj):
+        message = self.context.get('last_messages', {}).get(obj.last_message_id)
+        return InboxMessageSerializer(message).data if message else None
+
 
 class ChatRoomSerializer(serializers.ModelSerializer):
     participants = ChatUserSerializer(many=True, read_only=True)
@@ -0,0 +1,228 @@
+# services/blocklist.py
+"""
+Configurable keyword blocklist for chat moderation.
+
+All active ``BlockedTerm`` rows are compiled into one Aho-Corasick automaton,
+so a message is scanned once, in time linear in its length, however many
+terms there are.
+
+Text and terms are normalised the same way: case-folded, common character
+substitutions undone (``wh@ts4pp`` -> ``whatsapp``) and separators dropped
+(``w h a t s a p p``, ``whats.app``). Digits only stand in for letters inside
+words that also have letters, so prices, times and other plain numbers never
+match a keyword, and symbols only between two letters or digits, so the
+``@`` of ``@skype`` or the ``!`` of ``skype!`` stays a separator. A match only
+counts when it starts and ends on a word boundary of the original text, so
+"sky peace" does not match "skype".
+
+``refresh()`` polls the table at most every BLOCKLIST_REFRESH_SECONDS
+(``settings.CHAT_CONTENT_FILTER``). Only rows changed since the last poll are
+fetched; a full reload happens on first use or when rows were deleted.
+Changes made with ``QuerySet.update()`` (which skips ``updated_at``) are
+only picked up by the next full reload.
+"""
+import logging
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+# Undo common obfuscations; applied after case folding, only between letters or digits
+SUBSTITUTIONS = str.maketrans({'@': 'a', '$': 's', '!': 'i'})
+# Only within words that contain letters (see normalize_chars)
+DIGIT_SUBSTITUTIONS = str.maketrans({'4': 'a', '5': 's', '0': 'o', '1': 'i', '3': 'e', '7': 't'})
+
+DEFAULT_REFRESH_SECONDS = 10
+
+
+def normalize_char(char, in_word=True, inside=True):
+    """
+    Normalised form of one character, or '' for a separator.
+    ``in_word``: the character is part of a word with letters, so digits are read as letters.
+    ``inside``: the character sits between two letters or digits, so symbols are read as letters.
+    """
+    char = char.casefold()
+    if inside:
+        char = char.translate(SUBSTITUTIONS)
+    if in_word:
+        char = char.translate(DIGIT_SUBSTITUTIONS)
+    return char if char.isalnum() else ''
+
+
+def _inside(text, index):
+    return 0 < index < len(text) - 1 and text[index - 1].isalnum() and text[index + 1].isalnum()
+
+
+def normalize_chars(text):
+    """Yield (index into ``text``, normalised character) for every character that is kept."""
+    word_start = 0
+    for end in range(len(text) + 1):
+        if end < len(text) and not text[end].isspace():
+            continue
+        word = text[word_start:end]
+        in_word = any(char.isalpha() for char in word)
+        for index in range(word_start, end):
+            for part in normalize_char(text[index], in_word, _inside(text, index)):
+                yield index, part
+        word_start = end + 1
+
+
+def normalize(term):
+    return ''.join(part for _, part in normalize_chars(term))
+
+
+class Automaton:
+    """Aho-Corasick automaton over normalised terms."""
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        # Lengths of the terms ending at each node, including those reached through fail links
+        self.output = [()]
+        for term in terms:
+            self._insert(term)
+        self._link()
+
+    def _insert(self, term):
+        node = 0
+        for char in term:
+            child = self.goto[node].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][char] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            node = child
+        self.output[node] = (len(term),)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, chars):
+        """Yield (start, end) index pairs (inclusive) into ``chars`` of every term occurrence."""
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for index, char in enumerate(chars):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in output[node]:
+                yield index - length + 1, index
+
+
+class Blocklist:
+    def __init__(self, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        # BlockedTerm pk -> (normalised term, room_type, is_active)
+        self.entries = {}
+        # normalised term -> room types it is blocked in ('' = all)
+        self.room_types = {}
+        self.automaton = None
+        self._latest = None
+        self._checked_at = None
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'CHAT_CONTENT_FILTER', {})
+        return cls(refresh_seconds=config.get('BLOCKLIST_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS))
+
+    @property
+    def is_stale(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.refresh_seconds
+
+    def refresh(self, force=False):
+        """Pick up BlockedTerm changes (database access; call from sync code)."""
+        if not (force or self.is_stale):
+            return
+        # Imported here so content_filter stays importable before Django is set up
+        from ..models import BlockedTerm
+
+        self._checked_at = time.monotonic()
+        stats = BlockedTerm.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+        if self._latest is not None and stats['latest'] == self._latest and stats['count'] == len(self.entries):
+            return
+
+        if self._latest is None or stats['count'] < len(self.entries):
+            entries = {}
+            changed = BlockedTerm.objects.all()
+        else:
+            entries = dict(self.entries)
+            changed = BlockedTerm.objects.filter(updated_at__gte=self._latest)
+        for pk, term, room_type, is_active in changed.values_list('pk', 'term', 'room_type', 'is_active'):
+            entries[pk] = (normalize(term), room_type, is_active)
+
+        if len(entries) != stats['count']:
+            # Rows were added and deleted since the last poll; start over
+            entries = {
+                pk: (normalize(term), room_type, is_active)
+                for pk, term, room_type, is_active in BlockedTerm.objects.values_list(
+                    'pk', 'term', 'room_type', 'is_active')
+            }
+        self._build(entries)
+        self._latest = stats['latest']
+
+    def _build(self, entries):
+        room_types = {}
+        for term, room_type, is_active in entries.values():
+            if is_active and term:
+                room_types.setdefault(term, set()).add(room_type)
+        if room_types.keys() != self.room_types.keys() or self.automaton is None:
+            self.automaton = Automaton(room_types) if room_types else None
+        self.entries = entries
+        self.room_types = room_types
+        logger.info("Chat blocklist loaded with %d active terms", len(room_types))
+
+    def redact(self, text, room_type=None, replacement='[KEYWORD REMOVED]'):
+        """Replace blocked terms in ``text``; returns (text, whether anything matched)."""
+        automaton = self.automaton
+        if automaton is None or not text:
+            return text, False
+
+        chars, positions = [], []
+        for index, part in normalize_chars(text):
+            chars.append(part)
+            positions.append(index)
+
+        room_types = self.room_types
+        spans = []
+        for start, end in automaton.find(chars):
+            allowed = room_types.get(''.join(chars[start:end + 1]), ())
+            if '' not in allowed and room_type not in allowed:
+                continue
+            first, last = positions[start], positions[end]
+            if first > 0 and normalize_char(text[first - 1], inside=_inside(text, first - 1)):
+                continue
+            if last + 1 < len(text) and normalize_char(text[last + 1], inside=_inside(text, last + 1)):
+                continue
+            spans.append((first, last))
+
+        if not spans:
+            return text, False
+
+        # Leftmost, then longest, non-overlapping matches
+        spans.sort(key=lambda span: (span[0], -span[1]))
+        parts, cursor = [], 0
+        for first, last in spans:
+            if first < cursor:
+                continue
+            parts.append(text[cursor:first])
+            parts.append(replacement)
+            cursor = last + 1
+        parts.append(text[cursor:])
+        return ''.join(parts), True
+
+
+blocklist = Blocklist.from_settings()
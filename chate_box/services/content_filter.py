@@ -1,189 +1,181 @@
 # services/content_filter.py
+import logging
 import re
 
+from .blocklist import blocklist
 
-def filter_message(text: str):
+logger = logging.getLogger(__name__)
+
+# ===== PATTERNS (compiled once at import) =====
+
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+SOCIAL_PATTERN = (
+    r'(?i:(?:https?://)?(?:www\.)?'
+    r'(?:(?:facebook|fb)\.com/|twitter\.com/|instagram\.com/|linkedin\.com/|whatsapp\.com/'
+    r'|telegram\.me/|discord\.gg/|snapchat\.com/|tiktok\.com/@)[^\s]+)'
+)
+
+# 8-16 digits, each optionally followed by a single space, dash or dot
+PHONE_PATTERN = r'(?:\d[-\s.]?){7,15}\d'
+
+# One combined tokenizer: at every position an email wins over a social link,
+# which wins over a number sequence.
+TOKEN_RE = re.compile(
+    rf'(?P<email>{EMAIL_PATTERN})|(?P<social>{SOCIAL_PATTERN})|(?P<phone>{PHONE_PATTERN})'
+)
+
+# Cheap pre-check: nothing can match without a digit, an '@' or a '/'
+TRIGGER_RE = re.compile(r'[\d@/]')
+
+NON_DIGIT_RE = re.compile(r'\D')
+DIGIT_RUN_RE = re.compile(r'\d+')
+
+REPLACEMENTS = {
+    'email': '[EMAIL REMOVED]',
+    'phone': '[PHONE REMOVED]',
+    'social': '[SOCIAL LINK REMOVED]',
+    'keyword': '[KEYWORD REMOVED]',
+}
+
+# Order in which blocked types are reported
+BLOCKED_TYPE_NAMES = [('email', 'email'), ('phone', 'phone'), ('social', 'social_link'), ('keyword', 'keyword')]
+
+# Pakistani mobile network prefixes 300-359
+PAKISTANI_PREFIXES = frozenset(f'3{n:02d}' for n in range(60))
+
+
+def is_phone_number(digits: str) -> bool:
     """
-    Manual filtering for emails, phone numbers, and social links.
+    Classify a digit string as a phone number.
+    Special focus on Pakistani, Indian, and UAE phone numbers.
+    """
+    length = len(digits)
+    if length < 8:
+        return False
+
+    first = digits[0]
+
+    # UAE landline (8 digits starting with 2-4) and mobile (5XXXXXXXX)
+    if length == 8:
+        return first in '234'
+    if length == 9:
+        return first == '5'
+
+    # Pakistani mobile (03XXXXXXXXX / 3XXXXXXXXX / network prefix)
+    if length == 11 and digits.startswith('03'):
+        return True
+    if length == 10 and first == '3':
+        return True
+    if length <= 12 and digits[:3] in PAKISTANI_PREFIXES:
+        return True
+
+    # Indian mobile (6-9 followed by 9 digits)
+    if length == 10 and first in '6789':
+        return True
+
+    # Country codes: Pakistan (92), India (91), UAE (971)
+    if length >= 11 and (digits.startswith('92') or digits.startswith('91') or digits.startswith('971')):
+        return True
+
+    # General international: 10-15 digits, not all the same digit
+    return length <= 15 and digits.count(first) != length
+
+
+def _is_bounded(text, start, end):
+    """True when text[start:end] is not glued to word characters on either side."""
+    if start > 0:
+        before = text[start - 1]
+        if before.isalnum() or before == '_':
+            return False
+    if end < len(text):
+        after = text[end]
+        if after.isalnum() or after == '_':
+            return False
+    return True
+
+
+def _filter_number(text, match):
+    """Return the replacement for a number token and whether a phone was found."""
+    token = match.group()
+    digits = NON_DIGIT_RE.sub('', token)
+    length = len(digits)
+
+    if length >= 9 and is_phone_number(digits):
+        return REPLACEMENTS['phone'], True
+    if length == 8 and digits == token and _is_bounded(text, match.start(), match.end()):
+        if is_phone_number(digits):
+            return REPLACEMENTS['phone'], True
+        return token, False
+
+    # The whole sequence is not a phone number, but a plain run of 8-15
+    # digits inside it may still be one (e.g. "order 1234 5678 03001234567").
+    found = False
+    parts = []
+    last = 0
+    offset = match.start()
+    for run in DIGIT_RUN_RE.finditer(token):
+        run_digits = run.group()
+        if not 8 <= len(run_digits) <= 15:
+            continue
+        if not _is_bounded(text, offset + run.start(), offset + run.end()):
+            continue
+        if is_phone_number(run_digits):
+            parts.append(token[last:run.start()])
+            parts.append(REPLACEMENTS['phone'])
+            last = run.end()
+            found = True
+
+    if not found:
+        return token, False
+    parts.append(token[last:])
+    return ''.join(parts), True
+
+
+def filter_message(text: str, room_type: str = None):
+    """
+    Manual filtering for emails, phone numbers, and social links, plus the
+    blocklist terms configured for ``room_type`` (see services/blocklist.py).
     Special focus on Pakistani, Indian, and UAE phone numbers.
     Returns:
     - filtered_text
     - has_forbidden_content (bool)
     - blocked_content_type (comma-separated)
     """
-    blocked_types = []
-    filtered_text = text
-
-    print(f"DEBUG - Input text: '{text}'")  # Debug line
-
-    # Email pattern
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_matches = re.findall(email_pattern, text)
-    if email_matches:
-        print(f"DEBUG - Found emails: {email_matches}")  # Debug line
-        filtered_text = re.sub(email_pattern, '[EMAIL REMOVED]', filtered_text)
-        blocked_types.append('email')
-
-    # ===== COMPREHENSIVE PHONE NUMBER DETECTION =====
-
-    # First, let's find ALL number sequences that could be phone numbers
-    # This regex finds sequences of 8-15 digits, allowing spaces, dashes, dots
-    all_number_sequences = re.findall(r'(?:\d[-\s.]?){8,15}\d', text)
-
-    # Also find plain digit sequences
-    plain_digits = re.findall(r'\b\d{8,15}\b', text)
-
-    # Combine all found sequences
-    all_candidates = all_number_sequences + plain_digits
-    all_candidates = list(set(all_candidates))  # Remove duplicates
-
-    print(f"DEBUG - Number candidates: {all_candidates}")  # Debug line
-
-    phone_found = False
-
-    # Check each candidate if it looks like a phone number
-    for candidate in all_candidates:
-        # Clean the candidate (remove non-digits)
-        clean_candidate = re.sub(r'[^\d]', '', candidate)
-
-        print(f"DEBUG - Checking candidate: {candidate} -> {clean_candidate}")  # Debug line
-
-        # PAKISTANI NUMBER CHECKS
-        is_pakistani = False
-
-        # Check for Pakistani mobile (03XXXXXXXXX)
-        if len(clean_candidate) == 11 and clean_candidate.startswith('03'):
-            is_pakistani = True
-            print(f"DEBUG - Pakistani mobile detected: {clean_candidate}")
-
-        # Check for Pakistani mobile without leading 0 (3XXXXXXXXXX)
-        elif len(clean_candidate) == 10 and clean_candidate.startswith('3'):
-            is_pakistani = True
-            print(f"DEBUG - Pakistani mobile (no leading 0): {clean_candidate}")
-
-        # Check for Pakistani with country code (+92)
-        elif len(clean_candidate) >= 11 and clean_candidate.startswith('92'):
-            is_pakistani = True
-            print(f"DEBUG - Pakistani with country code: {clean_candidate}")
-
-        # Check if it contains common Pakistani mobile prefixes
-        pakistani_prefixes = ['300', '301', '302', '303', '304', '305', '306', '307', '308', '309',
-                              '310', '311', '312', '313', '314', '315', '316', '317', '318', '319',
-                              '320', '321', '322', '323', '324', '325', '326', '327', '328', '329',
-                              '330', '331', '332', '333', '334', '335', '336', '337', '338', '339',
-                              '340', '341', '342', '343', '344', '345', '346', '347', '348', '349',
-                              '350', '351', '352', '353', '354', '355', '356', '357', '358', '359']
-
-        for prefix in pakistani_prefixes:
-            if clean_candidate.startswith(prefix) and 10 <= len(clean_candidate) <= 12:
-                is_pakistani = True
-                print(f"DEBUG - Pakistani prefix {prefix} detected: {clean_candidate}")
-                break
-
-        # INDIAN NUMBER CHECKS
-        is_indian = False
-
-        # Check for Indian mobile (6-9 followed by 9 digits)
-        if len(clean_candidate) == 10 and re.match(r'^[6-9]\d{9}$', clean_candidate):
-            is_indian = True
-            print(f"DEBUG - Indian mobile detected: {clean_candidate}")
-
-        # Check for Indian with country code (91)
-        elif len(clean_candidate) >= 11 and clean_candidate.startswith('91'):
-            is_indian = True
-            print(f"DEBUG - Indian with country code: {clean_candidate}")
-
-        # UAE NUMBER CHECKS
-        is_uae = False
-
-        # Check for UAE mobile (5XXXXXXXX)
-        if len(clean_candidate) == 9 and clean_candidate.startswith('5'):
-            is_uae = True
-            print(f"DEBUG - UAE mobile detected: {clean_candidate}")
-
-        # Check for UAE with country code (971)
-        elif len(clean_candidate) >= 11 and clean_candidate.startswith('971'):
-            is_uae = True
-            print(f"DEBUG - UAE with country code: {clean_candidate}")
-
-        # Check for UAE landline (starting with 2-4)
-        elif len(clean_candidate) == 8 and re.match(r'^[2-4]\d{7}$', clean_candidate):
-            is_uae = True
-            print(f"DEBUG - UAE landline detected: {clean_candidate}")
-
-        # GENERAL INTERNATIONAL CHECKS
-        is_international = False
-
-        # If it's 10-15 digits and not already identified
-        if 10 <= len(clean_candidate) <= 15 and not (is_pakistani or is_indian or is_uae):
-            # Check if it looks like a phone number (not a random number sequence)
-            # Phone numbers usually don't start with 0 (except for local numbers)
-            # and are not all the same digit
-            if len(set(clean_candidate)) > 1:  # Not all same digit
-                is_international = True
-                print(f"DEBUG - International phone suspected: {clean_candidate}")
-
-        # If any phone type detected, replace it
-        if is_pakistani or is_indian or is_uae or is_international:
-            # Replace the exact pattern found in text (with original formatting)
-            # We need to escape special regex characters
-            escaped_candidate = re.escape(candidate)
-            filtered_text = re.sub(escaped_candidate, '[PHONE REMOVED]', filtered_text)
-            phone_found = True
-            print(f"DEBUG - Replaced: {candidate} -> [PHONE REMOVED]")
-
-    if phone_found and 'phone' not in blocked_types:
-        blocked_types.append('phone')
-
-    # ===== SOCIAL MEDIA LINKS =====
-    social_patterns = [
-        r'(https?://)?(www\.)?(facebook|fb)\.com/[^\s]+',
-        r'(https?://)?(www\.)?twitter\.com/[^\s]+',
-        r'(https?://)?(www\.)?instagram\.com/[^\s]+',
-        r'(https?://)?(www\.)?linkedin\.com/[^\s]+',
-        r'(https?://)?(www\.)?whatsapp\.com/[^\s]+',
-        r'(https?://)?(www\.)?telegram\.me/[^\s]+',
-        r'(https?://)?(www\.)?discord\.gg/[^\s]+',
-        r'(https?://)?(www\.)?snapchat\.com/[^\s]+',
-        r'(https?://)?(www\.)?tiktok\.com/@[^\s]+',
-    ]
-
-    social_found = False
-    for pattern in social_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            filtered_text = re.sub(pattern, '[SOCIAL LINK REMOVED]', filtered_text, flags=re.IGNORECASE)
-            social_found = True
-            print(f"DEBUG - Social link detected: {matches}")
-
-    if social_found and 'social_link' not in blocked_types:
-        blocked_types.append('social_link')
-
-    # Check if any forbidden content was found
-    has_forbidden = len(blocked_types) > 0
-    blocked_type_str = ", ".join(blocked_types) if blocked_types else ""
-
-    print(f"DEBUG - Final filtered: '{filtered_text}'")  # Debug line
-    print(f"DEBUG - Has forbidden: {has_forbidden}, Types: {blocked_type_str}")  # Debug line
-
-    return filtered_text, has_forbidden, blocked_type_str
-
-
-# Simple test function
-def test_filter():
-    test_cases = [
-        "My number is 03003820801",
-        "Call me at 0300-382-0801",
-        "Contact: 0300 382 0801",
-        "My email is test@example.com",
-        "Indian: 9876543210",
-        "UAE: 501234567",
-        "Random long number 123456789012345",
-    ]
-
-    for test in test_cases:
-        print("\n" + "=" * 50)
-        print(f"Testing: {test}")
-        result, has_forbidden, blocked_type = filter_message(test)
-        print(f"Result: {result}")
-        print(f"Forbidden: {has_forbidden}, Type: {blocked_type}")
+    if not text:
+        return text, False, ""
+
+    found = set()
+    parts = []
+    last = 0
+
+    def redact_keywords(segment):
+        # Run on the text between contact-info matches, so their replacements are never rescanned
+        segment, has_keyword = blocklist.redact(segment, room_type, REPLACEMENTS['keyword'])
+        if has_keyword:
+            found.add('keyword')
+        parts.append(segment)
+
+    matches = TOKEN_RE.finditer(text) if TRIGGER_RE.search(text) else ()
+    for match in matches:
+        kind = match.lastgroup
+        if kind == 'phone':
+            replacement, is_phone = _filter_number(text, match)
+            if not is_phone:
+                continue
+            found.add('phone')
+        else:
+            found.add(kind)
+            replacement = REPLACEMENTS[kind]
+        redact_keywords(text[last:match.start()])
+        parts.append(replacement)
+        last = match.end()
+    redact_keywords(text[last:])
+
+    if not found:
+        return text, False, ""
+
+    filtered_text = ''.join(parts)
+    blocked_type_str = ", ".join(name for kind, name in BLOCKED_TYPE_NAMES if kind in found)
+    logger.debug("Blocked content types: %s", blocked_type_str)
+    return filtered_text, True, blocked_type_str
@@ -0,0 +1,26 @@
+# services/fanout.py
+"""
+Serialize-once fan-out for chat broadcasts.
+
+The sender encodes the outbound websocket frame to JSON once. The channel
+layer then carries that string (msgpack copies it as-is) and every consumer
+in the group forwards it verbatim from ``chat_frame``, instead of each of the
+N receivers running ``json.dumps`` on the same nested dict again.
+"""
+import json
+
+
+def encode_frame(payload):
+    return json.dumps(payload)
+
+
+def frame_event(payload, group=None):
+    """
+    Channel layer event carrying a pre-encoded frame for ``ChatConsumer.chat_frame``.
+    ``group`` lets the multiplexed socket (multiplex.py) route it to the right stream.
+    """
+    return {"type": "chat.frame", "frame": encode_frame(payload), "group": group}
+
+
+async def group_send_frame(channel_layer, group, payload):
+    await channel_layer.group_send(group, frame_event(payload, group))
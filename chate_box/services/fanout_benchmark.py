@@ -0,0 +1,80 @@
+# services/fanout_benchmark.py
+"""
+CPU cost of broadcasting one chat message to a room.
+
+Simulates what happens per message between ``group_send`` and the websocket
+write: channels_redis msgpack-serializes the event once per receiving
+process, each process deserializes it once, and every member's consumer
+produces its text frame. Compares the old nested-dict event (one
+``json.dumps`` per member) with the pre-encoded frame from ``fanout``.
+"""
+import json
+import time
+
+from channels_redis.serializers import registry
+
+from .fanout import frame_event
+
+SAMPLE_MESSAGE = {
+    'id': '123456',
+    'room': '42',
+    'sender': {
+        'id': 'ed540935-d4d1-402a-b9e6-cc5d974965af',
+        'username': 'teacher_ahmed',
+        'role': 'teacher',
+        'teacher_id': 'PT-1A2B3C4D',
+        'student_id': 'None',
+    },
+    'message_type': 'text',
+    'content': 'Please revise chapter 4 before tomorrow, we will have a short quiz on derivatives.',
+    'original_content': '',
+    'status': 'sent',
+    'has_forbidden_content': False,
+    'blocked_content_type': '',
+    'read_by_users': [],
+    'is_read_by_me': False,
+}
+
+
+def _deliver(event, members, processes, serializer, render):
+    """Layer round trip for one group_send, then one frame per member."""
+    per_process = -(-members // processes)
+    delivered = 0
+    for process in range(processes):
+        message = dict(event)
+        message['__asgi_channel__'] = [f'specific.p{process}!{n}' for n in range(per_process)]
+        received = serializer.deserialize(serializer.serialize(message))
+        del received['__asgi_channel__']
+        for _ in range(min(per_process, members - delivered)):
+            render(received)
+            delivered += 1
+    return delivered
+
+
+def render_nested(event):
+    return json.dumps({"type": "message.new", "message": event["message"]})
+
+
+def render_frame(event):
+    return event["frame"]
+
+
+def measure(members=500, processes=4, iterations=200):
+    """CPU microseconds per delivered message for the old and new fan-out paths."""
+    serializer = registry.get_serializer('msgpack')
+    payload = {"type": "message.new", "message": SAMPLE_MESSAGE}
+
+    def old_path():
+        event = {"type": "chat.message", "message": SAMPLE_MESSAGE}
+        return _deliver(event, members, processes, serializer, render_nested)
+
+    def new_path():
+        return _deliver(frame_event(payload), members, processes, serializer, render_frame)
+
+    results = {}
+    for name, send in (('before', old_path), ('after', new_path)):
+        started = time.process_time()
+        delivered = sum(send() for _ in range(iterations))
+        elapsed = time.process_time() - started
+        results[name] = elapsed / delivered * 1_000_000
+    return results
@@ -0,0 +1,196 @@
+# services/filter_benchmark.py
+"""
+Micro-benchmark for the chat content filter.
+
+Compares the current single-pass engine in ``content_filter`` with the
+previous multi-regex implementation (kept here as ``legacy_filter_message``)
+on a few sample messages plus a bulk synthetic chat corpus.
+"""
+import contextlib
+import os
+import random
+import re
+import time
+
+from .content_filter import filter_message
+
+SAMPLE_MESSAGES = [
+    "My number is 03003820801",
+    "Call me at 0300-382-0801",
+    "Contact: 0300 382 0801",
+    "My email is test@example.com",
+    "Indian: 9876543210",
+    "UAE: 501234567",
+    "Random long number 123456789012345",
+]
+
+CHAT_PHRASES = [
+    "Assalam o alaikum sir, can we start the class now?",
+    "I have completed the homework for chapter 3",
+    "Please share the notes from today's lecture",
+    "Thank you so much, see you tomorrow!",
+    "Can you explain question 4 again? I didn't get the second part",
+    "The meeting is at 5 pm, don't be late",
+    "What is the derivative of x^2 + 3x?",
+    "ok",
+    "Yes I understood 👍",
+    "My fee for the month is 15000 rupees",
+    "Class will be 60 minutes, Monday to Friday",
+    "I'll send the assignment by 10:30 tonight",
+]
+
+FORBIDDEN_PHRASES = [
+    "Call me at 0300-382-0801 after class",
+    "my whatsapp is +92 321 1234567",
+    "email me at student.name@gmail.com",
+    "add me on facebook.com/some.profile",
+    "Indian number 9876543210 works too",
+    "UAE: 501234567",
+    "follow https://www.instagram.com/tutor_pk for updates",
+    "contact 0345 1234567 or tutor@example.org",
+]
+
+
+def build_corpus(size=20000, forbidden_ratio=0.1, seed=42):
+    """SAMPLE_MESSAGES followed by ``size`` synthetic chat messages."""
+    rng = random.Random(seed)
+    corpus = list(SAMPLE_MESSAGES)
+    for _ in range(size):
+        if rng.random() < forbidden_ratio:
+            corpus.append(rng.choice(FORBIDDEN_PHRASES))
+        else:
+            corpus.append(" ".join(rng.sample(CHAT_PHRASES, rng.randint(1, 3))))
+    return corpus
+
+
+def legacy_filter_message(text: str):
+    """The filter as it was before the single-pass engine (reference only)."""
+    blocked_types = []
+    filtered_text = text
+
+    print(f"DEBUG - Input text: '{text}'")
+
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    email_matches = re.findall(email_pattern, text)
+    if email_matches:
+        print(f"DEBUG - Found emails: {email_matches}")
+        filtered_text = re.sub(email_pattern, '[EMAIL REMOVED]', filtered_text)
+        blocked_types.append('email')
+
+    all_number_sequences = re.findall(r'(?:\d[-\s.]?){8,15}\d', text)
+    plain_digits = re.findall(r'\b\d{8,15}\b', text)
+    all_candidates = list(set(all_number_sequences + plain_digits))
+
+    print(f"DEBUG - Number candidates: {all_candidates}")
+
+    phone_found = False
+    for candidate in all_candidates:
+        clean_candidate = re.sub(r'[^\d]', '', candidate)
+        print(f"DEBUG - Checking candidate: {candidate} -> {clean_candidate}")
+
+        is_pakistani = False
+        if len(clean_candidate) == 11 and clean_candidate.startswith('03'):
+            is_pakistani = True
+        elif len(clean_candidate) == 10 and clean_candidate.startswith('3'):
+            is_pakistani = True
+        elif len(clean_candidate) >= 11 and clean_candidate.startswith('92'):
+            is_pakistani = True
+
+        pakistani_prefixes = [str(prefix) for prefix in range(300, 360)]
+        for prefix in pakistani_prefixes:
+            if clean_candidate.startswith(prefix) and 10 <= len(clean_candidate) <= 12:
+                is_pakistani = True
+                break
+
+        is_indian = False
+        if len(clean_candidate) == 10 and re.match(r'^[6-9]\d{9}$', clean_candidate):
+            is_indian = True
+        elif len(clean_candidate) >= 11 and clean_candidate.startswith('91'):
+            is_indian = True
+
+        is_uae = False
+        if len(clean_candidate) == 9 and clean_candidate.startswith('5'):
+            is_uae = True
+        elif len(clean_candidate) >= 11 and clean_candidate.startswith('971'):
+            is_uae = True
+        elif len(clean_candidate) == 8 and re.match(r'^[2-4]\d{7}$', clean_candidate):
+            is_uae = True
+
+        is_international = False
+        if 10 <= len(clean_candidate) <= 15 and not (is_pakistani or is_indian or is_uae):
+            if len(set(clean_candidate)) > 1:
+                is_international = True
+
+        if is_pakistani or is_indian or is_uae or is_international:
+            filtered_text = re.sub(re.escape(candidate), '[PHONE REMOVED]', filtered_text)
+            phone_found = True
+            print(f"DEBUG - Replaced: {candidate} -> [PHONE REMOVED]")
+
+    if phone_found:
+        blocked_types.append('phone')
+
+    social_patterns = [
+        r'(https?://)?(www\.)?(facebook|fb)\.com/[^\s]+',
+        r'(https?://)?(www\.)?twitter\.com/[^\s]+',
+        r'(https?://)?(www\.)?instagram\.com/[^\s]+',
+        r'(https?://)?(www\.)?linkedin\.com/[^\s]+',
+        r'(https?://)?(www\.)?whatsapp\.com/[^\s]+',
+        r'(https?://)?(www\.)?telegram\.me/[^\s]+',
+        r'(https?://)?(www\.)?discord\.gg/[^\s]+',
+        r'(https?://)?(www\.)?snapchat\.com/[^\s]+',
+        r'(https?://)?(www\.)?tiktok\.com/@[^\s]+',
+    ]
+
+    social_found = False
+    for pattern in social_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            filtered_text = re.sub(pattern, '[SOCIAL LINK REMOVED]', filtered_text, flags=re.IGNORECASE)
+            social_found = True
+            print(f"DEBUG - Social link detected: {matches}")
+
+    if social_found:
+        blocked_types.append('social_link')
+
+    has_forbidden = len(blocked_types) > 0
+    blocked_type_str = ", ".join(blocked_types)
+
+    print(f"DEBUG - Final filtered: '{filtered_text}'")
+    print(f"DEBUG - Has forbidden: {has_forbidden}, Types: {blocked_type_str}")
+
+    return filtered_text, has_forbidden, blocked_type_str
+
+
+def measure(func, corpus, repeat=3):
+    """Best-of-``repeat`` throughput of ``func`` over ``corpus`` in messages/second."""
+    best = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for text in corpus:
+                func(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    return len(corpus) / best if best else float('inf')
+
+
+def compare(corpus):
+    """Messages whose (filtered_text, has_forbidden, blocked_types) differ between engines."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return [
+            text for text in dict.fromkeys(corpus)
+            if legacy_filter_message(text) != filter_message(text)
+        ]
+
+
+def run_benchmark(size=20000, forbidden_ratio=0.1, repeat=3):
+    corpus = build_corpus(size=size, forbidden_ratio=forbidden_ratio)
+    before = measure(legacy_filter_message, corpus, repeat=repeat)
+    after = measure(filter_message, corpus, repeat=repeat)
+    return {
+        'messages': len(corpus),
+        'before_msgs_per_sec': before,
+        'after_msgs_per_sec': after,
+        'speedup': after / before if before else float('inf'),
+        'mismatches': compare(corpus),
+    }
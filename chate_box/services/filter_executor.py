@@ -0,0 +1,148 @@
+# services/filter_executor.py
+"""
+Where the chat content filter runs.
+
+- 'inline': in the event loop. Cheapest per message, but a long message
+  blocks every other coroutine of the worker while it is scanned.
+- 'thread': a dedicated thread pool. Keeps the default executor free, but the
+  regex work still holds the GIL.
+- 'process': a pool of worker processes, so filtering does not compete with
+  the event loop for the GIL at all.
+
+Thread and process modes are bounded: when MAX_PENDING messages are already
+waiting for the filter, or a message is not filtered within TIMEOUT_MS, the
+message is held back (``FilterUnavailable``) rather than delivered unfiltered.
+
+Each process keeps its own copy of the keyword blocklist and refreshes it
+before filtering when it is due.
+
+Configured with ``settings.CHAT_CONTENT_FILTER``.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .blocklist import blocklist
+from .content_filter import filter_message
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EXECUTOR': 'process',
+    'MAX_WORKERS': 2,
+    'MAX_PENDING': 500,
+    'TIMEOUT_MS': 2000,
+}
+
+MODES = ('inline', 'thread', 'process')
+
+
+def filter_in_worker(text, room_type):
+    """Entry point in pool processes, which also keep their blocklist up to date"""
+    try:
+        blocklist.refresh()
+    except Exception:
+        logger.exception("Failed to refresh the chat blocklist")
+    return filter_message(text, room_type)
+
+
+class FilterUnavailable(Exception):
+    """The filter is backed up or timed out; the message must not be delivered."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class FilterExecutor:
+    def __init__(self, mode='process', max_workers=2, max_pending=500, timeout_ms=2000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown content filter executor {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout_ms / 1000
+        self.pending = 0
+        self._pool = None
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULTS, **getattr(settings, 'CHAT_CONTENT_FILTER', {})}
+        return cls(
+            mode=config['EXECUTOR'],
+            max_workers=config['MAX_WORKERS'],
+            max_pending=config['MAX_PENDING'],
+            timeout_ms=config['TIMEOUT_MS'],
+        )
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == 'process':
+                # spawn: forked children would inherit the event loop and DB connections
+                self._pool = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+                )
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='content-filter')
+        return self._pool
+
+    async def filter(self, text, room_type=None):
+        """``filter_message(text, room_type)`` run according to ``mode``; raises FilterUnavailable."""
+        if self.mode != 'process' and blocklist.is_stale:
+            try:
+                await database_sync_to_async(blocklist.refresh)()
+            except Exception:
+                logger.exception("Failed to refresh the chat blocklist")
+
+        if self.mode == 'inline':
+            return filter_message(text, room_type)
+
+        if self.pending >= self.max_pending:
+            raise FilterUnavailable('backlog')
+
+        loop = asyncio.get_running_loop()
+        try:
+            if self.mode == 'process':
+                future = self._get_pool().submit(filter_in_worker, text, room_type)
+            else:
+                future = self._get_pool().submit(filter_message, text, room_type)
+        except BrokenExecutor:
+            # A worker process died; start a fresh pool for the next message
+            logger.exception("Content filter pool is broken, restarting it")
+            self.shutdown()
+            raise FilterUnavailable('error')
+        # Released when the work is really done, so a timed out message still counts as backlog
+        self.pending += 1
+        future.add_done_callback(lambda _: self._release_from(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Content filter timed out after %.1fs (%d pending)", self.timeout, self.pending)
+            raise FilterUnavailable('timeout')
+        except BrokenExecutor:
+            logger.exception("Content filter pool is broken, restarting it")
+            self.shutdown()
+            raise FilterUnavailable('error')
+
+    def _release_from(self, loop):
+        # Called from the pool's thread
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # event loop already closed (shutdown)
+
+    def _release(self):
+        self.pending -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+filter_executor = FilterExecutor.from_settings()
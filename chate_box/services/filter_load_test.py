@@ -0,0 +1,108 @@
+# services/filter_load_test.py
+"""
+Load test for the content filter executors.
+
+Feeds messages to a ``FilterExecutor`` at a fixed rate while a probe
+coroutine measures how late the event loop wakes it up. That lag is what
+every other websocket served by the same worker would feel.
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from .filter_benchmark import CHAT_PHRASES, build_corpus
+from .filter_executor import FilterExecutor, FilterUnavailable
+
+PROBE_INTERVAL = 0.005
+TICK = 0.01
+
+
+def long_message(rng, size=5000):
+    """A pasted essay of roughly ``size`` characters."""
+    words = []
+    while sum(len(word) + 1 for word in words) < size:
+        words.append(rng.choice(CHAT_PHRASES))
+    return " ".join(words)
+
+
+def build_load_corpus(count, long_ratio=0.05, seed=7):
+    rng = random.Random(seed)
+    corpus = build_corpus(size=count, seed=seed)
+    return [long_message(rng) if rng.random() < long_ratio else text for text in corpus]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def _probe(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def _load(executor, rate, duration, long_ratio):
+    corpus = build_load_corpus(int(rate * duration) + 1, long_ratio=long_ratio)
+    counts = {'delivered': 0, 'held': 0}
+    filter_times = []
+
+    async def send(text):
+        started = time.perf_counter()
+        try:
+            await executor.filter(text)
+        except FilterUnavailable:
+            counts['held'] += 1
+            return
+        filter_times.append(time.perf_counter() - started)
+        counts['delivered'] += 1
+
+    # Warm up the pool so worker start-up is not measured
+    if executor.mode != 'inline':
+        await asyncio.gather(*(executor.filter("warm up") for _ in range(executor.max_workers)))
+
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.ensure_future(_probe(lags, stop))
+    tasks, sent = [], 0
+    started = time.perf_counter()
+    while sent < len(corpus):
+        # Send whatever is due by now, then sleep until the next tick
+        due = min(len(corpus), int((time.perf_counter() - started) * rate) + 1)
+        for text in corpus[sent:due]:
+            tasks.append(asyncio.ensure_future(send(text)))
+        sent = due
+        await asyncio.sleep(TICK)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        'mode': executor.mode,
+        'messages': len(corpus),
+        'achieved_rate': len(corpus) / elapsed,
+        'delivered': counts['delivered'],
+        'held': counts['held'],
+        'filter_p50_ms': percentile(filter_times, 50) * 1000,
+        'filter_p99_ms': percentile(filter_times, 99) * 1000,
+        'lag_p50_ms': percentile(lags, 50) * 1000,
+        'lag_p99_ms': percentile(lags, 99) * 1000,
+        'lag_max_ms': max(lags, default=0) * 1000,
+        'lag_mean_ms': statistics.fmean(lags) * 1000 if lags else 0.0,
+    }
+
+
+def run_load_test(modes=('inline', 'thread', 'process'), rate=1000, duration=5.0, long_ratio=0.05,
+                  max_workers=2, max_pending=500, timeout_ms=2000):
+    results = []
+    for mode in modes:
+        executor = FilterExecutor(mode, max_workers=max_workers, max_pending=max_pending, timeout_ms=timeout_ms)
+        try:
+            results.append(asyncio.run(_load(executor, rate, duration, long_ratio)))
+        finally:
+            executor.shutdown()
+    return results
@@ -0,0 +1,131 @@
+# services/message_buffer.py
+"""
+Write-behind persistence for chat messages.
+
+Messages sent over the websocket get their primary key straight away (from a
+block of IDs reserved on the PostgreSQL sequence), are broadcast, and are
+written later in one ``bulk_create`` together with a single ``updated_at``
+bump for every room touched since the last flush.
+
+Configured with ``settings.CHAT_MESSAGE_BUFFER``:
+- MODE: 'write_behind' or 'sync' (write each message before broadcasting).
+  Write-behind needs PostgreSQL; other databases always use 'sync'.
+- FLUSH_INTERVAL_MS / MAX_BATCH_SIZE: flush every N ms or N messages.
+- ID_BLOCK_SIZE: message IDs reserved per sequence round trip.
+- FLUSH_ON_DISCONNECT: flush when a websocket closes.
+Pending messages are also flushed when the process exits.
+"""
+import asyncio
+import logging
+from collections import deque
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lms.buffers import WriteBehindBuffer
+from ..models import ChatRoom, Message
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODE': 'write_behind',
+    'FLUSH_INTERVAL_MS': 250,
+    'MAX_BATCH_SIZE': 200,
+    'ID_BLOCK_SIZE': 100,
+    'FLUSH_ON_DISCONNECT': True,
+}
+
+
+def reserve_message_ids(count):
+    """Reserve ``count`` primary keys from the Message id sequence (PostgreSQL)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Message._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def write_messages(messages, room_ids):
+    """Insert ``messages`` and bump ``updated_at`` of ``room_ids`` in one transaction."""
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            ChatRoom.objects.filter(id__in=room_ids).update(updated_at=timezone.now())
+        return
+    except Exception:
+        if len(messages) == 1:
+            raise
+        logger.exception("Bulk insert of %d chat messages failed, retrying one by one", len(messages))
+
+    # One bad row (e.g. its room was deleted meanwhile) must not drop the batch
+    for message in messages:
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create([message])
+        except Exception:
+            logger.exception("Dropping chat message %s for room %s", message.id, message.room_id)
+    ChatRoom.objects.filter(id__in=room_ids).update(updated_at=timezone.now())
+
+
+class MessageBuffer(WriteBehindBuffer):
+    description = 'chat messages'
+
+    def __init__(self, mode='write_behind', flush_interval_ms=250, max_batch_size=200,
+                 id_block_size=100, flush_on_disconnect=True):
+        super().__init__(flush_interval_ms, max_batch_size)
+        self.mode = mode
+        self.id_block_size = id_block_size
+        self.flush_on_disconnect = flush_on_disconnect
+        self._ids = deque()
+        self._id_lock = asyncio.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULTS, **getattr(settings, 'CHAT_MESSAGE_BUFFER', {})}
+        return cls(
+            mode=config['MODE'],
+            flush_interval_ms=config['FLUSH_INTERVAL_MS'],
+            max_batch_size=config['MAX_BATCH_SIZE'],
+            id_block_size=config['ID_BLOCK_SIZE'],
+            flush_on_disconnect=config['FLUSH_ON_DISCONNECT'],
+        )
+
+    @property
+    def is_write_behind(self):
+        return self.mode == 'write_behind' and connection.vendor == 'postgresql'
+
+    async def add(self, message):
+        """
+        Queue an unsaved ``Message`` and return it with its ``id`` set.
+        In sync mode the message is written before returning.
+
+        ``created_at`` is stamped here, at send time, not when the batch is
+        flushed. Neither it nor ``id`` (reserved in per-process blocks)
+        follows send order across workers; ``seq`` does.
+        """
+        message.created_at = timezone.now()
+        if not self.is_write_behind:
+            await database_sync_to_async(self.write)([message])
+            return message
+
+        message.id = await self._next_id()
+        self._pending.append(message)
+        self._schedule()
+        return message
+
+    def write(self, batch):
+        write_messages(batch, {message.room_id for message in batch})
+
+    async def _next_id(self):
+        if not self._ids:
+            async with self._id_lock:
+                if not self._ids:
+                    ids = await database_sync_to_async(reserve_message_ids)(self.id_block_size)
+                    self._ids.extend(ids)
+        return self._ids.popleft()
+
+
+message_buffer = MessageBuffer.from_settings()
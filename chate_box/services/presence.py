@@ -0,0 +1,206 @@
+# services/presence.py
+"""
+Cluster-wide presence for websocket rooms (chat rooms and meetings).
+
+Per room, Redis holds:
+- ``presence:<scope>:<room_id>``: sorted set of user ids scored by last heartbeat
+- ``...:conns``: open connections per user (a user may have several tabs)
+- ``...:info``: JSON display info per user
+- ``...:sockets``: sorted set of ``<user_id>|<connection id>`` scored by that
+  connection's last heartbeat
+
+A user joins with their first connection and leaves with their last, and
+only those transitions are broadcast as ``presence.join`` / ``presence.leave``
+frames. Every connection refreshes its own score and its user's every
+HEARTBEAT_SECONDS. Connections not seen for TTL_SECONDS (e.g. their worker
+died) are swept one by one by the next join or heartbeat in the room; a user
+whose last connection is swept leaves, and a leave is sent for them.
+
+Configured with ``settings.PRESENCE``.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from django.conf import settings
+
+from lms.redis_client import redis_client, async_redis_client
+from .fanout import group_send_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HEARTBEAT_SECONDS': 30,
+    'TTL_SECONDS': 90,
+}
+
+# Shared by the scripts: drop connections seen before ARGV[2] (cutoff) except our own
+# (ARGV[6]) and return the users left with none
+SWEEP = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', '(' .. ARGV[2])
+local gone = {}
+for _, socket in ipairs(expired) do
+    if socket ~= ARGV[6] then
+        redis.call('ZREM', KEYS[4], socket)
+        local user = string.match(socket, '^(.*)|[^|]*$')
+        if redis.call('HINCRBY', KEYS[2], user, -1) <= 0 then
+            redis.call('HDEL', KEYS[2], user)
+            redis.call('HDEL', KEYS[3], user)
+            if redis.call('ZREM', KEYS[1], user) == 1 then
+                table.insert(gone, user)
+            end
+        end
+    end
+end
+"""
+
+EXPIRE_KEYS = """
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+"""
+
+# ARGV: user, cutoff, now, key ttl, info, socket. Returns {connections of user, swept users...}
+JOIN = SWEEP + """
+redis.call('ZADD', KEYS[4], ARGV[3], ARGV[6])
+local count = redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[5])
+""" + EXPIRE_KEYS + """
+table.insert(gone, 1, count)
+return gone
+"""
+
+# ARGV: user, cutoff, now, key ttl, unused, socket. Returns {1 if still registered, swept users...}
+HEARTBEAT = SWEEP + """
+local present = 0
+if redis.call('ZSCORE', KEYS[4], ARGV[6]) then
+    redis.call('ZADD', KEYS[4], ARGV[3], ARGV[6])
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+    present = 1
+end
+""" + EXPIRE_KEYS + """
+table.insert(gone, 1, present)
+return gone
+"""
+
+# ARGV: user, socket. Returns 1 if that was the user's last connection
+LEAVE = """
+if redis.call('ZREM', KEYS[4], ARGV[2]) == 0 then
+    -- Already swept, which released its connection
+    return 0
+end
+local count = redis.call('HINCRBY', KEYS[2], ARGV[1], -1)
+if count > 0 then
+    return 0
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return redis.call('ZREM', KEYS[1], ARGV[1])
+"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PRESENCE', {})}
+
+
+def _keys(scope, room_id):
+    base = f"presence:{scope}:{room_id}"
+    return [base, f"{base}:conns", f"{base}:info", f"{base}:sockets"]
+
+
+def _cutoff(config):
+    return time.time() - config['TTL_SECONDS']
+
+
+def _decode_users(user_ids, infos):
+    return [json.loads(info) if info else {'user_id': user_id} for user_id, info in zip(user_ids, infos)]
+
+
+def snapshot_sync(scope, room_id):
+    """Users currently present, for REST views"""
+    keys = _keys(scope, room_id)
+    user_ids = redis_client.zrangebyscore(keys[0], _cutoff(get_config()), '+inf')
+    return _decode_users(user_ids, redis_client.hmget(keys[2], user_ids) if user_ids else [])
+
+
+async def snapshot(scope, room_id):
+    keys = _keys(scope, room_id)
+    user_ids = await async_redis_client.zrangebyscore(keys[0], _cutoff(get_config()), '+inf')
+    infos = await async_redis_client.hmget(keys[2], user_ids) if user_ids else []
+    return _decode_users(user_ids, infos)
+
+
+def join_frame(room_id, user):
+    return {"type": "presence.join", "room": str(room_id), "user": user}
+
+
+def leave_frame(room_id, user_id):
+    return {"type": "presence.leave", "room": str(room_id), "user_id": user_id}
+
+
+class PresenceTracker:
+    """Presence of one websocket connection; ``start`` after accept, ``stop`` on disconnect."""
+
+    def __init__(self, scope, room_id, user, channel_layer, group):
+        self.scope = scope
+        self.room_id = room_id
+        self.user = user
+        self.user_id = user['user_id']
+        self.channel_layer = channel_layer
+        self.group = group
+        self.config = get_config()
+        self.keys = _keys(scope, room_id)
+        self.socket = f"{self.user_id}|{uuid.uuid4().hex}"
+        self._heartbeat = None
+
+    @property
+    def _ttl(self):
+        # Keys outlive a few missed heartbeats, then an abandoned room disappears
+        return self.config['TTL_SECONDS'] * 2
+
+    async def start(self):
+        try:
+            count, *gone = await async_redis_client.eval(
+                JOIN, 4, *self.keys,
+                self.user_id, _cutoff(self.config), time.time(), self._ttl, json.dumps(self.user), self.socket,
+            )
+            await self._send_leaves(gone)
+            if count == 1:
+                await group_send_frame(self.channel_layer, self.group, join_frame(self.room_id, self.user))
+        except Exception:
+            logger.exception("Presence join failed for %s in %s %s", self.user_id, self.scope, self.room_id)
+        self._heartbeat = asyncio.ensure_future(self._beat())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        try:
+            left = await async_redis_client.eval(LEAVE, 4, *self.keys, self.user_id, self.socket)
+            if left:
+                await group_send_frame(self.channel_layer, self.group, leave_frame(self.room_id, self.user_id))
+        except Exception:
+            logger.exception("Presence leave failed for %s in %s %s", self.user_id, self.scope, self.room_id)
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self.config['HEARTBEAT_SECONDS'])
+            try:
+                present, *gone = await async_redis_client.eval(
+                    HEARTBEAT, 4, *self.keys,
+                    self.user_id, _cutoff(self.config), time.time(), self._ttl, '', self.socket,
+                )
+                await self._send_leaves(gone)
+                if not present:
+                    # Swept while still connected (e.g. Redis was unreachable for a while)
+                    await self.start()
+                    return
+            except Exception:
+                logger.exception("Presence heartbeat failed for %s in %s %s", self.user_id, self.scope, self.room_id)
+
+    async def _send_leaves(self, user_ids):
+        for user_id in user_ids:
+            await group_send_frame(self.channel_layer, self.group, leave_frame(self.room_id, user_id))
@@ -0,0 +1,142 @@
+# services/rate_limit.py
+"""
+Token-bucket rate limiting for chat websockets.
+
+Each connection has an in-process bucket for every incoming frame, so floods
+are rejected without a network round trip. Expensive frames (message.send,
+messages.resume) also take a token from a per-user bucket in Redis, keyed by
+room type, which holds across all ASGI workers and open sockets of that user.
+
+Configured with ``settings.CHAT_RATE_LIMIT`` (RATE is tokens per second,
+BURST the bucket size). Throttling is counted in the ``chat:rate_limit:stats``
+Redis hash; see the ``chat_rate_limit_stats`` management command.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+from lms.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CONNECTION': {'RATE': 10, 'BURST': 50},
+    'USER': {'default': {'RATE': 1, 'BURST': 10}},
+    'MAX_VIOLATIONS': 20,
+    'VIOLATION_WINDOW_SECONDS': 60,
+}
+
+STATS_KEY = "chat:rate_limit:stats"
+
+# Close code sent to clients that keep sending after being throttled
+CLOSE_CODE = 4029
+
+# KEYS[1] bucket; ARGV rate, burst, now (seconds). Returns {allowed, ms until next token}
+TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+if allowed == 1 then
+    return {1, 0}
+end
+return {0, math.ceil((1 - tokens) / rate * 1000)}
+"""
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, 'CHAT_RATE_LIMIT', {})}
+    config['USER'] = {**DEFAULTS['USER'], **config['USER']}
+    return config
+
+
+class TokenBucket:
+    """In-process token bucket."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token; returns 0 on success, else the ms until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return int((1 - self.tokens) / self.rate * 1000) + 1
+
+
+async def take_user_token(user_id, room_type, config=None):
+    """Take a token from the user's shared bucket; returns 0 or the ms to wait."""
+    config = config or get_config()
+    limits = config['USER'].get(room_type, config['USER']['default'])
+    try:
+        allowed, retry_after = await async_redis_client.eval(
+            TOKEN_BUCKET, 1, f"chat:rate_limit:{user_id}:{room_type}",
+            limits['RATE'], limits['BURST'], time.time(),
+        )
+    except Exception:
+        # Fail open: chat keeps working (per-connection limits still apply) if Redis is down
+        logger.exception("Rate limit check failed for user %s", user_id)
+        return 0
+    return 0 if allowed else int(retry_after)
+
+
+async def record(event, room_type):
+    """Count a throttling ``event`` ('throttled_connection', 'throttled_user', 'closed')."""
+    try:
+        await async_redis_client.hincrby(STATS_KEY, f"{event}:{room_type}", 1)
+    except Exception:
+        logger.exception("Failed to record rate limit event %s", event)
+
+
+class ConnectionLimiter:
+    """Rate limits for one websocket."""
+
+    def __init__(self, user_id, room_type, config=None):
+        self.config = config or get_config()
+        self.user_id = user_id
+        self.room_type = room_type
+        self.bucket = TokenBucket(self.config['CONNECTION']['RATE'], self.config['CONNECTION']['BURST'])
+        self.violations = 0
+        self.last_violation = 0
+
+    async def check(self, shared=False):
+        """
+        Charge one frame. ``shared`` also charges the user's bucket in Redis.
+        Returns 0 when allowed, else the ms the client should wait.
+        """
+        retry_after = self.bucket.take()
+        event = 'throttled_connection'
+        if not retry_after and shared:
+            retry_after = await take_user_token(self.user_id, self.room_type, self.config)
+            event = 'throttled_user'
+        if retry_after:
+            now = time.monotonic()
+            # Offences are counted until the client stays within limits for a whole window
+            if now - self.last_violation > self.config['VIOLATION_WINDOW_SECONDS']:
+                self.violations = 0
+            self.violations += 1
+            self.last_violation = now
+            await record(event, self.room_type)
+        return retry_after
+
+    @property
+    def exceeded(self):
+        """True once the connection has been throttled too often and should be closed."""
+        return self.violations >= self.config['MAX_VIOLATIONS']
@@ -0,0 +1,161 @@
+# services/read_receipts.py
+"""
+Read watermarks for chat rooms.
+
+Instead of one MessageRead row per (message, user), each user has a single
+RoomReadState per room saying "read up to this seq". Reads arriving
+over the websocket are coalesced per (room, user) in a per-process buffer,
+written in one go and broadcast as one ``message.read_up_to`` frame per room.
+"""
+import logging
+from functools import reduce
+from operator import or_
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import BigIntegerField, Case, Q, Value, When
+from django.utils import timezone
+
+from lms.buffers import WriteBehindBuffer
+from ..models import Message, RoomReadState
+from .fanout import group_send_frame
+from .message_buffer import message_buffer
+
+logger = logging.getLogger(__name__)
+
+
+def advance_read_states(receipts):
+    """
+    Move read watermarks forward.
+
+    ``receipts`` maps (room_id, user_id) to the ids of messages read; the one
+    with the highest ``seq`` wins. Messages that are not in that room are
+    ignored, and a watermark never moves back, also when another worker
+    advances it concurrently. Returns {room_id: [(user_id, message_id, seq), ...]}
+    for the watermarks that advanced.
+    """
+    if not receipts:
+        return {}
+
+    positions = {
+        message_id: (room_id, seq)
+        for message_id, room_id, seq in Message.objects.filter(
+            id__in=set().union(*receipts.values()), seq__isnull=False
+        ).values_list('id', 'room_id', 'seq')
+    }
+    newest = {}
+    for (room_id, user_id), message_ids in receipts.items():
+        read = [
+            (positions[message_id][1], message_id) for message_id in message_ids
+            if message_id in positions and positions[message_id][0] == room_id
+        ]
+        if read:
+            newest[(room_id, user_id)] = max(read)
+    if not newest:
+        return {}
+
+    current = {
+        (room_id, user_id): seq
+        for room_id, user_id, seq in RoomReadState.objects.filter(
+            room_id__in={room_id for room_id, _ in newest}, user_id__in={user_id for _, user_id in newest}
+        ).values_list('room_id', 'user_id', 'last_read_seq')
+    }
+    advancing = {key: position for key, position in newest.items() if position[0] > current.get(key, 0)}
+    if not advancing:
+        return {}
+
+    now = timezone.now()
+    RoomReadState.objects.bulk_create([
+        RoomReadState(room_id=room_id, user_id=user_id, last_read_seq=seq,
+                      last_read_message_id=message_id, updated_at=now)
+        for (room_id, user_id), (seq, message_id) in advancing.items() if (room_id, user_id) not in current
+    ], ignore_conflicts=True)
+
+    # One conditional UPDATE: each row only moves forward, so a concurrent
+    # write from another worker is never overwritten by an older watermark.
+    # Rows inserted just above already match and are left alone.
+    def case(index):
+        return Case(*[
+            When(room_id=room_id, user_id=user_id, then=Value(position[index]))
+            for (room_id, user_id), position in advancing.items()
+        ], output_field=BigIntegerField())
+
+    RoomReadState.objects.filter(reduce(or_, [
+        Q(room_id=room_id, user_id=user_id, last_read_seq__lt=seq)
+        for (room_id, user_id), (seq, _) in advancing.items()
+    ])).update(last_read_seq=case(0), last_read_message_id=case(1), updated_at=now)
+
+    advanced = {}
+    for (room_id, user_id), (seq, message_id) in advancing.items():
+        advanced.setdefault(room_id, []).append((user_id, message_id, seq))
+    return advanced
+
+
+def read_positions(room):
+    """[(user_id, last_read_seq)] for everyone who has read in ``room``."""
+    return list(room.read_states.filter(last_read_seq__gt=0).values_list('user_id', 'last_read_seq'))
+
+
+def unread_filter(read_seq):
+    """Q for messages after a watermark (``read_seq`` may be an expression)."""
+    return Q(seq__gt=read_seq)
+
+
+def read_up_to_frame(room_id, advanced):
+    return {
+        "type": "message.read_up_to",
+        "room": str(room_id),
+        "receipts": [
+            {"user_id": str(user_id), "message_id": str(message_id), "seq": seq}
+            for user_id, message_id, seq in advanced
+        ],
+    }
+
+
+class ReadReceiptBuffer(WriteBehindBuffer):
+    description = 'read receipts'
+
+    def __init__(self, flush_interval_ms=500):
+        # Receipts are only worth anything with their broadcast, so none are written at exit
+        super().__init__(flush_interval_ms, flush_at_exit=False)
+
+    def new_batch(self):
+        return {}
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'CHAT_MESSAGE_BUFFER', {})
+        return cls(flush_interval_ms=config.get('READ_FLUSH_INTERVAL_MS', 500))
+
+    def add(self, room_id, user_id, message_id):
+        """
+        Record that ``user_id`` has read ``room_id`` up to ``message_id``.
+        Ids are kept until the flush, which compares them on ``seq``; a
+        higher id is not necessarily a later message.
+        """
+        self._pending.setdefault((int(room_id), user_id), set()).add(int(message_id))
+        self._schedule()
+
+    def write(self, batch):
+        return advance_read_states(batch)
+
+    async def flush(self):
+        receipts = self._take()
+        if not receipts:
+            return
+
+        # Messages read right after being sent may still sit in the write-behind buffer
+        await message_buffer.flush()
+        try:
+            advanced = await database_sync_to_async(self.write)(receipts)
+        except Exception:
+            logger.exception("Failed to store %d read receipts", len(receipts))
+            return
+
+        channel_layer = get_channel_layer()
+        for room_id, room_receipts in advanced.items():
+            await group_send_frame(channel_layer, f"chat_{room_id}", read_up_to_frame(room_id, room_receipts))
+
+
+read_receipt_buffer = ReadReceiptBuffer.from_settings()
@@ -0,0 +1,65 @@
+# services/search.py
+"""
+Full-text search over chat message content.
+
+PostgreSQL: ``Message.search_vector`` is filled by a trigger on every insert
+or content change (so bulk writes from the message buffer are covered) and
+indexed with GIN. SQLite (local development): an FTS5 table kept in sync by
+triggers. Both are created in migration 0005_message_search.
+
+Results are ranked, best match first, and paginated on (rank, id). Ranks are
+double precision on both backends: ts_rank returns real, which is cast so the
+value written into the cursor compares equal to the one in the database.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+# Text search configuration; 'simple' does no stemming, which suits mixed English / Roman Urdu chats
+SEARCH_CONFIG = 'simple'
+
+FTS5_RANK_SQL = (
+    "SELECT -bm25(chate_box_message_fts) FROM chate_box_message_fts "
+    "WHERE chate_box_message_fts MATCH %s AND rowid = chate_box_message.id"
+)
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't use FTS5 operators; terms are ANDed
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+def search(messages, query):
+    """Filter ``messages`` to those matching ``query``, annotated with ``rank`` (higher is better)."""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return messages.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+    return messages.annotate(
+        rank=RawSQL(FTS5_RANK_SQL, [_fts5_query(query)], output_field=FloatField())
+    ).filter(rank__isnull=False)
+
+
+def ranked_page(results, cursor, limit):
+    """
+    Up to ``limit`` results after ``cursor`` ((rank, id) of the last result
+    seen, or None) and whether more exist.
+    """
+    if cursor is not None:
+        rank, message_id = cursor
+        results = results.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+    page = list(results.order_by('-rank', '-id')[:limit + 1])
+    return page[:limit], len(page) > limit
+
+
+def encode_cursor(message):
+    return f"{message.rank!r}:{message.id}"
+
+
+def decode_cursor(value):
+    """(rank, id) from ``encode_cursor`` output; raises ValueError if malformed."""
+    rank, message_id = value.rsplit(':', 1)
+    return float(rank), int(message_id)
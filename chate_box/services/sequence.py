@@ -0,0 +1,105 @@
+# services/sequence.py
+"""
+Per-room message sequence numbers.
+
+Every chat message gets ``seq``, a counter that increases by one per message
+in its room, so clients can tell exactly which messages they missed. The
+counter lives in Redis (``chat:seq:<room_id>``, never expiring) so all ASGI
+workers share it.
+
+A missing key (Redis restarted or evicted it) is re-seeded from the highest
+``seq`` stored in the database, but only after waiting for the write-behind
+buffers of every worker to flush; seeding straight away would ignore
+messages still in flight and hand their seqs out again.
+
+Because messages are written behind, a resume may find seqs that are taken
+but not stored yet. ``durable_seq`` tells how far the stored messages run
+without such a hole, so the rest can be fetched again once it is written.
+"""
+import asyncio
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from lms.redis_client import redis_client, async_redis_client
+from ..models import Message
+
+# INCR only if the counter exists, so a lost key is re-seeded instead of restarting at 1.
+# KEYS[2] keeps when the last seq was handed out (ARGV[1], unix time).
+INCR_EXISTING = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('SET', KEYS[2], ARGV[1])
+    return redis.call('INCR', KEYS[1])
+end
+return false
+"""
+
+# A taken seq missing from the database this long is taken to be lost, not in flight
+IN_FLIGHT_SECONDS = 5
+
+
+def _key(room_id):
+    return f"chat:seq:{room_id}"
+
+
+def _assigned_at_key(room_id):
+    return f"chat:seq:{room_id}:at"
+
+
+def settle_seconds():
+    """How long every worker's buffered messages take to reach the database."""
+    config = getattr(settings, 'CHAT_MESSAGE_BUFFER', {})
+    return 2 * config.get('FLUSH_INTERVAL_MS', 250) / 1000
+
+
+def stored_max_seq(room_id):
+    return Message.objects.filter(room_id=room_id).aggregate(seq=Max('seq'))['seq'] or 0
+
+
+async def next_seq(room_id):
+    keys = (_key(room_id), _assigned_at_key(room_id))
+    seq = await async_redis_client.eval(INCR_EXISTING, 2, *keys, time.time())
+    if seq is None:
+        await asyncio.sleep(settle_seconds())
+        await async_redis_client.set(keys[0], await database_sync_to_async(stored_max_seq)(room_id), nx=True)
+        seq = await async_redis_client.eval(INCR_EXISTING, 2, *keys, time.time())
+    return int(seq)
+
+
+def next_seq_sync(room_id):
+    keys = (_key(room_id), _assigned_at_key(room_id))
+    seq = redis_client.eval(INCR_EXISTING, 2, *keys, time.time())
+    if seq is None:
+        time.sleep(settle_seconds())
+        redis_client.set(keys[0], stored_max_seq(room_id), nx=True)
+        seq = redis_client.eval(INCR_EXISTING, 2, *keys, time.time())
+    return int(seq)
+
+
+def head(room_id):
+    """(last seq handed out, unix time it was handed out) for the room."""
+    seq, assigned_at = redis_client.mget(_key(room_id), _assigned_at_key(room_id))
+    return int(seq or 0), float(assigned_at or 0)
+
+
+def durable_seq(stored, since, head_seq, assigned_at, now=None):
+    """
+    Highest seq up to which every message after ``since`` is stored or lost for good.
+
+    ``stored`` is [(seq, created_at)] of the stored messages after ``since``
+    in seq order. A hole before a message created in the last
+    IN_FLIGHT_SECONDS is a message another worker has not written yet, as
+    is a hole at the end while the last seq was handed out that recently.
+    """
+    now = timezone.now() if now is None else now
+    durable = since
+    for seq, created_at in stored:
+        if seq != durable + 1 and (now - created_at).total_seconds() < IN_FLIGHT_SECONDS:
+            return durable
+        durable = seq
+    if head_seq > durable and now.timestamp() - assigned_at >= IN_FLIGHT_SECONDS:
+        durable = head_seq
+    return durable
@@ -1,3 +1,208 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from unittest import mock
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from authentication.models import User
+from .consumers import ChatConsumer
+from .models import BlockedTerm, ChatRoom, Message
+from .services import rate_limit
+from .services import search as message_search
+from .services.blocklist import Automaton, Blocklist
+from .services.content_filter import filter_message
+from .services.filter_executor import FilterExecutor, FilterUnavailable
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def chat_communicator(room, user):
+    communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{room.id}/")
+    communicator.scope['user'] = user
+    communicator.scope['url_route'] = {'kwargs': {'room_id': str(room.id)}}
+    return communicator
+
+
+class RankedPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', email='searcher@example.com', password='pw')
+        self.room = ChatRoom.objects.create(name='Search', room_type='general', created_by=self.user)
+        contents = (
+            # Identical documents tie on rank
+            ['algebra homework'] * 4
+            # Different lengths give ranks like 0.0607927 that are not exact in float4 or float8
+            + ['algebra ' + 'filler ' * n for n in range(1, 8)]
+            + ['algebra algebra notes', 'algebra algebra notes', 'unrelated text']
+        )
+        Message.objects.bulk_create([
+            Message(room=self.room, sender=self.user, content=content) for content in contents
+        ])
+
+    def test_pages_cover_every_match_exactly_once(self):
+        results = message_search.search(Message.objects.all(), 'algebra')
+        expected = list(results.order_by('-rank', '-id').values_list('id', flat=True))
+        self.assertEqual(len(expected), 13)
+
+        seen, cursor = [], None
+        while True:
+            page, has_more = message_search.ranked_page(results, cursor, 2)
+            seen.extend(message.id for message in page)
+            if not has_more:
+                break
+            # Round-trip through the string form the API hands out
+            cursor = message_search.decode_cursor(message_search.encode_cursor(page[-1]))
+
+        self.assertEqual(seen, expected)
+
+
+class ContentFilterTests(TestCase):
+    def test_contact_info_is_removed(self):
+        cases = [
+            ("My number is 03003820801", "My number is [PHONE REMOVED]", "phone"),
+            ("Call me at 0300-382-0801", "Call me at [PHONE REMOVED]", "phone"),
+            ("Contact: 0300 382 0801", "Contact: [PHONE REMOVED]", "phone"),
+            ("My email is test@example.com", "My email is [EMAIL REMOVED]", "email"),
+            ("Indian: 9876543210", "Indian: [PHONE REMOVED]", "phone"),
+            ("UAE: 501234567", "UAE: [PHONE REMOVED]", "phone"),
+            ("Random long number 123456789012345", "Random long number [PHONE REMOVED]", "phone"),
+        ]
+        for text, filtered, blocked_type in cases:
+            with self.subTest(text=text):
+                self.assertEqual(filter_message(text), (filtered, True, blocked_type))
+
+    def test_clean_text_is_untouched(self):
+        for text in ["See you at 10:30", "My fee is 15000 rupees", ""]:
+            with self.subTest(text=text):
+                self.assertEqual(filter_message(text), (text, False, ""))
+
+
+class AutomatonTests(TestCase):
+    def test_finds_overlapping_terms(self):
+        automaton = Automaton(['he', 'she', 'his', 'hers'])
+        # "she" and "he" end at the same character, "hers" is found through a fail link
+        self.assertEqual(sorted(automaton.find('ushers')), [(1, 3), (2, 3), (2, 5)])
+
+    def test_no_match(self):
+        self.assertEqual(list(Automaton(['skype']).find('sky peas')), [])
+
+
+class BlocklistTests(TestCase):
+    def setUp(self):
+        self.blocklist = Blocklist(refresh_seconds=60)
+        self.skype = BlockedTerm.objects.create(term='skype')
+        BlockedTerm.objects.create(term='whatsapp')
+        BlockedTerm.objects.create(term='jazzcash', room_type='job')
+        self.blocklist.refresh(force=True)
+
+    def redact(self, text, room_type=None):
+        return self.blocklist.redact(text, room_type, '***')
+
+    def test_obfuscations_inside_words(self):
+        self.assertEqual(self.redact('wh@ts4pp me'), ('*** me', True))
+        self.assertEqual(self.redact('add me on w h a t s a p p'), ('add me on ***', True))
+
+    def test_symbols_at_word_edges_stay_separators(self):
+        self.assertEqual(self.redact('add me @skype'), ('add me @***', True))
+        self.assertEqual(self.redact('my whatsapp!'), ('my ***!', True))
+
+    def test_word_boundaries(self):
+        self.assertEqual(self.redact('sky peace'), ('sky peace', False))
+        self.assertEqual(self.redact('noskype'), ('noskype', False))
+
+    def test_room_type(self):
+        self.assertEqual(self.redact('use jazz cash'), ('use jazz cash', False))
+        self.assertEqual(self.redact('use jazz cash', 'job'), ('use ***', True))
+
+    def test_refresh_picks_up_changes(self):
+        self.skype.is_active = False
+        self.skype.save()
+        BlockedTerm.objects.create(term='telegram')
+        self.blocklist.refresh(force=True)
+        self.assertEqual(self.redact('skype or telegram'), ('skype or ***', True))
+
+        BlockedTerm.objects.filter(term='telegram').delete()
+        self.blocklist.refresh(force=True)
+        self.assertEqual(self.redact('telegram'), ('telegram', False))
+
+    def test_refresh_waits_for_interval(self):
+        BlockedTerm.objects.create(term='telegram')
+        self.blocklist.refresh()
+        self.assertEqual(self.redact('telegram'), ('telegram', False))
+
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+    CHAT_RATE_LIMIT={'CONNECTION': {'RATE': 0.01, 'BURST': 1}, 'MAX_VIOLATIONS': 2},
+)
+class ChatRateLimitTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='flooder', email='flooder@example.com', password='pw')
+        self.room = ChatRoom.objects.create(name='Flood', room_type='general', created_by=self.user)
+        self.room.participants.add(self.user)
+
+    async def receive_until(self, communicator, predicate):
+        while True:
+            output = await communicator.receive_output(timeout=2)
+            if predicate(output):
+                return output
+
+    async def test_throttled_then_closed(self):
+        communicator = chat_communicator(self.room, self.user)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        # The burst of one allows the first frame; the second is throttled with a hint
+        await communicator.send_to(text_data=json.dumps({"type": "typing"}))
+        await communicator.send_to(text_data=json.dumps({"type": "typing"}))
+        frame = await self.receive_until(
+            communicator, lambda output: 'rate_limited' in output.get('text', '')
+        )
+        throttled = json.loads(frame['text'])
+        self.assertEqual(throttled['event'], 'typing')
+        self.assertGreater(throttled['retry_after_ms'], 0)
+
+        # MAX_VIOLATIONS reached: the connection is closed with the rate limit code
+        await communicator.send_to(text_data=json.dumps({"type": "typing"}))
+        closed = await self.receive_until(communicator, lambda output: output['type'] == 'websocket.close')
+        self.assertEqual(closed['code'], rate_limit.CLOSE_CODE)
+
+
+class FilterExecutorTests(TestCase):
+    def setUp(self):
+        self.executor = FilterExecutor(mode='thread', max_workers=1, max_pending=1, timeout_ms=50)
+        self.addCleanup(self.executor.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def blocking_filter(self, text, room_type=None):
+        self.release.wait(5)
+        return text, False, ""
+
+    async def wait_for_idle(self):
+        for _ in range(100):
+            if not self.executor.pending:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("filter work was never released")
+
+    async def test_filters_in_pool(self):
+        result = await self.executor.filter("Call me at 0300-382-0801")
+        self.assertEqual(result, ("Call me at [PHONE REMOVED]", True, "phone"))
+        await self.wait_for_idle()
+
+    async def test_timeout_then_backlog(self):
+        with mock.patch('chate_box.services.filter_executor.filter_message', self.blocking_filter):
+            with self.assertRaises(FilterUnavailable) as raised:
+                await self.executor.filter("slow")
+            self.assertEqual(raised.exception.reason, 'timeout')
+
+            # The timed out message still occupies the only pending slot
+            with self.assertRaises(FilterUnavailable) as raised:
+                await self.executor.filter("next")
+            self.assertEqual(raised.exception.reason, 'backlog')
+
+            self.release.set()
+            await self.wait_for_idle()
+            self.assertEqual(await self.executor.filter("next"), ("next", False, ""))
@@ -5,13 +5,16 @@ from .views import JobApplicationView
 urlpatterns = [
     # Chat rooms
     path('chat-rooms/', views.chat_room_list),
+    path('chat-rooms/inbox/', views.ChatInboxView.as_view()),
     path('chat-rooms/<int:pk>/', views.chat_room_detail),
     path('chat-rooms/<int:pk>/messages/', views.chat_room_messages),
+    path('chat-rooms/<int:pk>/presence/', views.chat_room_presence),
     path('chat-rooms/<int:pk>/add-participant/', views.add_participant),
     path('chat-rooms/<int:pk>/remove-participant/', views.remove_participant),
 
     # Messages
     path('messages/send/', views.send_message),
+    path('messages/search/', views.search_messages),
     path('messages/<int:message_id>/mark-read/', views.mark_message_read),
 
     # Job applications
@@ -1,22 +1,34 @@
 # views.py
 from rest_framework.views import APIView
+from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.pagination import CursorPagination
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.db.models import Q, Prefetch
+from django.db.models import Q, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime
 
-from .models import ChatRoom, Message, MessageRead
-from .serializers import ChatRoomSerializer, MessageSerializer, JobApplicationChatSerializer
+from .models import ChatRoom, Message, RoomReadState
+from .serializers import (
+    ChatRoomSerializer, ChatInboxSerializer, MessageSerializer, MessageSearchSerializer, JobApplicationChatSerializer
+)
+from .services.read_receipts import advance_read_states, read_positions, unread_filter
+from .services.sequence import next_seq_sync
+from .services.presence import snapshot_sync as presence_snapshot
+from .services import search as message_search
 from job_board.models import JobApplication, JobPost
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from authentication.models import User
 
 
+VISIBLE_MESSAGE_STATUSES = ['sent', 'delivered', 'read']
+
+
 def parse_time(value):
     return datetime.strptime(value, "%H:%M").time()
 
@@ -31,14 +43,68 @@ def chat_room_list(request):
         Q(participants=user) | Q(created_by=user)
     ).distinct().prefetch_related(
         'participants',
-        'created_by',
-        Prefetch('messages', queryset=Message.objects.select_related('sender'))
+        'created_by'
     )
 
     serializer = ChatRoomSerializer(queryset, many=True, context={'request': request})
     return Response(serializer.data)
 
 
+class ChatInboxPagination(CursorPagination):
+    """Keyset pagination over the most recently active rooms"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-updated_at', '-id')
+
+
+class ChatInboxView(generics.ListAPIView):
+    """
+    Room list for the logged-in user with each room's last message,
+    last activity and unread count, most recently active first.
+
+    The last message and unread count are computed with subqueries, so the
+    cost depends on the number of rooms on the page, not on message history.
+
+    Query Parameters:
+    - cursor: Opaque cursor from the previous page's next/previous link
+    - page_size: Number of rooms per page (max 100)
+    """
+    serializer_class = ChatInboxSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ChatInboxPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        visible = Message.objects.filter(room=OuterRef('pk'), status__in=VISIBLE_MESSAGE_STATUSES)
+        read_state = RoomReadState.objects.filter(room=OuterRef('pk'), user=user)
+
+        last_message = visible.order_by('-seq').values('id')[:1]
+        unread = visible.exclude(sender=user).filter(
+            unread_filter(OuterRef('read_seq'))
+        ).order_by().values('room').annotate(count=Count('id')).values('count')
+
+        return ChatRoom.objects.filter(
+            Q(id__in=user.chat_rooms.values('id')) | Q(created_by=user)
+        ).annotate(
+            read_seq=Coalesce(Subquery(read_state.values('last_read_seq')[:1]), 0),
+            last_message_id=Subquery(last_message),
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0),
+        )
+
+    def list(self, request, *args, **kwargs):
+        rooms = self.paginate_queryset(self.get_queryset())
+        message_ids = [room.last_message_id for room in rooms if room.last_message_id]
+        last_messages = Message.objects.select_related(
+            'sender', 'sender__teacher_profile', 'sender__student_profile'
+        ).in_bulk(message_ids)
+
+        serializer = self.get_serializer(rooms, many=True, context={
+            **self.get_serializer_context(), 'last_messages': last_messages
+        })
+        return self.get_paginated_response(serializer.data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def chat_room_detail(request, pk):
@@ -81,32 +147,117 @@ def remove_participant(request, pk):
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+MESSAGES_DEFAULT_LIMIT = 50
+MESSAGES_MAX_LIMIT = 100
+SEARCH_MIN_QUERY_LENGTH = 2
+
+
+def _parse_positive_int(value, name):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Must be a positive integer.'})
+    if number < 1:
+        raise ValidationError({name: 'Must be a positive integer.'})
+    return number
+
+
+def _message_cursor(messages, params, name):
+    """``seq`` of the message named by ``params[name]``, used as keyset cursor."""
+    message_id = _parse_positive_int(params[name], name)
+    seq = messages.filter(id=message_id).values_list('seq', flat=True).first()
+    if seq is None:
+        raise ValidationError({name: f'Message {message_id} not found in this room.'})
+    return seq
+
+
+def _older_than(messages, cursor, limit, inclusive=False):
+    """Up to ``limit`` messages before ``cursor`` (newest first) and whether more exist."""
+    seq_filter = Q(seq__lte=cursor) if inclusive else Q(seq__lt=cursor)
+    page = list(messages.filter(seq_filter).order_by('-seq')[:limit + 1])
+    return page[:limit], len(page) > limit
+
+
+def _newer_than(messages, cursor, limit):
+    """Up to ``limit`` messages after ``cursor`` (oldest first) and whether more exist."""
+    page = list(messages.filter(seq__gt=cursor).order_by('seq')[:limit + 1])
+    return page[:limit], len(page) > limit
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def chat_room_messages(request, pk):
+    """
+    Keyset-paginated room history, always returned oldest first.
+
+    Query params (at most one of before_id / after_id / around):
+    - before_id: messages older than this message (scrolling up)
+    - after_id: messages newer than this message (catching up)
+    - around: the message itself with history on both sides (jump to reply)
+    - limit: page size (default 50, max 100)
+    Without a cursor the latest messages are returned.
+    """
     user = request.user
     room = get_object_or_404(ChatRoom, id=pk)
     if not (room.participants.filter(id=user.id).exists() or room.created_by == user):
         raise PermissionDenied("You are not a participant of this room")
 
-    messages = room.messages.filter(status__in=['sent', 'delivered', 'read']).select_related('sender').prefetch_related(
-        'read_by__user')
-
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 50))
-    start = (page - 1) * page_size
-    end = start + page_size
+    messages = room.messages.filter(status__in=VISIBLE_MESSAGE_STATUSES).select_related(
+        'sender', 'sender__teacher_profile', 'sender__student_profile')
+
+    params = request.query_params
+    limit = min(_parse_positive_int(params.get('limit', MESSAGES_DEFAULT_LIMIT), 'limit'), MESSAGES_MAX_LIMIT)
+    cursors = [name for name in ('before_id', 'after_id', 'around') if params.get(name)]
+    if len(cursors) > 1:
+        raise ValidationError({'detail': 'Use only one of before_id, after_id or around.'})
+
+    response = {}
+    if 'after_id' in cursors:
+        cursor = _message_cursor(messages, params, 'after_id')
+        page, has_more = _newer_than(messages, cursor, limit)
+        response['has_more'] = has_more
+    elif 'around' in cursors:
+        cursor = _message_cursor(messages, params, 'around')
+        before_limit = max(limit // 2, 1)
+        older, has_more_before = _older_than(messages, cursor, before_limit, inclusive=True)
+        newer, has_more_after = _newer_than(messages, cursor, max(limit - len(older), 0))
+        page = older[::-1] + newer
+        response['has_more_before'] = has_more_before
+        response['has_more_after'] = has_more_after
+        response['has_more'] = has_more_before or has_more_after
+    else:
+        if 'before_id' in cursors:
+            cursor = _message_cursor(messages, params, 'before_id')
+            older, has_more = _older_than(messages, cursor, limit)
+        else:
+            older = list(messages.order_by('-seq')[:limit + 1])
+            older, has_more = older[:limit], len(older) > limit
+        page = older[::-1]
+        response['has_more'] = has_more
 
-    paginated_messages = messages[start:end]
-    serializer = MessageSerializer(paginated_messages, many=True, context={'request': request})
+    serializer = MessageSerializer(page, many=True, context={
+        'request': request, 'read_positions': read_positions(room)
+    })
     return Response({
         'messages': serializer.data,
-        'total_count': messages.count(),
-        'page': page,
-        'has_next': end < messages.count()
+        **response,
+        'limit': limit,
+        'before_id': page[0].id if page else None,
+        'after_id': page[-1].id if page else None,
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def chat_room_presence(request, pk):
+    """Users currently connected to the room's websocket"""
+    user = request.user
+    room = get_object_or_404(ChatRoom, id=pk)
+    if not (room.participants.filter(id=user.id).exists() or room.created_by == user):
+        raise PermissionDenied("You are not a participant of this room")
+    return Response({'room': room.id, 'users': presence_snapshot('chat', room.id)})
+
+
 # ---------------- Messages ----------------
 
 @api_view(['POST'])
@@ -124,20 +275,76 @@ def send_message(request):
 
     serializer = MessageSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
-        serializer.save(sender=user)
+        serializer.save(sender=user, seq=next_seq_sync(room.id))
         room.updated_at = timezone.now()
         room.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages(request):
+    """
+    Ranked full-text search over message content.
+
+    Query params:
+    - q: search text (required)
+    - room: limit to one room
+    - scope: 'all' searches every room, including blocked messages (staff only);
+      otherwise only rooms the user participates in or created
+    - forbidden: 'true' to return only messages with forbidden content
+    - cursor: ``next_cursor`` of the previous page
+    - limit: page size (default 50, max 100)
+    """
+    user = request.user
+    params = request.query_params
+    query = params.get('q', '').strip()
+    if len(query) < SEARCH_MIN_QUERY_LENGTH:
+        raise ValidationError({'q': f'Must be at least {SEARCH_MIN_QUERY_LENGTH} characters.'})
+    limit = min(_parse_positive_int(params.get('limit', MESSAGES_DEFAULT_LIMIT), 'limit'), MESSAGES_MAX_LIMIT)
+
+    if params.get('scope') == 'all':
+        if not user.is_staff:
+            raise PermissionDenied("Only staff can search all rooms")
+        messages = Message.objects.all()
+    else:
+        rooms = ChatRoom.objects.filter(Q(participants=user) | Q(created_by=user)).values('id')
+        messages = Message.objects.filter(room__in=rooms, status__in=VISIBLE_MESSAGE_STATUSES)
+
+    if params.get('room'):
+        messages = messages.filter(room_id=_parse_positive_int(params['room'], 'room'))
+    if params.get('forbidden') == 'true':
+        messages = messages.filter(has_forbidden_content=True)
+
+    cursor = None
+    if params.get('cursor'):
+        try:
+            cursor = message_search.decode_cursor(params['cursor'])
+        except ValueError:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    results = message_search.search(messages, query).select_related(
+        'sender', 'sender__teacher_profile', 'sender__student_profile')
+    page, has_more = message_search.ranked_page(results, cursor, limit)
+
+    serializer = MessageSearchSerializer(page, many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'has_more': has_more,
+        'next_cursor': message_search.encode_cursor(page[-1]) if has_more else None,
+        'limit': limit,
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_message_read(request, message_id):
     message = get_object_or_404(Message, id=message_id)
     if not message.room.participants.filter(id=request.user.id).exists():
         raise PermissionDenied("Access denied")
-    MessageRead.objects.get_or_create(message=message, user=request.user)
+    # Reading a message marks everything up to it as read
+    advance_read_states({(message.room_id, request.user.id): {message.id}})
     return Response({'message': 'Message marked as read'})
 
 
@@ -44,16 +44,9 @@ class Course(models.Model):
         return Meeting.objects.filter(course=self, meeting_type='lecture')
 
     def has_user_paid(self, user):
-
-        if self.course_type == 'free':
-            return True
-        
-        from payments.models import Payment
-        return Payment.objects.filter(
-            user=user,
-            course=self,
-            is_successful=True
-        ).exists()
+        # Free course, or a successful payment recorded as an entitlement
+        from entitlements.access import has_access
+        return has_access(user, self)
 
 
 
@@ -19,6 +19,7 @@ from .serializers import (
     VideoWithTopicSerializer,VideoSerializer
 )
 from authentication.models import TeacherProfile,User
+from entitlements.access import has_access
 
 
 class CourseListView(ListAPIView):
@@ -133,7 +134,7 @@ def topic_detail(request, topic_id):
         # Check if user has access to the course
         user_has_access = True
         if hasattr(request, 'user') and request.user.is_authenticated:
-            user_has_access = topic.course.has_user_paid(request.user)
+            user_has_access = has_access(request.user, topic.course)
         elif topic.course.course_type == 'paid':
             user_has_access = False
         
@@ -170,7 +171,7 @@ def topic_videos(request, topic_id):
         # Check access
         user_has_access = True
         if hasattr(request, request.user) and request.user.is_authenticated:
-            user_has_access = topic.course.has_user_paid(request.user)
+            user_has_access = has_access(request.user, topic.course)
         elif topic.course.course_type == 'paid':
             user_has_access = False
         
@@ -240,7 +241,7 @@ def video_detail_with_topic(request, video_id):
         # Check access
         user_has_access = True
         if hasattr(request, 'user') and request.user.is_authenticated:
-            user_has_access = video.course.has_user_paid(request.user)
+            user_has_access = has_access(request.user, video.course)
         elif video.course.course_type == 'paid' and not video.is_free_preview:
             user_has_access = False
         
@@ -311,7 +312,7 @@ def course_videos(request, course_id):
         course = Course.objects.get(id=course_id, is_active=True)
         user_has_access = True
         if hasattr(request, 'user') and request.user.is_authenticated:
-            user_has_access = course.has_user_paid(request.user)
+            user_has_access = has_access(request.user, course)
         elif course.course_type == 'paid':
             user_has_access = False
 
@@ -0,0 +1,112 @@
+# entitlements/access.py
+"""
+Access checks backed by the Entitlement table.
+
+``has_access(user, resource)`` answers "may this user use this course /
+group session / live class" from the user's entitlements for the resource,
+which are cached in Redis (``entitlements:<user_id>:<type>:<id>``) and
+invalidated whenever ``sync`` rewrites them. Cache fills are guarded by a
+generation counter, so a read racing with an invalidation does not write
+the old grants back.
+"""
+import json
+
+from django.apps import apps
+from django.utils import timezone
+
+from .models import Entitlement
+from lms.redis_client import invalidate_generation, read_generation, redis_client, set_if_generation
+from .rules import derive
+
+CACHE_TTL_SECONDS = 15 * 60
+
+# model label -> Entitlement.resource_type
+RESOURCE_TYPES = {
+    'courses.course': 'course',
+    'group_sessions.groupsession': 'group_session',
+    'individual_live_class.liveclassschedule': 'live_class',
+}
+
+# Sources that grant access to a resource of each type
+ACCESS_SOURCES = {
+    'course': {'payment'},
+    'group_session': {'payment', 'enrollment'},
+    'live_class': {'subscription'},
+}
+
+# Resources anyone may access without an entitlement
+IS_FREE = {
+    'course': lambda course: course.course_type == 'free',
+    'group_session': lambda session: session.is_free,
+    'live_class': lambda schedule: False,
+}
+
+
+def resource_key(resource):
+    return RESOURCE_TYPES[resource._meta.label_lower], str(resource.pk)
+
+
+def _cache_key(user_id, resource_type, resource_id):
+    return f"entitlements:{user_id}:{resource_type}:{resource_id}"
+
+
+def _load(user_id, resource_type, resource_id):
+    """{source: valid_until timestamp or None} from the cache, or the table on a miss."""
+    key = _cache_key(user_id, resource_type, resource_id)
+    cached = redis_client.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    generation = read_generation(key)
+    rows = Entitlement.objects.filter(
+        user_id=user_id, resource_type=resource_type, resource_id=resource_id
+    ).values_list('source', 'valid_until')
+    grants = {source: valid_until and valid_until.timestamp() for source, valid_until in rows}
+    set_if_generation(key, json.dumps(grants), CACHE_TTL_SECONDS, generation)
+    return grants
+
+
+def entitlement_sources(user, resource):
+    """Sources of the user's current (unexpired) entitlements for ``resource``."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    now = timezone.now().timestamp()
+    grants = _load(user.pk, *resource_key(resource))
+    return frozenset(
+        source for source, valid_until in grants.items()
+        if valid_until is None or valid_until > now
+    )
+
+
+def has_access(user, resource, sources=None):
+    """
+    True when ``resource`` is free or the user holds an entitlement that grants
+    access to it. Pass ``sources`` if they were already fetched with
+    ``entitlement_sources``.
+    """
+    resource_type = RESOURCE_TYPES[resource._meta.label_lower]
+    if IS_FREE[resource_type](resource):
+        return True
+    if sources is None:
+        sources = entitlement_sources(user, resource)
+    return bool(sources & ACCESS_SOURCES[resource_type])
+
+
+def invalidate(user_id, resource_type, resource_id):
+    invalidate_generation(_cache_key(user_id, resource_type, resource_id))
+
+
+def sync(user_id, resource_type, resource_id, source):
+    """Re-derive one entitlement from the tables that grant it."""
+    resource_id = str(resource_id)
+    rows = list(derive(apps.get_model, resource_type, source, user_id=user_id, resource_id=resource_id))
+    if rows:
+        Entitlement.objects.update_or_create(
+            user_id=user_id, resource_type=resource_type, resource_id=resource_id, source=source,
+            defaults={'valid_until': rows[0][2]},
+        )
+    else:
+        Entitlement.objects.filter(
+            user_id=user_id, resource_type=resource_type, resource_id=resource_id, source=source
+        ).delete()
+    invalidate(user_id, resource_type, resource_id)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Entitlement
+
+
+@admin.register(Entitlement)
+class EntitlementAdmin(admin.ModelAdmin):
+    list_display = ['user', 'resource_type', 'resource_id', 'source', 'valid_until', 'updated_at']
+    list_filter = ['resource_type', 'source']
+    search_fields = ['user__username', 'user__email', 'resource_id']
+    raw_id_fields = ['user']
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class EntitlementsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'entitlements'
+
+    def ready(self):
+        # Import signals so they get registered
+        import entitlements.signals
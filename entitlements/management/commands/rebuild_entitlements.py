@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms.redis_client import invalidate_generation, redis_client
+from entitlements.rules import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Entitlement table from payments, enrollments and live class subscriptions'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild(apps.get_model)
+
+        # Drop cached access checks so they are re-read from the new rows
+        # (bumping their generations, so checks already reading the old rows don't cache them)
+        keys = [key for key in redis_client.scan_iter(match='entitlements:*', count=1000) if not key.endswith(':gen')]
+        for start in range(0, len(keys), 1000):
+            invalidate_generation(*keys[start:start + 1000])
+        deleted = len(keys)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} entitlements, cleared {deleted} cached access checks'
+        ))
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:03
+
+from datetime import datetime, time
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+
+# Frozen copy of entitlements.rules as of this migration, so later rule changes
+# do not change what the backfill did:
+# (resource_type, source, model, condition, user_field, resource_field, until_field)
+BACKFILL_RULES = [
+    ('course', 'payment', 'payments.Payment', lambda: Q(is_successful=True), 'user_id', 'course_id', None),
+    ('course', 'enrollment', 'courses.Enrollment', lambda: Q(), 'student__user_id', 'course_id', None),
+    ('group_session', 'payment', 'payments.Payment', lambda: Q(is_successful=True), 'user_id', 'group_session_id', None),
+    ('group_session', 'enrollment', 'group_sessions.GroupSessionEnrollment', lambda: Q(status='enrolled'),
+     'student_id', 'session_id', None),
+    ('live_class', 'subscription', 'individual_live_class.LiveClassSubscription',
+     lambda: Q(status='active', end_date__gte=timezone.localdate(), classes_attended__lt=F('classes_included')),
+     'student__user_id', 'schedule_id', 'end_date'),
+]
+
+
+def backfill_entitlements(apps, schema_editor):
+    Entitlement = apps.get_model('entitlements', 'Entitlement')
+    entitlements = []
+    for resource_type, source, model, condition, user_field, resource_field, until_field in BACKFILL_RULES:
+        rows = apps.get_model(model).objects.filter(condition(), **{f'{resource_field}__isnull': False})
+        fields = (user_field, resource_field)
+        if until_field is None:
+            rows = ((user_id, resource_id, None) for user_id, resource_id in rows.values_list(*fields).distinct())
+        else:
+            rows = (
+                (user_id, resource_id, timezone.make_aware(datetime.combine(until, time.max)))
+                for user_id, resource_id, until in rows.values(*fields).annotate(
+                    until=Max(until_field)).values_list(*fields, 'until')
+            )
+        entitlements.extend(
+            Entitlement(
+                user_id=user_id, resource_type=resource_type, resource_id=str(resource_id),
+                source=source, valid_until=valid_until
+            )
+            for user_id, resource_id, valid_until in rows
+        )
+    Entitlement.objects.bulk_create(entitlements, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('group_sessions', '0002_initial'),
+        ('individual_live_class', '0002_liveclassinvitation'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(choices=[('course', 'Course'), ('group_session', 'Group Session'), ('live_class', 'Live Class Schedule')], max_length=20)),
+                ('resource_id', models.CharField(max_length=64)),
+                ('source', models.CharField(choices=[('payment', 'Payment'), ('enrollment', 'Enrollment'), ('subscription', 'Subscription')], max_length=20)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'resource_type', 'resource_id', 'source')},
+            },
+        ),
+        migrations.RunPython(backfill_entitlements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# entitlements/models.py
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class Entitlement(models.Model):
+    """
+    Materialized "user may access resource" fact.
+
+    Rows are derived from payments, enrollments and live class subscriptions
+    (see rules.py) and kept in sync by signals, so access checks read one
+    indexed row instead of re-deriving it from those tables.
+    """
+    RESOURCE_TYPES = [
+        ('course', 'Course'),
+        ('group_session', 'Group Session'),
+        ('live_class', 'Live Class Schedule'),
+    ]
+
+    SOURCES = [
+        ('payment', 'Payment'),
+        ('enrollment', 'Enrollment'),
+        ('subscription', 'Subscription'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entitlements')
+    resource_type = models.CharField(max_length=20, choices=RESOURCE_TYPES)
+    # Course and schedule ids are integers, group session ids are UUIDs
+    resource_id = models.CharField(max_length=64)
+    source = models.CharField(max_length=20, choices=SOURCES)
+    valid_until = models.DateTimeField(null=True, blank=True)  # null = no expiry
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'resource_type', 'resource_id', 'source']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.resource_type}:{self.resource_id} ({self.source})"
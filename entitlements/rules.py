@@ -0,0 +1,87 @@
+# entitlements/rules.py
+"""
+How each kind of entitlement is derived from the tables that grant it.
+
+The functions take a ``get_model`` callable instead of importing models.
+The initial migration has its own frozen copy of these rules; changes here
+only apply going forward (run ``rebuild_entitlements`` after changing them).
+"""
+from collections import namedtuple
+from datetime import datetime, time
+
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+Rule = namedtuple('Rule', ['model', 'condition', 'user_field', 'resource_field', 'until_field'])
+
+
+def _active_subscription():
+    return Q(
+        status='active',
+        end_date__gte=timezone.localdate(),
+        classes_attended__lt=F('classes_included'),
+    )
+
+
+# (resource_type, source) -> Rule
+RULES = {
+    ('course', 'payment'): Rule(
+        'payments.Payment', lambda: Q(is_successful=True), 'user_id', 'course_id', None
+    ),
+    ('course', 'enrollment'): Rule(
+        'courses.Enrollment', lambda: Q(), 'student__user_id', 'course_id', None
+    ),
+    ('group_session', 'payment'): Rule(
+        'payments.Payment', lambda: Q(is_successful=True), 'user_id', 'group_session_id', None
+    ),
+    ('group_session', 'enrollment'): Rule(
+        'group_sessions.GroupSessionEnrollment', lambda: Q(status='enrolled'), 'student_id', 'session_id', None
+    ),
+    ('live_class', 'subscription'): Rule(
+        'individual_live_class.LiveClassSubscription', _active_subscription,
+        'student__user_id', 'schedule_id', 'end_date'
+    ),
+}
+
+
+def _end_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def derive(get_model, resource_type, source, user_id=None, resource_id=None):
+    """
+    Yield (user_id, resource_id, valid_until) for every entitlement of this
+    kind, optionally narrowed to one user and/or resource.
+    """
+    rule = RULES[(resource_type, source)]
+    rows = get_model(rule.model).objects.filter(rule.condition(), **{f'{rule.resource_field}__isnull': False})
+    if user_id is not None:
+        rows = rows.filter(**{rule.user_field: user_id})
+    if resource_id is not None:
+        rows = rows.filter(**{rule.resource_field: resource_id})
+
+    fields = (rule.user_field, rule.resource_field)
+    if rule.until_field is None:
+        for row_user_id, row_resource_id in rows.values_list(*fields).distinct():
+            yield row_user_id, str(row_resource_id), None
+        return
+
+    rows = rows.values(*fields).annotate(until=Max(rule.until_field)).values_list(*fields, 'until')
+    for row_user_id, row_resource_id, until in rows:
+        yield row_user_id, str(row_resource_id), _end_of_day(until)
+
+
+def rebuild(get_model, batch_size=1000):
+    """Replace every entitlement with what the granting tables say now."""
+    Entitlement = get_model('entitlements.Entitlement')
+    Entitlement.objects.all().delete()
+    entitlements = [
+        Entitlement(
+            user_id=user_id, resource_type=resource_type, resource_id=resource_id,
+            source=source, valid_until=valid_until
+        )
+        for resource_type, source in RULES
+        for user_id, resource_id, valid_until in derive(get_model, resource_type, source)
+    ]
+    Entitlement.objects.bulk_create(entitlements, batch_size=batch_size, ignore_conflicts=True)
+    return len(entitlements)
@@ -0,0 +1,44 @@
+# entitlements/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from courses.models import Enrollment
+from group_sessions.models import GroupSessionEnrollment
+from individual_live_class.models import LiveClassSubscription
+from payments.models import Payment
+from .access import sync
+
+
+def _sync_on_commit(user_id, resource_type, resource_id, source):
+    if user_id is not None and resource_id is not None:
+        transaction.on_commit(partial(sync, user_id, resource_type, resource_id, source))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def sync_payment_entitlement(sender, instance, **kwargs):
+    if instance.course_id:
+        _sync_on_commit(instance.user_id, 'course', instance.course_id, 'payment')
+    if instance.group_session_id:
+        _sync_on_commit(instance.user_id, 'group_session', instance.group_session_id, 'payment')
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def sync_course_enrollment_entitlement(sender, instance, **kwargs):
+    _sync_on_commit(instance.student.user_id, 'course', instance.course_id, 'enrollment')
+
+
+@receiver(post_save, sender=GroupSessionEnrollment)
+@receiver(post_delete, sender=GroupSessionEnrollment)
+def sync_group_session_entitlement(sender, instance, **kwargs):
+    _sync_on_commit(instance.student_id, 'group_session', instance.session_id, 'enrollment')
+
+
+@receiver(post_save, sender=LiveClassSubscription)
+@receiver(post_delete, sender=LiveClassSubscription)
+def sync_subscription_entitlement(sender, instance, **kwargs):
+    _sync_on_commit(instance.student.user_id, 'live_class', instance.schedule_id, 'subscription')
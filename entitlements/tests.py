@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from authentication.models import User
+from courses.models import Course
+from lms.redis_client import generation_key, redis_client
+from . import access
+from .models import Entitlement
+
+
+class HasAccessTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', email='learner@example.com', password='pw')
+        # has_access only reads the type and pk, so the course need not be stored
+        self.course = Course(pk=987654, course_type='paid')
+        key = access._cache_key(self.user.pk, 'course', self.course.pk)
+        self.addCleanup(redis_client.delete, key, generation_key(key))
+
+    def grant(self, source='payment', valid_until=None):
+        return Entitlement.objects.create(
+            user=self.user, resource_type='course', resource_id=str(self.course.pk),
+            source=source, valid_until=valid_until,
+        )
+
+    def invalidate(self):
+        access.invalidate(self.user.pk, 'course', str(self.course.pk))
+
+    def test_free_course(self):
+        self.assertTrue(access.has_access(self.user, Course(pk=self.course.pk, course_type='free')))
+
+    def test_granting_sources_and_expiry(self):
+        self.assertFalse(access.has_access(self.user, self.course))
+        self.invalidate()
+        # An enrollment alone does not grant a paid course
+        self.grant(source='enrollment')
+        self.assertFalse(access.has_access(self.user, self.course))
+        self.invalidate()
+        self.grant(valid_until=timezone.now() - timedelta(days=1))
+        self.assertFalse(access.has_access(self.user, self.course))
+        self.invalidate()
+        Entitlement.objects.filter(source='payment').update(valid_until=timezone.now() + timedelta(days=1))
+        self.assertTrue(access.has_access(self.user, self.course))
+
+    def test_cached_until_invalidated(self):
+        self.assertFalse(access.has_access(self.user, self.course))
+        self.grant()
+        with self.assertNumQueries(0):
+            self.assertFalse(access.has_access(self.user, self.course))
+        self.invalidate()
+        self.assertTrue(access.has_access(self.user, self.course))
+
+    def test_sync_revokes(self):
+        self.grant()
+        self.assertTrue(access.has_access(self.user, self.course))
+        # No successful payment backs the entitlement any more
+        access.sync(self.user.pk, 'course', self.course.pk, 'payment')
+        self.assertFalse(Entitlement.objects.exists())
+        self.assertFalse(access.has_access(self.user, self.course))
+
+    def test_load_racing_an_invalidation_is_not_cached(self):
+        self.grant()
+        set_if_generation = access.set_if_generation
+
+        def revoke_then_set(*args):
+            # The entitlement is revoked and invalidated after the load read it
+            Entitlement.objects.all().delete()
+            self.invalidate()
+            return set_if_generation(*args)
+
+        with mock.patch.object(access, 'set_if_generation', revoke_then_set):
+            self.assertTrue(access.has_access(self.user, self.course))
+        self.assertFalse(access.has_access(self.user, self.course))
@@ -119,12 +119,11 @@ class GroupSession(models.Model):
 
     def can_student_join(self, student):
         """Check if a student can join this session"""
+        from entitlements.access import entitlement_sources, has_access
+
         # Check enrollment
-        if GroupSessionEnrollment.objects.filter(
-                session=self,
-                student=student,
-                status='enrolled'
-        ).exists():
+        sources = entitlement_sources(student, self)
+        if 'enrollment' in sources:
             return True, "Already enrolled"
 
         # Check capacity
@@ -138,14 +137,8 @@ class GroupSession(models.Model):
             return False, "Session has ended"
 
         # Check payment for paid sessions
-        if not self.is_free:
-            has_payment = Payment.objects.filter(
-                user=student,
-                group_session=self,
-                is_successful=True,
-            ).exists()
-            if not has_payment:
-                return False, "Payment required"
+        if not has_access(student, self, sources):
+            return False, "Payment required"
 
         return True, "Can enroll"
 
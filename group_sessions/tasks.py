@@ -0,0 +1,28 @@
+# group_sessions/tasks.py
+from celery import shared_task
+
+from notifications.models import Notification
+from .models import GroupSession
+
+
+@shared_task
+def send_group_session_reminder(session_id):
+    """Tell the teacher and enrolled students that a session is about to start (fired by the reminder scheduler)"""
+    session = GroupSession.objects.filter(id=session_id, status='published').first()
+    if session is None:
+        return 0
+
+    starts_at = session.start_time.strftime('%Y-%m-%d %H:%M')
+    student_ids = session.enrollments.filter(status='enrolled').values_list('student_id', flat=True)
+    notifications = [
+        Notification(
+            recipient_id=recipient_id,
+            notification_type='meeting_start',
+            title='Group Session Starting Soon',
+            message=f"'{session.title}' starts at {starts_at}.",
+            meeting=session.meeting,
+        )
+        for recipient_id in [session.teacher_id, *student_ids]
+    ]
+    Notification.objects.bulk_create(notifications)
+    return len(notifications)
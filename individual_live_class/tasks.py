@@ -9,6 +9,7 @@ from django.db.models import Q
 
 from .models import LiveClassPayment, LiveClassSchedule, LiveClassSubscription, LiveClassSession
 from notifications.models import Notification
+from reminders.scheduler import remind_before
 
 
 @shared_task
@@ -124,33 +125,36 @@ def send_subscription_expiry_email(subscription_id):
 
 @shared_task
 def send_class_reminder():
-    """Send reminder for upcoming classes (1 hour before)"""
-    reminder_time = timezone.now() + timedelta(hours=1)
-    
+    """
+    Make sure every upcoming class has its reminder scheduled (1 hour before).
+    Reminders are scheduled when sessions are saved and sent by the reminder
+    scheduler; this only backfills sessions saved before it existed, so run
+    it once. Those starting within the hour are reminded right away.
+    """
     upcoming_sessions = LiveClassSession.objects.filter(
-        scheduled_datetime__range=[
-            timezone.now(),
-            reminder_time
-        ],
+        scheduled_datetime__gt=timezone.now(),
         status='scheduled'
-    )
+    ).values_list('id', 'scheduled_datetime')
     
-    for session in upcoming_sessions:
-        # Send to student
-        if session.schedule.student.user.email:
-            send_class_reminder_email.delay(
-                session.id, 
-                session.schedule.student.user.email,
-                'student'
-            )
-        
-        # Send to teacher
-        if session.schedule.teacher.user.email:
-            send_class_reminder_email.delay(
-                session.id,
-                session.schedule.teacher.user.email,
-                'teacher'
-            )
+    for session_id, scheduled_datetime in upcoming_sessions:
+        # As new to the scheduler: a reminder already past its time is sent now
+        remind_before('live_class_session', session_id, scheduled_datetime, created=True)
+
+
+@shared_task
+def send_session_reminder(session_id):
+    """Reminder for one upcoming class, fired by the reminder scheduler"""
+    session = LiveClassSession.objects.select_related(
+        'schedule__student__user', 'schedule__teacher__user'
+    ).get(id=session_id)
+    
+    # Send to student
+    if session.schedule.student.user.email:
+        send_class_reminder_email(session.id, session.schedule.student.user.email, 'student')
+    
+    # Send to teacher
+    if session.schedule.teacher.user.email:
+        send_class_reminder_email(session.id, session.schedule.teacher.user.email, 'teacher')
 
 
 @shared_task
@@ -24,6 +24,7 @@ from .serializers import (
 )
 from authentication.models import StudentProfile, TeacherProfile,User
 from meetings.models import Meeting
+from entitlements.access import has_access
 from notifications.models import Notification
 from rest_framework.permissions import IsAuthenticated
 from job_board.models import JobApplication
@@ -387,12 +388,7 @@ def join_live_class(request, schedule_id):
         if not schedule.demo_completed:
             can_join = True
         else:
-            active_sub = LiveClassSubscription.objects.filter(
-                schedule=schedule,
-                student=student,
-                status='active'
-            ).first()
-            can_join = active_sub and active_sub.can_attend_class()
+            can_join = has_access(user, schedule)
         
         if not can_join:
             return Response(
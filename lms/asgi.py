@@ -5,6 +5,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lms.settings")
 django_asgi_app = get_asgi_application()
 
 import chate_box.routing  # <-- import after get_asgi_application
+import chat.routing
+import alerts.routing
 
 from channels.routing import ProtocolTypeRouter, URLRouter
 from chate_box.middleware import JWTAuthMiddlewareStack
@@ -14,6 +16,8 @@ application = ProtocolTypeRouter({
     "websocket": JWTAuthMiddlewareStack(
         URLRouter(
             chate_box.routing.websocket_urlpatterns
+            + chat.routing.websocket_urlpatterns
+            + alerts.routing.websocket_urlpatterns
         )
     ),
 })
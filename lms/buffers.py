@@ -0,0 +1,77 @@
+# lms/buffers.py
+"""
+Base class for the per-process write-behind buffers (chat messages, read
+receipts, meeting chat, heartbeats).
+
+Items are collected in the event loop and written in one go every
+``flush_interval_ms``, or as soon as ``max_batch_size`` items are pending.
+Subclasses say how an item is added with ``add`` (calling ``_schedule``
+afterwards) and how a batch is written with ``write`` (blocking, run in a
+thread by ``flush``); a buffer with an async writer overrides ``write_async``.
+"""
+import asyncio
+import atexit
+import logging
+
+from channels.db import database_sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    # Used in log messages, e.g. "Failed to write 3 chat messages"
+    description = 'items'
+
+    def __init__(self, flush_interval_ms, max_batch_size=None, flush_at_exit=True):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending = self.new_batch()
+        self._flush_handle = None
+        if flush_at_exit:
+            atexit.register(self.flush_sync)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def new_batch(self):
+        """Empty container for pending items."""
+        return []
+
+    def write(self, batch):
+        """Store ``batch``; blocking."""
+        raise NotImplementedError
+
+    async def write_async(self, batch):
+        await database_sync_to_async(self.write)(batch)
+
+    def _schedule(self):
+        """Flush now if the batch is full, otherwise make sure a flush is due."""
+        if self.max_batch_size and len(self._pending) >= self.max_batch_size:
+            asyncio.ensure_future(self.flush())
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(
+                self.flush_interval, lambda: asyncio.ensure_future(self.flush())
+            )
+
+    def _take(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, self.new_batch()
+        return batch
+
+    async def flush(self):
+        batch = self._take()
+        if batch:
+            try:
+                await self.write_async(batch)
+            except Exception:
+                logger.exception("Failed to write %d %s", len(batch), self.description)
+
+    def flush_sync(self):
+        """Blocking flush, used at interpreter shutdown."""
+        batch = self._take()
+        if batch:
+            self.write(batch)
@@ -30,4 +30,19 @@ app.conf.beat_schedule = {
         'task': 'email_automation.tasks.cleanup_old_email_logs',
         'schedule': crontab(hour=2, minute=0),  # Daily at 2 AM
     },
+    # Meeting, live class and group session reminders
+    'drain-reminders': {
+        'task': 'reminders.tasks.drain_reminders',
+        'schedule': 30.0,  # Every 30 seconds
+    },
+    # Live participant state (mute, video, hand raise, screen share) from Redis
+    'flush-participant-state': {
+        'task': 'meetings.tasks.flush_participant_state',
+        'schedule': 5.0,  # Every 5 seconds
+    },
+    # Live class alerts
+    'check-inactive-students': {
+        'task': 'alerts.tasks.check_inactive_students',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
 }
\ No newline at end of file
@@ -0,0 +1,64 @@
+# lms/redis_client.py
+"""
+Redis clients shared by every app (presence, chat sequences, rate limits,
+live meeting state, access lists, entitlements, heartbeats, reminders...).
+
+Also cache entries guarded by a generation counter. A reader takes the
+generation before loading from the database and only writes its result if
+no invalidation bumped the counter meanwhile, so a load that raced with a
+commit never puts the old value back.
+"""
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+# Blocking client for views and tasks
+redis_client = redis.StrictRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Client for consumers running in the event loop
+async_redis_client = aioredis.StrictRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+# SET KEYS[1] = ARGV[2] EX ARGV[3] only if the generation KEYS[2] still equals ARGV[1]
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+def generation_key(key):
+    return f"{key}:gen"
+
+
+def read_generation(key):
+    return redis_client.get(generation_key(key)) or '0'
+
+
+async def read_generation_async(key):
+    return await async_redis_client.get(generation_key(key)) or '0'
+
+
+def set_if_generation(key, value, ttl, generation):
+    """Cache ``value`` under ``key`` unless it was invalidated since ``generation`` was read."""
+    return bool(redis_client.eval(SET_IF_GENERATION, 2, key, generation_key(key), generation, value, ttl))
+
+
+async def set_if_generation_async(key, value, ttl, generation):
+    return bool(await async_redis_client.eval(
+        SET_IF_GENERATION, 2, key, generation_key(key), generation, value, ttl
+    ))
+
+
+def invalidate_generation(*keys, ttl=24 * 60 * 60):
+    """Drop cached ``keys`` and bump their generations so in-flight loads are not written back."""
+    if not keys:
+        return
+    pipe = redis_client.pipeline(transaction=True)
+    for key in keys:
+        pipe.incr(generation_key(key))
+        pipe.expire(generation_key(key), ttl)
+    pipe.delete(*keys)
+    pipe.execute()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -91,6 +92,8 @@ INSTALLED_APPS = [
     'chate_box',
     'activity',
     'group_sessions',
+    'entitlements',
+    'reminders',
      
 ]
 
@@ -138,6 +141,9 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Redis for app state shared between workers (chat sequences, presence, ...)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -216,6 +222,8 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 DEFAULT_FROM_EMAIL = 'noreply@lms.com'
 SITE_NAME = 'LMS Platform'
 SITE_URL = 'http://www.pentutor.com'
+# Frontend links in emails, e.g. <FRONTEND_URL>/meeting/join/<meeting id>
+FRONTEND_URL = os.environ.get('FRONTEND_URL', SITE_URL)
 
 # Job Board specific settings
 JOB_BOARD_SETTINGS = {
@@ -227,17 +235,99 @@ JOB_BOARD_SETTINGS = {
     'JOB_ALERT_BATCH_SIZE': 50,
 }
 
+# Chat (chate_box) message persistence, see chate_box/services/message_buffer.py
+CHAT_MESSAGE_BUFFER = {
+    'MODE': 'write_behind',  # 'write_behind' (PostgreSQL only) or 'sync'
+    'FLUSH_INTERVAL_MS': 250,
+    'MAX_BATCH_SIZE': 200,
+    'ID_BLOCK_SIZE': 100,
+    'FLUSH_ON_DISCONNECT': True,
+    'READ_FLUSH_INTERVAL_MS': 500,  # read receipts are coalesced per (room, user)
+}
+
+# Where the chat content filter runs, see chate_box/services/filter_executor.py
+CHAT_CONTENT_FILTER = {
+    'EXECUTOR': 'process',  # 'inline', 'thread' or 'process'
+    'MAX_WORKERS': 2,
+    'MAX_PENDING': 500,  # messages waiting for the filter before new ones are held back
+    'TIMEOUT_MS': 2000,
+    'BLOCKLIST_REFRESH_SECONDS': 10,  # how often each process checks BlockedTerm for changes
+}
+
+# Who is connected to which chat room / meeting, see chate_box/services/presence.py
+PRESENCE = {
+    'HEARTBEAT_SECONDS': 30,
+    'TTL_SECONDS': 90,  # users not heard from for this long are dropped
+}
+
+# Meeting chat (chat.ChatMessage), see chat/services/history.py
+MEETING_CHAT = {
+    'FLUSH_INTERVAL_MS': 500,
+    'MAX_BATCH_SIZE': 200,
+    'REPLAY_SIZE': 50,  # latest messages replayed to people joining a meeting
+    'REPLAY_TTL_SECONDS': 24 * 60 * 60,
+}
+
+# Meeting, live class and group session reminders (see reminders/scheduler.py)
+REMINDERS = {
+    'HANDLERS': {
+        'meeting': 'meetings.views.send_meeting_reminder',
+        'live_class_session': 'individual_live_class.tasks.send_session_reminder',
+        'group_session': 'group_sessions.tasks.send_group_session_reminder',
+    },
+    # How long before the start each kind of reminder fires
+    'LEAD_SECONDS': {
+        'meeting': 0,
+        'live_class_session': 60 * 60,
+        'group_session': 15 * 60,
+    },
+    'BATCH_SIZE': 500,
+}
+
+# Meeting invitation emails are sent by Celery in batches over one SMTP connection
+MEETING_INVITES = {
+    'EMAIL_BATCH_SIZE': 100,
+}
+
+# Live class heartbeats received over the alerts websocket
+ALERT_HEARTBEATS = {
+    'FLUSH_INTERVAL_MS': 1000,
+    'MAX_BATCH_SIZE': 1000,
+}
+
+# At most one alert per subject (e.g. meeting + student) per window, by alert type
+ALERT_SUPPRESSION_SECONDS = {
+    'inactivity': 10 * 60,
+}
+
+# Chat websocket rate limits (token buckets), see chate_box/services/rate_limit.py
+CHAT_RATE_LIMIT = {
+    # Any frame on one websocket, checked in-process
+    'CONNECTION': {'RATE': 10, 'BURST': 50},
+    # message.send / messages.resume per user and room type, shared across workers in Redis
+    'USER': {
+        'default': {'RATE': 1, 'BURST': 10},
+        'meeting': {'RATE': 2, 'BURST': 20},
+    },
+    # Throttled frames on one websocket (with no VIOLATION_WINDOW_SECONDS gap
+    # between them) before it is closed with code 4029
+    'MAX_VIOLATIONS': 20,
+    'VIOLATION_WINDOW_SECONDS': 60,
+}
+
 
 # Celery Configuration
-# CELERY_BROKER_URL = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
 # CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
-# Add this in settings.py:
-CELERY_TASK_ALWAYS_EAGER = True
-CELERY_TASK_EAGER_PROPAGATES = True
+# Tasks run inline only under the test runner or with CELERY_TASK_ALWAYS_EAGER=true
+# (local development without a worker); deployments need a worker and beat
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', str(TESTING)).lower() == 'true'
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
 
 
 # Password validation
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MeetingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'meetings'
+
+    def ready(self):
+        # Import signals so they get registered
+        import meetings.signals
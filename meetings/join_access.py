@@ -0,0 +1,156 @@
+# meetings/join_access.py
+"""
+Precomputed join decisions.
+
+For every meeting that is scheduled or live, the users allowed in and why
+are kept in a Redis hash ``meeting:access:<meeting pk>`` (user id -> reason),
+so a join attempt is one HGET instead of the host / enrollment / payment /
+invite / join request lookups in ``Meeting.can_user_join`` and the view.
+A ``*`` field means everyone may join.
+
+The list is built with a fixed number of set queries when a meeting is
+scheduled or goes live, and rebuilt lazily after signals drop it (new
+entitlements, invites, join request decisions, meeting changes). Only
+positive decisions are cached: a user missing from the list goes through
+the full checks, which also produce the error message.
+
+Dropping a list also bumps ``meeting:access:gen:<meeting pk>``. A build
+watches that counter while it reads the database and discards its result if
+the counter moved, so a list computed from rows that changed meanwhile is
+never written back.
+"""
+import json
+
+import redis
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from entitlements.models import Entitlement
+from .models import JoinRequest, Meeting, MeetingInvite
+from lms.redis_client import redis_client
+
+User = get_user_model()
+
+KEY_TTL_SECONDS = 24 * 60 * 60
+
+EVERYONE = '*'
+# Group session meetings are only joinable while the session runs
+WINDOW_FIELD = '_window'
+
+
+def access_key(meeting_pk):
+    return f"meeting:access:{meeting_pk}"
+
+
+def generation_key(meeting_pk):
+    return f"meeting:access:gen:{meeting_pk}"
+
+
+def _entitled_users(resource_type, resource_id, required_sources):
+    """Users holding every source in ``required_sources`` for the resource."""
+    holders = None
+    for source in required_sources:
+        users = set(Entitlement.objects.filter(
+            resource_type=resource_type, resource_id=str(resource_id), source=source
+        ).values_list('user_id', flat=True))
+        holders = users if holders is None else holders & users
+    return holders or set()
+
+
+def compute_access(meeting):
+    """
+    {user_id or '*': reason} for ``meeting``, mirroring ``Meeting.can_user_join``
+    and the access_type checks in ``join_meeting``.
+    """
+    # Each gate narrows who may join; no gates means anyone may
+    gates, reason = [], 'public'
+    if meeting.meeting_type == 'lecture' and meeting.course_id:
+        sources = ['enrollment'] if meeting.course.course_type == 'free' else ['enrollment', 'payment']
+        gates.append(_entitled_users('course', meeting.course_id, sources))
+        reason = 'enrolled'
+    if meeting.group_session_id:
+        gates.append(_entitled_users('group_session', meeting.group_session_id, ['enrollment']))
+        reason = 'enrolled'
+
+    if meeting.access_type == 'private':
+        emails = MeetingInvite.objects.filter(meeting=meeting).values('email')
+        gates.append(set(User.objects.filter(email__in=emails).values_list('id', flat=True)))
+        reason = 'invited'
+    elif meeting.access_type == 'approval_required':
+        gates.append(set(JoinRequest.objects.filter(
+            meeting=meeting, status='approved', user__isnull=False
+        ).values_list('user_id', flat=True)))
+        reason = 'approved'
+
+    if gates:
+        access = {str(user_id): reason for user_id in set.intersection(*gates)}
+    else:
+        access = {EVERYONE: reason}
+
+    access[str(meeting.host_id)] = 'host'
+    if meeting.group_session_id:
+        session = meeting.group_session
+        access[WINDOW_FIELD] = json.dumps([
+            session.start_time.timestamp(),
+            session.end_time.timestamp() if session.end_time else None,
+        ])
+    return access
+
+
+def build_access_list(meeting_pk):
+    """
+    (Re)build the access list of a meeting that is not over. Returns None
+    if the meeting is over or the list was invalidated during the build.
+    """
+    key = access_key(meeting_pk)
+    with redis_client.pipeline(transaction=True) as pipe:
+        pipe.watch(generation_key(meeting_pk))
+        meeting = Meeting.objects.select_related('course', 'group_session').filter(pk=meeting_pk).first()
+        if meeting is None or meeting.status == 'ended':
+            pipe.unwatch()
+            invalidate(meeting_pk)
+            return None
+
+        access = compute_access(meeting)
+        pipe.multi()
+        pipe.delete(key)
+        pipe.hset(key, mapping=access)
+        pipe.expire(key, KEY_TTL_SECONDS)
+        try:
+            pipe.execute()
+        except redis.WatchError:
+            # Invalidated while we read; the next lookup rebuilds from the new rows
+            return None
+    return access
+
+
+def invalidate(*meeting_pks):
+    if meeting_pks:
+        pipe = redis_client.pipeline(transaction=True)
+        for pk in meeting_pks:
+            pipe.incr(generation_key(pk))
+            pipe.expire(generation_key(pk), KEY_TTL_SECONDS)
+        pipe.delete(*(access_key(pk) for pk in meeting_pks))
+        pipe.execute()
+
+
+def join_reason(meeting, user):
+    """
+    Why ``user`` may join ``meeting`` ('host', 'enrolled', 'invited',
+    'approved' or 'public'), or None when the full checks have to decide.
+    """
+    key = access_key(meeting.pk)
+    reason, everyone, window = redis_client.hmget(key, str(user.pk), EVERYONE, WINDOW_FIELD)
+    if reason is None and everyone is None and not redis_client.exists(key):
+        access = build_access_list(meeting.pk) or {}
+        reason, everyone, window = access.get(str(user.pk)), access.get(EVERYONE), access.get(WINDOW_FIELD)
+
+    reason = reason or everyone
+    if reason in (None, 'host') or window is None:
+        return reason
+
+    starts, ends = json.loads(window)
+    now = timezone.now().timestamp()
+    if now < starts or (ends is not None and now > ends):
+        return None
+    return reason
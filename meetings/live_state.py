@@ -0,0 +1,227 @@
+# meetings/live_state.py
+"""
+Live participant state (mute, video, hand raise, screen share) in Redis.
+
+While a meeting runs, the toggles of ``Participant`` live in one Redis hash
+per meeting, ``meeting:live:<meeting_id>``, with a field per user and
+attribute (``<user_id>:is_muted`` -> ``1`` / ``0``), so a toggle is one
+HSET instead of an UPDATE. Every toggle is pushed to the meeting group as a
+``participant.state`` delta.
+
+Users whose state changed are tracked in ``meeting:live:dirty:<meeting_id>``
+and the meetings with changes in ``meeting:live:dirty``. ``flush()`` copies
+the changed state to ``Participant`` with one ``bulk_update``; it runs every
+few seconds from Celery beat and for the whole meeting when it ends. Someone
+leaving takes their state out of the hash with ``pop()`` and saves it with
+the rest of their ``Participant`` row.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db.models import F
+from rest_framework import serializers
+
+from chate_box.services.fanout import group_send_frame
+from .models import Participant
+from lms.redis_client import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('is_muted', 'is_video_on', 'is_hand_raised', 'is_sharing_screen')
+
+# Hashes of meetings nobody touched for a day disappear on their own
+KEY_TTL_SECONDS = 24 * 60 * 60
+
+DIRTY_MEETINGS_KEY = 'meeting:live:dirty'
+
+
+def state_key(meeting_id):
+    return f"meeting:live:{meeting_id}"
+
+
+def dirty_key(meeting_id):
+    return f"meeting:live:dirty:{meeting_id}"
+
+
+def clean_changes(data):
+    """
+    The known toggles in ``data`` as booleans, anything else dropped. Values are
+    parsed like DRF boolean fields (so form-encoded "false" is False); anything
+    else raises ``ValidationError``.
+    """
+    changes, errors = {}, {}
+    for field in FIELDS:
+        if field in data:
+            try:
+                changes[field] = serializers.BooleanField().to_internal_value(data[field])
+            except serializers.ValidationError as e:
+                errors[field] = e.detail
+    if errors:
+        raise serializers.ValidationError(errors)
+    return changes
+
+
+def _decode(values):
+    """{user_id: {field: bool}} from a ``<user_id>:<field>`` hash."""
+    states = {}
+    for name, value in values.items():
+        user_id, _, field = name.rpartition(':')
+        if field in FIELDS:
+            states.setdefault(user_id, {})[field] = value == '1'
+    return states
+
+
+def _queue_update(pipe, meeting_id, user_id, changes):
+    key = state_key(meeting_id)
+    pipe.hset(key, mapping={f"{user_id}:{field}": int(value) for field, value in changes.items()})
+    pipe.expire(key, KEY_TTL_SECONDS)
+    pipe.sadd(dirty_key(meeting_id), str(user_id))
+    pipe.expire(dirty_key(meeting_id), KEY_TTL_SECONDS)
+    pipe.sadd(DIRTY_MEETINGS_KEY, str(meeting_id))
+
+
+def state_frame(meeting_id, user_id, changes):
+    return {
+        "type": "participant.state",
+        "meeting_id": str(meeting_id),
+        "user_id": str(user_id),
+        "changes": changes,
+    }
+
+
+async def update_state_async(channel_layer, meeting_id, user_id, changes):
+    """Store a toggle and broadcast it, from a consumer."""
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        _queue_update(pipe, meeting_id, user_id, changes)
+        await pipe.execute()
+    await group_send_frame(channel_layer, f"meeting_{meeting_id}", state_frame(meeting_id, user_id, changes))
+
+
+def update_state(meeting_id, user_id, changes, broadcast=True):
+    """Store a toggle and (by default) broadcast it, from a view or task."""
+    if not changes:
+        return
+    pipe = redis_client.pipeline(transaction=True)
+    _queue_update(pipe, meeting_id, user_id, changes)
+    pipe.execute()
+
+    channel_layer = get_channel_layer()
+    if broadcast and channel_layer:
+        async_to_sync(group_send_frame)(channel_layer, f"meeting_{meeting_id}", state_frame(meeting_id, user_id, changes))
+
+
+def seed(meeting_id, participant):
+    """Put the stored state of someone joining into the hash, without marking it dirty."""
+    key = state_key(meeting_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(key, mapping={f"{participant.user_id}:{field}": int(getattr(participant, field)) for field in FIELDS})
+    pipe.expire(key, KEY_TTL_SECONDS)
+    pipe.execute()
+
+
+def snapshot(meeting_id):
+    """{user_id: {field: bool}} for everyone with state in the meeting."""
+    return _decode(redis_client.hgetall(state_key(meeting_id)))
+
+
+def _take_dirty(meeting_ids):
+    """Claim the users with unsaved changes in ``meeting_ids``: {meeting_id: [user_id]}."""
+    pipe = redis_client.pipeline(transaction=True)
+    for meeting_id in meeting_ids:
+        pipe.smembers(dirty_key(meeting_id))
+        pipe.delete(dirty_key(meeting_id))
+    results = pipe.execute()
+    return {
+        meeting_id: list(user_ids)
+        for meeting_id, user_ids in zip(meeting_ids, results[::2])
+        if user_ids
+    }
+
+
+def _mark_dirty(dirty):
+    """Put claimed users back after a failed write, so the next flush retries them."""
+    pipe = redis_client.pipeline(transaction=False)
+    for meeting_id, user_ids in dirty.items():
+        pipe.sadd(dirty_key(meeting_id), *user_ids)
+        pipe.sadd(DIRTY_MEETINGS_KEY, meeting_id)
+    pipe.execute()
+
+
+def flush(meeting_ids=None):
+    """
+    Write changed state to ``Participant`` in one ``bulk_update``.
+
+    Flushes ``meeting_ids`` (meeting UUIDs), or every meeting with changes.
+    Returns the number of participants updated.
+    """
+    if meeting_ids is None:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.smembers(DIRTY_MEETINGS_KEY)
+        pipe.delete(DIRTY_MEETINGS_KEY)
+        meeting_ids = list(pipe.execute()[0])
+    else:
+        meeting_ids = [str(meeting_id) for meeting_id in meeting_ids]
+    if not meeting_ids:
+        return 0
+
+    dirty = _take_dirty(meeting_ids)
+    if not dirty:
+        return 0
+
+    # Dirty marks are taken before reading the state, so these values are at
+    # least as new as the changes that marked them
+    pipe = redis_client.pipeline(transaction=False)
+    for meeting_id, user_ids in dirty.items():
+        pipe.hmget(state_key(meeting_id), [f"{user_id}:{field}" for user_id in user_ids for field in FIELDS])
+    states = {}
+    for (meeting_id, user_ids), values in zip(dirty.items(), pipe.execute()):
+        for index, user_id in enumerate(user_ids):
+            row = values[index * len(FIELDS):(index + 1) * len(FIELDS)]
+            states[(meeting_id, user_id)] = {
+                field: value == '1' for field, value in zip(FIELDS, row) if value is not None
+            }
+
+    user_ids = {user_id for ids in dirty.values() for user_id in ids}
+    participants = Participant.objects.filter(
+        meeting__meeting_id__in=list(dirty), user_id__in=user_ids, left_at__isnull=True
+    ).annotate(meeting_key=F('meeting__meeting_id')).only('id', 'user_id', *FIELDS)
+
+    changed = []
+    for participant in participants:
+        state = states.get((str(participant.meeting_key), str(participant.user_id)))
+        if not state:
+            continue
+        if any(getattr(participant, field) != value for field, value in state.items()):
+            for field, value in state.items():
+                setattr(participant, field, value)
+            changed.append(participant)
+
+    if changed:
+        try:
+            Participant.objects.bulk_update(changed, FIELDS)
+        except Exception:
+            logger.exception("Failed to flush live state of %d participants", len(changed))
+            _mark_dirty(dirty)
+            return 0
+    return len(changed)
+
+
+def pop(meeting_id, user_id):
+    """Remove one user's state from the hash and return it: {field: bool}."""
+    key = state_key(meeting_id)
+    names = [f"{user_id}:{field}" for field in FIELDS]
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hmget(key, names)
+    pipe.hdel(key, *names)
+    pipe.srem(dirty_key(meeting_id), str(user_id))
+    values = pipe.execute()[0]
+    return {field: value == '1' for field, value in zip(FIELDS, values) if value is not None}
+
+
+def clear(meeting_id):
+    """Drop the whole meeting (after its final flush)."""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(state_key(meeting_id), dirty_key(meeting_id))
+    pipe.srem(DIRTY_MEETINGS_KEY, str(meeting_id))
+    pipe.execute()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='attended',
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
@@ -1,12 +1,13 @@
 # meeting/models.py
 
-from django.db import models
-from authentication.models import User
-from courses.models import Course,Enrollment,Video,Progress
-from payments.models import Payment
-from group_sessions.models import GroupSessionEnrollment
+from django.db import models, transaction
+from django.db.models import DateTimeField, DurationField, F, Max, Value
+from django.db.models.functions import Coalesce
+from authentication.models import StudentProfile, User
+from courses.models import Course,Video,Progress
 
 from django.utils import timezone
+from datetime import timedelta
 import uuid
 import random
 import string
@@ -96,8 +97,7 @@ class Meeting(models.Model):
     def get_enrolled_students(self):
         """Get students enrolled in course for lecture meetings"""
         if self.meeting_type == 'lecture' and self.course:
-            return self.course.enrollments.filter(studentt__student_profile__isnull=False
-        ).select_related('student__student_profile')
+            return self.course.enrollments.select_related('student__user')
         return []
 
     def start_meeting(self):
@@ -106,26 +106,48 @@ class Meeting(models.Model):
         self.save()
     
     def end_meeting(self):
-        self.status = 'ended'
-        self.ended_at = timezone.now()
-        self.save()
-        # Leave all participants
-        self.participants.filter(left_at__isnull=True).update(left_at=timezone.now())
-        
-        # Create recorded video for course lectures
-        if self.meeting_type == 'lecture' and self.course and self.is_recorded:
-            self.create_recorded_video()
+        """
+        Close the meeting in a fixed number of queries, however many people are in it:
+        flush the live state, give lecture progress to every student still in with one
+        bulk insert, close all open participants with their attendance computed by the
+        database, and leave the recording to Celery once committed.
+        """
+        from .live_state import clear as clear_live_state, flush as flush_live_state
+        from .tasks import process_ended_meeting
+
+        now = timezone.now()
+        with transaction.atomic():
+            self.status = 'ended'
+            self.ended_at = now
+            self.save()
+            # Save the live mute / video / hand / screen state before closing the rows
+            flush_live_state([self.meeting_id])
+
+            still_in = self.participants.filter(left_at__isnull=True)
+            if self.meeting_type == 'lecture' and self.course_id:
+                create_lecture_progress(self.course_id, still_in.filter(role='participant').values('user'))
+
+            # Leave all participants
+            still_in.update(
+                left_at=now,
+                attended=Coalesce('attended', Value(timedelta(0), output_field=DurationField()))
+                + (Value(now, output_field=DateTimeField()) - F('joined_at')),
+                is_sharing_screen=False,
+            )
+            transaction.on_commit(lambda: process_ended_meeting.delay(self.pk))
+        clear_live_state(self.meeting_id)
     
     def create_recorded_video(self):
         """Create a video record from meeting recording"""
         if self.recording_url and self.course:
+            last_order = self.course.videos.aggregate(last=Max('order'))['last'] or 0
             video = Video.objects.create(
                 course=self.course,
                 title=f"Recorded Lecture: {self.title}",
                 description=f"Live lecture recorded on {self.started_at.strftime('%Y-%m-%d %H:%M')}",
                 video_file=self.recording_url,  # This would need to be handled properly
                 duration=self.recording_duration or "0:00",
-                order=self.course.videos.count() + 1
+                order=last_order + 1
             )
             return video
         return None
@@ -136,36 +158,21 @@ class Meeting(models.Model):
         if self.host == user:
             return True, "Host can join"
         
+        from entitlements.access import entitlement_sources, has_access
+
         # For course lectures, check enrollment and payment
         if self.meeting_type == 'lecture' and self.course:
-            # Check if user is enrolled in the course
-          
-            try:
-                enrollment = Enrollment.objects.get(student=user, course=self.course,student__student_profile__isnull=False)
-            except Enrollment.DoesNotExist:
+            sources = entitlement_sources(user, self.course)
+            if 'enrollment' not in sources:
                 return False, "You are not enrolled in this course"
             
             # Check payment for paid courses
-            if self.course.course_type == 'paid':
-              
-                payment_exists = Payment.objects.filter(
-                    user=user,
-                    is_successful=True,
-                    # You might want to link payment to course instead of meeting
-                ).exists()
-                
-                if not payment_exists:
-                    return False, "Please complete payment first to attend this lecture"
+            if not has_access(user, self.course, sources):
+                return False, "Please complete payment first to attend this lecture"
 
         # Add group session logic
         if self.group_session:
-            enrollment = GroupSessionEnrollment.objects.filter(
-                session=self.group_session,
-                student=user,
-                status='enrolled'
-            ).first()
-
-            if not enrollment:
+            if 'enrollment' not in entitlement_sources(user, self.group_session):
                 return False, "You are not enrolled in this group session"
 
             # Check if session is live
@@ -206,27 +213,30 @@ class Participant(models.Model):
     # Timestamps
     joined_at = models.DateTimeField(auto_now_add=True)
     left_at = models.DateTimeField(null=True, blank=True)
+    # Time in the meeting over every stay, added to on leaving; joined_at is when the current stay began
+    attended = models.DurationField(null=True, blank=True)
     
     class Meta:
         unique_together = ['meeting', 'user']
     
     def leave_meeting(self):
+        from .live_state import pop as pop_live_state
+
+        for field, value in pop_live_state(self.meeting.meeting_id, self.user_id).items():
+            setattr(self, field, value)
         self.left_at = timezone.now()
+        self.attended = (self.attended or timedelta(0)) + (self.left_at - self.joined_at)
         self.is_sharing_screen = False
         self.save()
         
         # Update progress for course lectures
-        if self.meeting.meeting_type == 'lecture' and self.meeting.course:
+        if self.meeting.meeting_type == 'lecture' and self.meeting.course_id:
             self.update_course_progress()
     
     def update_course_progress(self):
         """Update student progress when leaving a lecture"""
         if self.role == 'participant':  # Only for students
-            Progress.objects.get_or_create(
-                student=self.user,
-                course=self.meeting.course,
-                defaults={'completed_at': timezone.now()}
-            )
+            create_lecture_progress(self.meeting.course_id, [self.user_id])
     
     @property
     def is_active(self):
@@ -236,6 +246,26 @@ class Participant(models.Model):
         return f"{self.user.username} in {self.meeting.title}"
 
 
+def create_lecture_progress(course_id, user_ids):
+    """
+    Course progress for the students among ``user_ids`` (ids or a ``values('user')``
+    queryset) who attended a lecture, in two queries whatever their number.
+
+    Lecture progress has no video, quiz or assignment, and NULLs never clash in
+    the unique constraint, so students who already have it are left out here
+    rather than by ``ignore_conflicts``.
+    """
+    already = Progress.objects.filter(
+        course_id=course_id, video__isnull=True, quiz__isnull=True, assignment__isnull=True
+    ).values('student')
+    students = StudentProfile.objects.filter(user__in=user_ids).exclude(id__in=already).values_list('id', flat=True)
+    now = timezone.now()
+    Progress.objects.bulk_create(
+        [Progress(student_id=student_id, course_id=course_id, completed_at=now) for student_id in students],
+        ignore_conflicts=True,
+    )
+
+
 class MeetingRecording(models.Model):
     """Model to store meeting recording details"""
     meeting = models.OneToOneField(Meeting, on_delete=models.CASCADE, related_name='recording')
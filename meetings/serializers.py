@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from .models import Meeting, Participant, MeetingRecording, MeetingChat
+from .join_access import join_reason
 from authentication.serializers import UserSerializer
 from courses.serializers import CourseListSerializer
 
@@ -40,6 +41,10 @@ class MeetingSerializer(serializers.ModelSerializer):
         """Check if current user can join the meeting"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # The access list only pays off for a single meeting; in lists (or
+            # nested in another serializer) each miss would add Redis round trips
+            if self.parent is None and obj.status != 'ended' and join_reason(obj, request.user):
+                return {'can_join': True, 'message': 'Can join'}
             can_join, message = obj.can_user_join(request.user)
             return {'can_join': can_join, 'message': message}
         return {'can_join': False, 'message': 'Authentication required'}
@@ -68,11 +73,13 @@ class ParticipantSerializer(serializers.ModelSerializer):
     
     def get_duration_minutes(self, obj):
         """Calculate how long participant has been in meeting"""
-        if obj.left_at:
-            duration = obj.left_at - obj.joined_at
-        else:
+        from datetime import timedelta
+        duration = obj.attended or timedelta(0)
+        if obj.left_at is None:
             from django.utils import timezone
-            duration = timezone.now() - obj.joined_at
+            duration += timezone.now() - obj.joined_at
+        elif obj.attended is None:
+            duration = obj.left_at - obj.joined_at
         return int(duration.total_seconds() / 60)
 
 
@@ -155,31 +162,27 @@ class JoinMeetingSerializer(serializers.Serializer):
     meeting_id = serializers.UUIDField(required=True)
     password = serializers.CharField(max_length=20, required=False, allow_blank=True)
     
-    def validate_meeting_id(self, value):
-        """Validate meeting exists and is joinable"""
-        try:
-            meeting = Meeting.objects.get(meeting_id=value)
-            if meeting.status == 'ended':
-                raise serializers.ValidationError("Meeting has ended")
-            return value
-        except Meeting.DoesNotExist:
-            raise serializers.ValidationError("Meeting not found")
-    
     def validate(self, data):
         """Validate join request"""
         try:
             meeting = Meeting.objects.get(meeting_id=data['meeting_id'])
+            if meeting.status == 'ended':
+                raise serializers.ValidationError({'meeting_id': "Meeting has ended"})
             
             # Check password if meeting has one
             if meeting.password and data.get('password') != meeting.password:
                 raise serializers.ValidationError("Invalid meeting password")
             
-            # Check if user can join (payment, enrollment, etc.)
+            # Check if user can join (payment, enrollment, etc.), precomputed
+            # for most users; the full check runs for everyone else
+            data['join_reason'] = None
             request = self.context.get('request')
             if request and request.user.is_authenticated:
-                can_join, message = meeting.can_user_join(request.user)
-                if not can_join:
-                    raise serializers.ValidationError(message)
+                data['join_reason'] = join_reason(meeting, request.user)
+                if data['join_reason'] is None:
+                    can_join, message = meeting.can_user_join(request.user)
+                    if not can_join:
+                        raise serializers.ValidationError(message)
             
             data['meeting'] = meeting
             return data
@@ -0,0 +1,70 @@
+# meetings/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from courses.models import Course
+from entitlements.models import Entitlement
+from group_sessions.models import GroupSession
+from .join_access import build_access_list, invalidate
+from .models import JoinRequest, Meeting, MeetingInvite
+
+
+def _open_meetings(**filters):
+    return list(Meeting.objects.filter(**filters).exclude(status='ended').values_list('pk', flat=True))
+
+
+def _invalidate_on_commit(*meeting_pks):
+    """
+    Drop access lists once the change is committed. Dropping them earlier lets a
+    concurrent join rebuild the list from the old rows (e.g. a refund not yet
+    committed) and keep a revoked user in it until the key expires.
+    """
+    if meeting_pks:
+        transaction.on_commit(partial(invalidate, *meeting_pks))
+
+
+@receiver(post_save, sender=Meeting)
+def refresh_meeting_access(sender, instance, created, **kwargs):
+    """Build the access list when a meeting is scheduled or goes live"""
+    if instance.status != 'ended' and (created or instance.status == 'active'):
+        transaction.on_commit(partial(build_access_list, instance.pk))
+    else:
+        _invalidate_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Meeting)
+def drop_meeting_access(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=MeetingInvite)
+@receiver(post_delete, sender=MeetingInvite)
+@receiver(post_save, sender=JoinRequest)
+@receiver(post_delete, sender=JoinRequest)
+def invalidate_meeting_access(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.meeting_id)
+
+
+@receiver(post_save, sender=Entitlement)
+@receiver(post_delete, sender=Entitlement)
+def invalidate_entitled_meetings(sender, instance, **kwargs):
+    """Enrollments and payments change who may join lectures and group sessions"""
+    if instance.resource_type == 'course':
+        _invalidate_on_commit(*_open_meetings(course_id=instance.resource_id, meeting_type='lecture'))
+    elif instance.resource_type == 'group_session':
+        _invalidate_on_commit(*_open_meetings(group_session_id=instance.resource_id))
+
+
+@receiver(post_save, sender=Course)
+def invalidate_course_meetings(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_on_commit(*_open_meetings(course=instance, meeting_type='lecture'))
+
+
+@receiver(post_save, sender=GroupSession)
+def invalidate_group_session_meetings(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_on_commit(*_open_meetings(group_session=instance))
@@ -0,0 +1,180 @@
+# meetings/tasks.py
+import logging
+import smtplib
+
+from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+
+from calendersync.utils import create_google_event
+from . import live_state
+from .models import Meeting, MeetingInvite
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMAIL_BATCH_SIZE = 100
+
+# The mail server is unreachable or dropped us: worth retrying the batch later
+SMTP_CONNECTION_ERRORS = (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+RETRY_BACKOFF_SECONDS = 60
+RETRY_BACKOFF_MAX_SECONDS = 60 * 60
+
+
+def join_url(meeting):
+    return f"{settings.FRONTEND_URL.rstrip('/')}/meeting/join/{meeting.meeting_id}"
+
+
+def invitation_message(email, meeting, invited_by):
+    """Initial meeting invitation email"""
+    subject = f"You're Invited to '{meeting.title}'"
+
+    if meeting.meeting_type == 'instant' or not meeting.scheduled_time:
+        time_info = "This is an instant meeting starting now."
+    else:
+        time_info = f"Scheduled for: {meeting.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
+
+    body = f"""
+    Hello,
+    
+    You have been invited to join a meeting by {invited_by.get_full_name() or invited_by.username}.
+    
+    Meeting Details:
+    - Title: {meeting.title}
+    - Host: {meeting.host.get_full_name() or meeting.host.username}
+    - {time_info}
+    - Meeting ID: {meeting.meeting_id}
+    - Password: {meeting.password if meeting.is_password_required else 'No password required'}
+    
+    Join the meeting: {join_url(meeting)}
+    
+    Best regards,
+    Your Meeting Platform
+    """
+    return EmailMessage(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=[email])
+
+
+def scheduled_message(meeting):
+    """Confirmation email to the host of a scheduled meeting"""
+    host = meeting.host
+    subject = f"Meeting '{meeting.title}' Scheduled Successfully"
+    body = f"""
+    Hello {host.get_full_name() or host.username},
+    
+    Your meeting has been scheduled successfully.
+    
+    Meeting Details:
+    - Title: {meeting.title}
+    - Scheduled Time: {meeting.scheduled_time.strftime('%Y-%m-%d %H:%M')}
+    - Meeting ID: {meeting.meeting_id}
+    - Password: {meeting.password if meeting.is_password_required else 'No password required'}
+    
+    You will receive a reminder when it's time to start the meeting.
+    
+    Meeting Link: {join_url(meeting)}
+    
+    Best regards,
+    Your Meeting Platform
+    """
+    return EmailMessage(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=[host.email])
+
+
+def invitation_recipients(meeting):
+    """Emails of everyone to invite: private meeting invitees and, for lectures, enrolled students"""
+    emails = []
+    if meeting.access_type == 'private':
+        emails.extend(MeetingInvite.objects.filter(meeting=meeting).values_list('email', flat=True))
+    if meeting.meeting_type == 'lecture' and meeting.course_id:
+        emails.extend(meeting.get_enrolled_students().values_list('student__user__email', flat=True))
+    return [email for email in dict.fromkeys(emails) if email]
+
+
+@shared_task
+def send_meeting_invitations(meeting_id, invited_by_id):
+    """Fan the meeting's invitations out into batches sent over one SMTP connection each"""
+    try:
+        meeting = Meeting.objects.get(id=meeting_id)
+    except Meeting.DoesNotExist:
+        logger.warning(f"Meeting with id {meeting_id} not found")
+        return 0
+
+    emails = invitation_recipients(meeting)
+    batch_size = getattr(settings, 'MEETING_INVITES', {}).get('EMAIL_BATCH_SIZE', DEFAULT_EMAIL_BATCH_SIZE)
+    for start in range(0, len(emails), batch_size):
+        send_invitation_batch.delay(meeting_id, invited_by_id, emails[start:start + batch_size])
+    return len(emails)
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=SMTP_CONNECTION_ERRORS,
+    retry_backoff=RETRY_BACKOFF_SECONDS,
+    retry_backoff_max=RETRY_BACKOFF_MAX_SECONDS,
+    max_retries=5,
+)
+def send_invitation_batch(self, meeting_id, invited_by_id, emails):
+    """
+    Send one batch of invitations over a single SMTP connection. An address the
+    server refuses is skipped; if the connection fails, only the invitations not
+    sent yet are retried, with exponential backoff.
+    """
+    meeting = Meeting.objects.select_related('host').get(id=meeting_id)
+    invited_by = User.objects.get(pk=invited_by_id)
+
+    sent = 0
+    # Failing to connect raises before anything is sent, and autoretry_for retries the whole batch
+    with get_connection() as connection:
+        for index, email in enumerate(emails):
+            try:
+                sent += connection.send_messages([invitation_message(email, meeting, invited_by)])
+            except SMTP_CONNECTION_ERRORS as e:
+                logger.warning(f"Connection lost after {sent} invitation emails for meeting {meeting_id}: {e}")
+                raise self.retry(
+                    args=(meeting_id, invited_by_id, emails[index:]),
+                    exc=e,
+                    countdown=get_exponential_backoff_interval(
+                        RETRY_BACKOFF_SECONDS, self.request.retries, RETRY_BACKOFF_MAX_SECONDS, full_jitter=True
+                    ),
+                )
+            except smtplib.SMTPException as e:
+                # e.g. SMTPRecipientsRefused: this address only, the rest of the batch still goes out
+                logger.error(f"Error sending invitation email to {email} for meeting {meeting_id}: {e}")
+    logger.info(f"Sent {sent} invitation emails for meeting {meeting_id}")
+    return sent
+
+
+@shared_task
+def send_meeting_scheduled_email(meeting_id):
+    meeting = Meeting.objects.select_related('host').get(id=meeting_id)
+    try:
+        scheduled_message(meeting).send()
+    except Exception as e:
+        logger.error(f"Error sending confirmation email: {e}")
+
+
+@shared_task
+def create_meeting_calendar_event(meeting_id, user_id):
+    meeting = Meeting.objects.get(id=meeting_id)
+    user = User.objects.get(pk=user_id)
+    try:
+        create_google_event(user, meeting)
+    except Exception as e:
+        logger.error(f"Error creating calendar event for meeting {meeting_id}: {e}")
+
+
+@shared_task
+def flush_participant_state():
+    """Write live participant state changed since the last run (see live_state.py)"""
+    return live_state.flush()
+
+
+@shared_task
+def process_ended_meeting(meeting_id):
+    """Post-processing queued by ``Meeting.end_meeting`` once the teardown is committed"""
+    meeting = Meeting.objects.select_related('course').get(id=meeting_id)
+
+    # Create recorded video for course lectures
+    if meeting.meeting_type == 'lecture' and meeting.course and meeting.is_recorded:
+        meeting.create_recorded_video()
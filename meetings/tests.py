@@ -1,3 +1,199 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from lms.redis_client import redis_client
+from . import join_access, live_state
+from .models import Meeting, MeetingInvite, Participant
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class JoinAccessTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com', password='pw')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='pw')
+        self.meeting = Meeting.objects.create(host=self.host, title='Office hours', access_type='private')
+        MeetingInvite.objects.create(meeting=self.meeting, email=self.guest.email, invited_by=self.host)
+        self.addCleanup(
+            redis_client.delete,
+            join_access.access_key(self.meeting.pk), join_access.generation_key(self.meeting.pk),
+        )
+
+    def is_cached(self):
+        return bool(redis_client.exists(join_access.access_key(self.meeting.pk)))
+
+    def test_reasons(self):
+        self.assertEqual(join_access.join_reason(self.meeting, self.host), 'host')
+        self.assertEqual(join_access.join_reason(self.meeting, self.guest), 'invited')
+        self.assertIsNone(join_access.join_reason(self.meeting, self.outsider))
+        self.assertTrue(self.is_cached())
+
+    def test_invite_drops_the_list_once_committed(self):
+        join_access.build_access_list(self.meeting.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            MeetingInvite.objects.create(meeting=self.meeting, email=self.outsider.email, invited_by=self.host)
+            self.assertTrue(self.is_cached())
+        self.assertFalse(self.is_cached())
+        self.assertEqual(join_access.join_reason(self.meeting, self.outsider), 'invited')
+
+    def test_build_racing_an_invalidation_is_discarded(self):
+        compute_access = join_access.compute_access
+
+        def compute_then_invalidate(meeting):
+            access = compute_access(meeting)
+            # e.g. an invite revoked and committed while the list was being read
+            join_access.invalidate(meeting.pk)
+            return access
+
+        with mock.patch.object(join_access, 'compute_access', compute_then_invalidate):
+            self.assertIsNone(join_access.build_access_list(self.meeting.pk))
+        self.assertFalse(self.is_cached())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class AttendanceTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw')
+        self.meeting = Meeting.objects.create(host=self.host, title='Open class', status='active')
+        self.addCleanup(
+            redis_client.delete,
+            join_access.access_key(self.meeting.pk), join_access.generation_key(self.meeting.pk),
+            f"meeting:live:{self.meeting.meeting_id}", f"meeting:live:dirty:{self.meeting.meeting_id}",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def join(self):
+        response = self.client.post(
+            reverse('join_meeting', args=[self.meeting.meeting_id]), {'meeting_id': str(self.meeting.meeting_id)}
+        )
+        self.assertEqual(response.status_code, 200)
+        return Participant.objects.get(meeting=self.meeting, user=self.student)
+
+    def stay(self, participant, minutes):
+        """Pretend the current stay began ``minutes`` ago."""
+        Participant.objects.filter(pk=participant.pk).update(joined_at=participant.joined_at - timedelta(minutes=minutes))
+
+    def leave(self):
+        response = self.client.post(reverse('leave_meeting', args=[self.meeting.meeting_id]))
+        self.assertEqual(response.status_code, 200)
+        return Participant.objects.get(meeting=self.meeting, user=self.student)
+
+    def assertMinutes(self, duration, minutes):
+        self.assertAlmostEqual(duration.total_seconds(), minutes * 60, delta=5)
+
+    def test_rejoin_keeps_time_attended(self):
+        self.stay(self.join(), 10)
+        self.assertMinutes(self.leave().attended, 10)
+
+        rejoined = self.join()
+        self.assertIsNone(rejoined.left_at)
+        self.assertMinutes(rejoined.attended, 10)
+        self.stay(rejoined, 5)
+        self.assertMinutes(self.leave().attended, 15)
+
+    def test_end_meeting_adds_the_current_stay(self):
+        self.stay(self.join(), 10)
+        self.leave()
+        self.stay(self.join(), 5)
+        self.meeting.end_meeting()
+        self.assertMinutes(Participant.objects.get(user=self.student).attended, 15)
+
+    def test_joining_again_while_in_keeps_the_stay(self):
+        participant = self.join()
+        self.stay(participant, 10)
+        self.join()
+        self.assertMinutes(self.leave().attended, 10)
+
+
+class LiveStateFlushTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw')
+        self.meeting = Meeting.objects.create(host=self.host, title='Lecture', status='active')
+        self.host_row = Participant.objects.create(meeting=self.meeting, user=self.host, role='host')
+        self.student_row = Participant.objects.create(meeting=self.meeting, user=self.student)
+        self.addCleanup(live_state.clear, self.meeting.meeting_id)
+
+    def update(self, user, **changes):
+        live_state.update_state(self.meeting.meeting_id, user.pk, changes, broadcast=False)
+
+    def test_flush_writes_changes_once(self):
+        self.update(self.host, is_muted=True)
+        self.update(self.student, is_hand_raised=True, is_video_on=False)
+        # Both still only in Redis
+        self.assertFalse(Participant.objects.filter(is_muted=True).exists())
+
+        with self.assertNumQueries(2):
+            self.assertEqual(live_state.flush([self.meeting.meeting_id]), 2)
+        self.host_row.refresh_from_db()
+        self.student_row.refresh_from_db()
+        self.assertTrue(self.host_row.is_muted)
+        self.assertTrue(self.student_row.is_hand_raised)
+        self.assertFalse(self.student_row.is_video_on)
+        self.assertEqual(live_state.flush([self.meeting.meeting_id]), 0)
+
+    def test_flush_all_dirty_meetings(self):
+        self.update(self.student, is_muted=True)
+        self.assertEqual(live_state.flush(), 1)
+        self.student_row.refresh_from_db()
+        self.assertTrue(self.student_row.is_muted)
+
+    def test_unchanged_and_departed_participants_are_skipped(self):
+        self.update(self.host, is_video_on=True)  # already stored
+        self.update(self.student, is_muted=True)
+        Participant.objects.filter(pk=self.student_row.pk).update(left_at=timezone.now())
+        self.assertEqual(live_state.flush([self.meeting.meeting_id]), 0)
+
+    def test_pop_takes_state_out_of_the_flush(self):
+        self.update(self.student, is_muted=True)
+        self.assertEqual(live_state.pop(self.meeting.meeting_id, self.student.pk), {'is_muted': True})
+        self.assertEqual(live_state.flush([self.meeting.meeting_id]), 0)
+
+    def test_failed_write_is_retried(self):
+        self.update(self.student, is_muted=True)
+        with mock.patch.object(Participant.objects, 'bulk_update', side_effect=RuntimeError('database down')):
+            self.assertEqual(live_state.flush([self.meeting.meeting_id]), 0)
+        self.assertEqual(live_state.flush([self.meeting.meeting_id]), 1)
+
+
+class EndMeetingTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+
+    def meeting_with(self, count):
+        meeting = Meeting.objects.create(host=self.host, title=f'{count} people', status='active')
+        self.addCleanup(live_state.clear, meeting.meeting_id)
+        users = User.objects.bulk_create([
+            User(username=f'm{meeting.pk}-{n}', email=f'm{meeting.pk}-{n}@example.com') for n in range(count)
+        ])
+        Participant.objects.bulk_create([Participant(meeting=meeting, user=user) for user in users])
+        return meeting
+
+    def test_query_count_does_not_grow_with_participants(self):
+        small = self.meeting_with(3)
+        with CaptureQueriesContext(connection) as queries:
+            small.end_meeting()
+
+        large = self.meeting_with(500)
+        Participant.objects.filter(meeting=large).update(joined_at=timezone.now() - timedelta(minutes=30))
+        with self.assertNumQueries(len(queries)):
+            large.end_meeting()
+
+        self.assertFalse(Participant.objects.filter(meeting=large, left_at__isnull=True).exists())
+        attended = Participant.objects.filter(meeting=large).values_list('attended', flat=True)
+        self.assertEqual(len(attended), 500)
+        for duration in attended:
+            self.assertAlmostEqual(duration.total_seconds(), 30 * 60, delta=5)
+        large.refresh_from_db()
+        self.assertEqual(large.status, 'ended')
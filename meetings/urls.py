@@ -11,6 +11,7 @@ urlpatterns = [
     
     # Participants
     path('<str:meeting_id>/participants/', views.get_meeting_participants, name='meeting_participants'),
+    path('<str:meeting_id>/participants/state/', views.participant_state, name='participant_state'),
     
     # Access Control & Invitations
     # path('<str:meeting_id>/invites/', views.send_invites, name='send_invites'),
@@ -3,6 +3,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated,AllowAny
+from rest_framework.exceptions import ValidationError
 from .serializers import (
     MeetingSerializer, ParticipantSerializer, CreateMeetingSerializer,
     JoinMeetingSerializer, 
@@ -17,8 +18,12 @@ from authentication.models import User
 from django.utils.text import slugify
 from django.core.mail import send_mail
 from django.conf import settings
-from calendersync.utils import create_google_event
 from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from .join_access import invalidate as invalidate_join_access
+from . import live_state
+from .tasks import create_meeting_calendar_event, send_meeting_invitations, send_meeting_scheduled_email
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -37,7 +42,7 @@ def send_meeting_reminder(meeting_id):
         
         # For private meetings, send to invited users
         if meeting.access_type == 'private':
-            invites = MeetingInvite.objects.filter(meeting=meeting, status='accepted')
+            invites = MeetingInvite.objects.filter(meeting=meeting).select_related('user')
             for invite in invites:
                 if invite.user:
                     send_meeting_start_notification(invite.user, meeting, is_host=False)
@@ -49,7 +54,7 @@ def send_meeting_reminder(meeting_id):
         elif meeting.meeting_type == 'lecture' and meeting.course:
             enrolled_students = meeting.get_enrolled_students()
             for enrollment in enrolled_students:
-                send_meeting_start_notification(enrollment.student, meeting, is_host=False)
+                send_meeting_start_notification(enrollment.student.user, meeting, is_host=False)
         
         # For public meetings, only notify host
         elif meeting.access_type == 'public':
@@ -171,62 +176,6 @@ def send_meeting_start_email_to_guest(email, meeting):
     except Exception as e:
         print(f"Error sending email to guest: {e}")
 
-def send_meeting_invitation_email(email, meeting, invited_by):
-    """Send initial meeting invitation email"""
-    try:
-        subject = f"You're Invited to '{meeting.title}'"
-        
-        if meeting.meeting_type == 'instant':
-            time_info = "This is an instant meeting starting now."
-        else:
-            time_info = f"Scheduled for: {meeting.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
-        
-        message = f"""
-        Hello,
-        
-        You have been invited to join a meeting by {invited_by.get_full_name() or invited_by.username}.
-        
-        Meeting Details:
-        - Title: {meeting.title}
-        - Host: {meeting.host.get_full_name() or meeting.host.username}
-        - {time_info}
-        - Meeting ID: {meeting.meeting_id}
-        - Password: {meeting.password if meeting.is_password_required else 'No password required'}
-        
-        Join the meeting: http://127.0.0.1:8000/pi//meeting/join/{meeting.meeting_id}
-        
-        Best regards,
-        Your Meeting Platform
-        """
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        
-    except Exception as e:
-        print(f"Error sending invitation email: {e}")
-
-def schedule_meeting_reminder(meeting):
-    """Schedule a reminder task for when the meeting should start"""
-    if meeting.scheduled_time and meeting.meeting_type == 'scheduled':
-        # Schedule the reminder task to run at the meeting time
-        from django_celery_beat.models import PeriodicTask, CrontabSchedule
-        import json
-        
-        try:
-            # Create a one-time task that runs at the scheduled time
-            eta = meeting.scheduled_time
-            send_meeting_reminder.apply_async(
-                args=[meeting.id],
-                eta=eta
-            )
-        except Exception as e:
-            print(f"Error scheduling meeting reminder: {e}")
-
 @swagger_auto_schema(
     method='post',
     operation_summary="Create a new meeting",
@@ -272,33 +221,29 @@ def create_meeting(request):
         meeting.password = data['password']
         meeting.save()
     
-    print("Running create_google_event")
-    create_google_event(request.user, meeting)
-    print("Done create_google_event")
+    # Calendar event and emails are sent in the background once the meeting is saved
+    host_id = str(request.user.pk)
+    transaction.on_commit(lambda: create_meeting_calendar_event.delay(meeting.id, host_id))
     
-    # Create invites for private meetings and send emails
+    # Create invites for private meetings: one User query, one insert
     if meeting.access_type == 'private' and data.get('invites'):
-        for email in data['invites']:
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
-                user = None
-            
-            MeetingInvite.objects.create(
+        emails = list(dict.fromkeys(data['invites']))
+        users_by_email = {user.email: user for user in User.objects.filter(email__in=emails)}
+        MeetingInvite.objects.bulk_create([
+            MeetingInvite(
                 meeting=meeting,
                 email=email,
-                user=user,
+                user=users_by_email.get(email),
                 invited_by=request.user
             )
-            
-            # Send invitation email
-            send_meeting_invitation_email(email, meeting, request.user)
+            for email in emails
+        ], ignore_conflicts=True)
+        # bulk_create skips the signals that keep the join access list current
+        transaction.on_commit(lambda: invalidate_join_access(meeting.pk))
     
-    # For lecture meetings, notify enrolled students
-    if meeting.meeting_type == 'lecture' and meeting.course:
-        enrolled_students = meeting.get_enrolled_students()
-        for enrollment in enrolled_students:
-            send_meeting_invitation_email(enrollment.student, meeting, request.user)
+    # Invitation emails for private invitees and, for lectures, enrolled students
+    if (meeting.access_type == 'private' and data.get('invites')) or (meeting.meeting_type == 'lecture' and meeting.course):
+        transaction.on_commit(lambda: send_meeting_invitations.delay(meeting.id, host_id))
     
     # Host automatically joins as participant
     participant = Participant.objects.create(
@@ -306,6 +251,7 @@ def create_meeting(request):
         user=request.user,
         role='host'
     )
+    live_state.seed(meeting.meeting_id, participant)
     
     # Handle different meeting types
     if meeting.meeting_type == 'instant':
@@ -314,40 +260,10 @@ def create_meeting(request):
         if meeting.access_type == 'public':
             send_meeting_start_notification(request.user.email, meeting, is_host=True)
     elif meeting.meeting_type == 'scheduled':
-        # Schedule reminder for when meeting should start
-        schedule_meeting_reminder(meeting)
+        # The start reminder is scheduled by reminders.signals when the meeting is saved
         
         # Send confirmation email to host
-        try:
-            subject = f"Meeting '{meeting.title}' Scheduled Successfully"
-            message = f"""
-            Hello {request.user.get_full_name() or request.user.username},
-            
-            Your meeting has been scheduled successfully.
-            
-            Meeting Details:
-            - Title: {meeting.title}
-            - Scheduled Time: {meeting.scheduled_time.strftime('%Y-%m-%d %H:%M')}
-            - Meeting ID: {meeting.meeting_id}
-            - Password: {meeting.password if meeting.is_password_required else 'No password required'}
-            
-            You will receive a reminder when it's time to start the meeting.
-            
-            Meeting Link: http://127.0.0.1:8000/meeting/join/{meeting.meeting_id}
-            
-            Best regards,
-            Your Meeting Platform
-            """
-            
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[request.user.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Error sending confirmation email: {e}")
+        transaction.on_commit(lambda: send_meeting_scheduled_email.delay(meeting.id))
     
     return Response({
         'meeting_id': meeting.meeting_id,
@@ -389,7 +305,11 @@ def join_meeting(request, meeting_id):
         )
     
     try:
-        meeting = Meeting.objects.get(meeting_id=meeting_id)
+        meeting = serializer.validated_data['meeting']
+        join_reason = serializer.validated_data['join_reason']
+        if str(meeting.meeting_id) != str(meeting_id):
+            meeting = Meeting.objects.get(meeting_id=meeting_id)
+            join_reason = None
         
         # Check if meeting exists and is active
         if meeting.status == 'ended':
@@ -440,7 +360,11 @@ def join_meeting(request, meeting_id):
         # Check access permissions
         access_granted = False
         
-        if meeting.access_type == 'public':
+        if join_reason is not None:
+            # On the meeting's precomputed access list
+            access_granted = True
+        
+        elif meeting.access_type == 'public':
             access_granted = True
         
         elif meeting.access_type == 'private':
@@ -494,26 +418,18 @@ def join_meeting(request, meeting_id):
                 'error': 'Access denied'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Check if user already in meeting
-        participant, created = Participant.objects.get_or_create(
-            meeting=meeting,
-            user=user,
-            defaults={
-                'role': 'participant',
-                'guest_name': user.username
-            }
+        # Rejoin if previously left: a new stay starts, time already attended is kept.
+        # Someone still in (e.g. a reconnect) keeps their stay; otherwise join.
+        rejoined = Participant.objects.filter(meeting=meeting, user=user, left_at__isnull=False).update(
+            left_at=None, joined_at=timezone.now(), guest_name=user.username,
         )
-        
-        # if not created and participant.is_active:
-        #     return Response({
-        #         'error': 'You are already in this meeting'
-        #     }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Rejoin if previously left
-        if not created:
-            participant.left_at = None
-            participant.guest_name = user.username
-            participant.save()
+        if not rejoined:
+            Participant.objects.bulk_create(
+                [Participant(meeting=meeting, user=user, role='participant', guest_name=user.username)],
+                ignore_conflicts=True,
+            )
+        participant = Participant.objects.select_related('user').get(meeting=meeting, user=user)
+        live_state.seed(meeting.meeting_id, participant)
         
         # Start meeting if host joins
         if meeting.status == 'waiting' and participant.role == 'host':
@@ -949,6 +865,71 @@ def get_meeting_participants(request, meeting_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Live mute / video / hand raise / screen share state of the participants",
+    tags=["Meetings"],
+    manual_parameters=[
+        openapi.Parameter(
+            'meeting_id',
+            openapi.IN_PATH,
+            description="UUID of the meeting",
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_UUID,
+            required=True
+        )
+    ]
+)
+@swagger_auto_schema(
+    method='post',
+    operation_summary="Change your own live state (changes are broadcast to the meeting)",
+    tags=["Meetings"],
+    manual_parameters=[
+        openapi.Parameter(
+            'meeting_id',
+            openapi.IN_PATH,
+            description="UUID of the meeting",
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_UUID,
+            required=True
+        )
+    ],
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            field: openapi.Schema(type=openapi.TYPE_BOOLEAN) for field in live_state.FIELDS
+        }
+    )
+)
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def participant_state(request, meeting_id):
+    """Snapshot of the live participant state, read from Redis; deltas follow over the meeting websocket"""
+    if not Participant.objects.filter(
+        meeting__meeting_id=meeting_id,
+        user=request.user,
+        left_at__isnull=True
+    ).exists():
+        return Response({
+            'error': 'You are not in this meeting'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.method == 'POST':
+        try:
+            changes = live_state.clean_changes(request.data)
+        except ValidationError as e:
+            return Response({'errors': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        if not changes:
+            return Response({
+                'error': f"Send at least one of: {', '.join(live_state.FIELDS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        live_state.update_state(meeting_id, request.user.id, changes)
+    
+    return Response({
+        'participants': live_state.snapshot(meeting_id)
+    }, status=status.HTTP_200_OK)
+
+
 # @api_view(['GET'])
 # @permission_classes([])
 # def check_join_request_status(request, meeting_id, request_id):
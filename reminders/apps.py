@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RemindersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reminders'
+
+    def ready(self):
+        # Import signals so they get registered
+        import reminders.signals
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reminders.scheduler import drain, next_due
+
+
+class Command(BaseCommand):
+    help = 'Fire due meeting, live class and group session reminders in a loop (alternative to the beat task)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-sleep',
+            type=float,
+            default=5.0,
+            help='Longest wait in seconds between checks for due reminders',
+        )
+
+    def handle(self, *args, **options):
+        max_sleep = options['max_sleep']
+        self.stdout.write(self.style.SUCCESS('Reminder worker started'))
+        while True:
+            queued = drain()
+            if queued:
+                self.stdout.write(f'Queued {queued} reminders')
+            # Sleep until the next reminder is due, re-checking at least every max_sleep seconds
+            upcoming = next_due()
+            delay = max_sleep if upcoming is None else upcoming - time.time()
+            time.sleep(min(max(delay, 0.05), max_sleep))
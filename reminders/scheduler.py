@@ -0,0 +1,133 @@
+# reminders/scheduler.py
+"""
+One scheduler for every time-based reminder.
+
+Due reminders are members ``<kind>:<object id>`` of the Redis sorted set
+``reminders:due``, scored by the unix time they fire at, so scheduling,
+rescheduling (ZADD overwrites the score) and cancelling (ZREM) are
+O(log n) and nothing sits in the Celery broker until it is due.
+
+``drain`` claims due reminders in batches with a Lua script (read and
+remove in one step, so concurrent drainers never fire one twice) and queues
+the Celery task configured for each kind in ``settings.REMINDERS['HANDLERS']``
+with the object id, so sending gets Celery's retries and acks. A reminder
+that cannot be queued goes back into the set.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from lms.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+DUE_KEY = "reminders:due"
+
+DEFAULTS = {
+    'HANDLERS': {},
+    'LEAD_SECONDS': {},
+    'BATCH_SIZE': 500,
+}
+
+# Pop up to ARGV[2] members scored at or before ARGV[1], as a flat member, score list
+CLAIM_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[2]))
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+end
+return due
+"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REMINDERS', {})}
+
+
+def _member(kind, object_id):
+    return f"{kind}:{object_id}"
+
+
+def schedule(kind, object_id, fire_at):
+    """Schedule (or move) the ``kind`` reminder for ``object_id`` to ``fire_at`` (datetime)."""
+    redis_client.zadd(DUE_KEY, {_member(kind, object_id): fire_at.timestamp()})
+
+
+def remind_before(kind, object_id, starts_at, created=False):
+    """
+    Schedule the reminder for something starting at ``starts_at``, LEAD_SECONDS
+    of its kind ahead. If that moment has passed, a new object is reminded
+    right away. An existing one is only touched if its reminder is still
+    pending for later (it was moved earlier): the reminder is sent right away
+    if it has not started yet and dropped otherwise. Without a pending
+    reminder it has already fired.
+    """
+    fire_at = starts_at - timedelta(seconds=get_config()['LEAD_SECONDS'].get(kind, 0))
+    now = timezone.now()
+    if fire_at > now:
+        schedule(kind, object_id, fire_at)
+    elif created:
+        if starts_at > now:
+            schedule(kind, object_id, now)
+    else:
+        pending = fire_time(kind, object_id)
+        if pending is not None and pending > fire_at.timestamp():
+            if starts_at > now:
+                schedule(kind, object_id, now)
+            else:
+                cancel(kind, object_id)
+
+
+def cancel(kind, object_id):
+    redis_client.zrem(DUE_KEY, _member(kind, object_id))
+
+
+def fire_time(kind, object_id):
+    """When the reminder fires as a unix timestamp, or None if it is not scheduled."""
+    return redis_client.zscore(DUE_KEY, _member(kind, object_id))
+
+
+def next_due():
+    """Unix time of the earliest scheduled reminder, or None."""
+    first = redis_client.zrange(DUE_KEY, 0, 0, withscores=True)
+    return first[0][1] if first else None
+
+
+def claim_due(now=None, limit=None):
+    """Remove and return up to ``limit`` due reminders as (kind, object_id, fire_at timestamp)."""
+    now = time.time() if now is None else now
+    limit = limit or get_config()['BATCH_SIZE']
+    due = redis_client.eval(CLAIM_DUE, 1, DUE_KEY, now, limit)
+    return [(*due[i].split(":", 1), float(due[i + 1])) for i in range(0, len(due), 2)]
+
+
+def drain(now=None):
+    """
+    Queue every due reminder, a batch at a time. Returns how many were queued.
+    If queueing fails (e.g. the broker is down) the rest of the batch is put
+    back with its original time and draining stops until the next run.
+    """
+    config = get_config()
+    handlers = {kind: import_string(path) for kind, path in config['HANDLERS'].items()}
+    queued = 0
+    while True:
+        batch = claim_due(now, config['BATCH_SIZE'])
+        for index, (kind, object_id, fire_at) in enumerate(batch):
+            handler = handlers.get(kind)
+            if handler is None:
+                logger.error("No reminder handler for %s:%s", kind, object_id)
+                continue
+            try:
+                handler.delay(object_id)
+                queued += 1
+            except Exception:
+                logger.exception("Could not queue reminder %s:%s, putting the batch back", kind, object_id)
+                redis_client.zadd(DUE_KEY, {
+                    _member(kind, object_id): fire_at for kind, object_id, fire_at in batch[index:]
+                })
+                return queued
+        if len(batch) < config['BATCH_SIZE']:
+            return queued
@@ -0,0 +1,53 @@
+# reminders/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from group_sessions.models import GroupSession
+from individual_live_class.models import LiveClassSession
+from meetings.models import Meeting
+from . import scheduler
+
+
+def remind_before(kind, object_id, starts_at, created):
+    # Scheduled once the save commits, so a rolled-back save leaves no reminder behind
+    transaction.on_commit(partial(scheduler.remind_before, kind, object_id, starts_at, created))
+
+
+def cancel(kind, object_id):
+    transaction.on_commit(partial(scheduler.cancel, kind, object_id))
+
+
+@receiver(post_save, sender=Meeting)
+def schedule_meeting_reminder(sender, instance, created, **kwargs):
+    """Remind the host and invitees when a scheduled meeting is due to start"""
+    if instance.meeting_type == 'scheduled' and instance.status == 'waiting' and instance.scheduled_time:
+        remind_before('meeting', instance.pk, instance.scheduled_time, created)
+    else:
+        cancel('meeting', instance.pk)
+
+
+@receiver(post_save, sender=LiveClassSession)
+def schedule_live_class_reminder(sender, instance, created, **kwargs):
+    if instance.status == 'scheduled':
+        remind_before('live_class_session', instance.pk, instance.scheduled_datetime, created)
+    else:
+        cancel('live_class_session', instance.pk)
+
+
+@receiver(post_save, sender=GroupSession)
+def schedule_group_session_reminder(sender, instance, created, **kwargs):
+    if instance.status == 'published' and instance.start_time:
+        remind_before('group_session', instance.pk, instance.start_time, created)
+    else:
+        cancel('group_session', instance.pk)
+
+
+@receiver(post_delete, sender=Meeting)
+@receiver(post_delete, sender=LiveClassSession)
+@receiver(post_delete, sender=GroupSession)
+def cancel_reminder(sender, instance, **kwargs):
+    kind = {Meeting: 'meeting', LiveClassSession: 'live_class_session', GroupSession: 'group_session'}[sender]
+    cancel(kind, instance.pk)
@@ -0,0 +1,10 @@
+# reminders/tasks.py
+from celery import shared_task
+
+from .scheduler import drain
+
+
+@shared_task
+def drain_reminders():
+    """Queue all reminders that are due"""
+    return drain()
@@ -0,0 +1,90 @@
+import time
+from datetime import timedelta
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from lms.redis_client import redis_client
+from . import scheduler
+
+
+class Recorder:
+    """Stands in for a Celery task: ``delay`` records the ids it was queued with."""
+
+    def __init__(self):
+        self.queued = []
+        self.fail = False
+
+    def delay(self, object_id):
+        if self.fail:
+            raise ConnectionError("broker down")
+        self.queued.append(object_id)
+
+
+recorder = Recorder()
+
+
+@override_settings(REMINDERS={
+    'HANDLERS': {'test': 'reminders.tests.recorder'},
+    'LEAD_SECONDS': {'test': 600},
+    'BATCH_SIZE': 2,
+})
+class SchedulerTests(SimpleTestCase):
+    def setUp(self):
+        recorder.queued, recorder.fail = [], False
+        redis_client.delete(scheduler.DUE_KEY)
+        self.addCleanup(redis_client.delete, scheduler.DUE_KEY)
+        self.now = timezone.now()
+
+    def fires_in(self, object_id):
+        fire_at = scheduler.fire_time('test', object_id)
+        return None if fire_at is None else fire_at - self.now.timestamp()
+
+    def test_schedule_move_and_cancel(self):
+        scheduler.schedule('test', 1, self.now + timedelta(hours=1))
+        self.assertAlmostEqual(self.fires_in(1), 3600, delta=1)
+        scheduler.schedule('test', 1, self.now + timedelta(hours=2))
+        self.assertAlmostEqual(self.fires_in(1), 7200, delta=1)
+        self.assertEqual(redis_client.zcard(scheduler.DUE_KEY), 1)
+        scheduler.cancel('test', 1)
+        self.assertIsNone(self.fires_in(1))
+
+    def test_remind_before(self):
+        # Far enough ahead: LEAD_SECONDS before the start
+        scheduler.remind_before('test', 1, self.now + timedelta(hours=1))
+        self.assertAlmostEqual(self.fires_in(1), 3000, delta=1)
+        # New and starting within the lead time: right away
+        scheduler.remind_before('test', 2, self.now + timedelta(minutes=5), created=True)
+        self.assertAlmostEqual(self.fires_in(2), 0, delta=1)
+        # Known and without a pending reminder: it already fired
+        scheduler.remind_before('test', 3, self.now + timedelta(minutes=5))
+        self.assertIsNone(self.fires_in(3))
+        # Moved into the lead time with its reminder still pending: right away
+        scheduler.remind_before('test', 1, self.now + timedelta(minutes=5))
+        self.assertAlmostEqual(self.fires_in(1), 0, delta=1)
+        # Moved into the past: dropped
+        scheduler.schedule('test', 4, self.now + timedelta(hours=1))
+        scheduler.remind_before('test', 4, self.now - timedelta(minutes=1))
+        self.assertIsNone(self.fires_in(4))
+
+    def test_drain_queues_due_reminders_in_batches(self):
+        for object_id in range(1, 6):
+            scheduler.schedule('test', object_id, self.now - timedelta(seconds=object_id))
+        scheduler.schedule('test', 9, self.now + timedelta(hours=1))
+
+        self.assertEqual(scheduler.drain(), 5)
+        self.assertEqual(sorted(recorder.queued), ['1', '2', '3', '4', '5'])
+        # Due ones are gone, later ones stay
+        self.assertEqual(redis_client.zrange(scheduler.DUE_KEY, 0, -1), ['test:9'])
+        self.assertEqual(scheduler.drain(), 0)
+
+    def test_drain_puts_reminders_back_when_queueing_fails(self):
+        due = self.now - timedelta(minutes=1)
+        scheduler.schedule('test', 1, due)
+        recorder.fail = True
+        self.assertEqual(scheduler.drain(), 0)
+        self.assertAlmostEqual(scheduler.fire_time('test', 1), due.timestamp(), delta=0.001)
+
+        recorder.fail = False
+        self.assertEqual(scheduler.drain(time.time()), 1)
+        self.assertEqual(recorder.queued, ['1'])